@@ -13,85 +13,331 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+"""
+BMP station.
+
+By default, the received BMP messages are written in text to
+RYU_BMP_OUTPUT_FILE.
+
+If RYU_BMP_ARCHIVE_DIR is set, it runs as a collector instead: the raw
+messages are appended to a binary archive in the directory (cf.
+BMPArchive), and the Adj-RIB-In of the monitored peers is reconstructed
+in memory from the Route Monitoring messages (cf. AdjRIBIn).
+
+In both modes, messages are parsed by another thread in batches of
+what was received at once, so that receiving is not held up by parsing.
+"""
+
 import os
-import socket
+import struct
 import time
 
 from ryu.base import app_manager
 
 from ryu.lib import hub
 from ryu.lib.hub import StreamServer
+from ryu.lib.packet import bgp
 from ryu.lib.packet import bmp
 
 
-class BMPStation(app_manager.RyuApp):
+# the size of the chunk read from a BMP client at once
+_RECV_CHUNK_SIZE = 64 * 1024
+
+# the number of received batches queued for parsing
+_PARSE_QUEUE_LEN = 128
+
+
+class BMPArchive(object):
+    """Archive of raw BMP messages, rotated by size.
+
+    An archive file is a sequence of records, each of which is a header
+    of _RECORD_PACK_STR (the time of receipt, the length of the router
+    address and the length of the message) followed by the address of
+    the BMP client and the BMP message.
+
+    Every archive file has an index file, named with '.idx' appended,
+    of text lines "<time> <offset> <router> <peer>".  There is a line
+    for each peer in each batch of written messages, so that the
+    messages of a peer around a time can be found without scanning the
+    archive.
+    """
+
+    _RECORD_PACK_STR = '!dHI'
+    _RECORD_LEN = struct.calcsize(_RECORD_PACK_STR)
+
+    def __init__(self, directory, max_size=64 * 1024 * 1024):
+        super(BMPArchive, self).__init__()
+        self.directory = directory
+        self.max_size = max_size
+        self.path = None
+        self._fd = None
+        self._index_fd = None
+        self._size = 0
+        self._seq = 0
+
+    def _open(self, timestamp):
+        self.close()
+        self._seq += 1
+        name = 'bmp-%s-%d.dump' % (
+            time.strftime('%Y%m%d%H%M%S', time.gmtime(timestamp)),
+            self._seq)
+        self.path = os.path.join(self.directory, name)
+        self._fd = open(self.path, 'wb')
+        self._index_fd = open(self.path + '.idx', 'w')
+        self._size = 0
+
+    def write(self, timestamp, router, msgs):
+        """Appends a list of BMP messages received from router."""
+        if self._fd is None or self._size >= self.max_size:
+            self._open(timestamp)
+
+        records = []
+        index = []
+        peers = set()
+        offset = self._size
+        for msg in msgs:
+            peer = _peer_address(msg)
+            if peer is not None and peer not in peers:
+                peers.add(peer)
+                index.append('%.6f %d %s %s\n' % (timestamp, offset,
+                                                  router, peer))
+            records.append(struct.pack(self._RECORD_PACK_STR, timestamp,
+                                       len(router), len(msg)))
+            records.append(router)
+            records.append(msg)
+            offset += self._RECORD_LEN + len(router) + len(msg)
+
+        self._fd.writelines(records)
+        self._fd.flush()
+        self._index_fd.write(''.join(index))
+        self._index_fd.flush()
+        self._size = offset
+
+    def close(self):
+        if self._fd is not None:
+            self._fd.close()
+            self._index_fd.close()
+            self._fd = None
+            self._index_fd = None
+
+    @classmethod
+    def read(cls, path, offset=0):
+        """Yields (time, router, message) of the records in the archive
+        file from offset.
+        """
+        with open(path, 'rb') as fd:
+            fd.seek(offset)
+            while True:
+                hdr = fd.read(cls._RECORD_LEN)
+                if len(hdr) < cls._RECORD_LEN:
+                    return
+                (timestamp, router_len, msg_len) = struct.unpack(
+                    cls._RECORD_PACK_STR, hdr)
+                router = fd.read(router_len)
+                yield timestamp, router, fd.read(msg_len)
+
+
+def _peer_address(msg):
+    # the peer address in the per peer header of the raw message.
+    (_version, _len, type_) = bmp.BMPMessage.parse_header(msg)
+    if type_ not in (bmp.BMP_MSG_ROUTE_MONITORING,
+                     bmp.BMP_MSG_STATISTICS_REPORT,
+                     bmp.BMP_MSG_PEER_DOWN_NOTIFICATION,
+                     bmp.BMP_MSG_PEER_UP_NOTIFICATION):
+        return None
+    try:
+        kwargs, _rest = bmp.BMPPeerMessage.parser(
+            buffer(msg, bmp.BMPMessage._HDR_LEN))
+    except Exception:
+        return None
+    return kwargs['peer_address']
+
+
+class AdjRIBIn(object):
+    """Adj-RIB-In of the peers monitored by the BMP clients.
+
+    ribs is a dict of (router, peer address, peer distinguisher,
+    is_post_policy) -> dict of the prefixes (formatted_nlri_str) in
+    the RIB -> the list of the path attributes.
+    """
+
     def __init__(self):
-        super(BMPStation, self).__init__()
+        super(AdjRIBIn, self).__init__()
+        self.ribs = {}
+
+    def update(self, router, msg):
+        """Applies a parsed BMP message received from router."""
+        if isinstance(msg, bmp.BMPRouteMonitoring):
+            self._route_monitoring(router, msg)
+        elif isinstance(msg, bmp.BMPPeerDownNotification):
+            self._remove(lambda key: key[:3] == (router, msg.peer_address,
+                                                 msg.peer_distinguisher))
+
+    def router_down(self, router):
+        self._remove(lambda key: key[0] == router)
+
+    def _remove(self, match):
+        for key in self.ribs.keys():
+            if match(key):
+                del self.ribs[key]
+
+    def _route_monitoring(self, router, msg):
+        update = msg.bgp_update
+        if not isinstance(update, bgp.BGPUpdate):
+            return
+        key = (router, msg.peer_address, msg.peer_distinguisher,
+               msg.is_post_policy)
+        rib = self.ribs.setdefault(key, {})
+
+        withdrawn = list(update.withdrawn_routes)
+        nlri = list(update.nlri)
+        for attr in update.path_attributes:
+            if isinstance(attr, bgp.BGPPathAttributeMpReachNLRI):
+                nlri.extend(attr.nlri)
+            elif isinstance(attr, bgp.BGPPathAttributeMpUnreachNLRI):
+                withdrawn.extend(attr.withdrawn_routes)
+
+        for prefix in withdrawn:
+            rib.pop(prefix.formatted_nlri_str, None)
+        # the path attributes are shared among the prefixes.
+        path_attributes = update.path_attributes
+        for prefix in nlri:
+            rib[prefix.formatted_nlri_str] = path_attributes
+
+
+class BMPStation(app_manager.RyuApp):
+    def __init__(self, *args, **kwargs):
+        super(BMPStation, self).__init__(*args, **kwargs)
         self.name = 'bmpstation'
         self.server_host = os.environ.get('RYU_BMP_SERVER_HOST', '0.0.0.0')
         self.server_port = int(os.environ.get('RYU_BMP_SERVER_PORT', 11019))
         output_file = os.environ.get('RYU_BMP_OUTPUT_FILE', 'ryu_bmp.log')
         failed_dump = os.environ.get('RYU_BMP_FAILED_DUMP',
                                      'ryu_bmp_failed.dump')
+        archive_dir = os.environ.get('RYU_BMP_ARCHIVE_DIR')
+        archive_size = int(os.environ.get('RYU_BMP_ARCHIVE_SIZE',
+                                          64 * 1024 * 1024))
 
-        self.output_fd = open(output_file, 'w')
+        if archive_dir:
+            self.archive = BMPArchive(archive_dir, archive_size)
+            self.adj_rib_in = AdjRIBIn()
+            self.output_fd = None
+        else:
+            self.archive = None
+            self.adj_rib_in = None
+            self.output_fd = open(output_file, 'w')
         self.failed_dump_fd = open(failed_dump, 'w')
 
         self.failed_pkt_count = 0
+        self._parse_q = hub.Queue(_PARSE_QUEUE_LEN)
 
     def start(self):
         super(BMPStation, self).start()
         self.logger.debug("listening on %s:%s" % (self.server_host,
                                                   self.server_port))
 
+        self.threads.append(hub.spawn(self._parse_loop))
         return hub.spawn(StreamServer((self.server_host, self.server_port),
                                       self.loop).serve_forever)
 
+    def close(self):
+        if self.output_fd is not None:
+            self.output_fd.close()
+        if self.archive is not None:
+            self.archive.close()
+        self.failed_dump_fd.close()
+
     def loop(self, sock, addr):
         self.logger.debug("BMP client connected, ip=%s, port=%s" % addr)
-        is_active = True
-        buf = bytearray()
-        required_len = bmp.BMPMessage._HDR_LEN
-
-        while is_active:
-            ret = sock.recv(required_len)
-            if len(ret) == 0:
-                is_active = False
-                break
-            buf += ret
-            while len(buf) >= required_len:
-                version, len_, _ = bmp.BMPMessage.parse_header(buf)
+        try:
+            self._recv_loop(sock, addr[0])
+        finally:
+            # None tells the parser that the router has gone.
+            self._parse_q.put((time.time(), addr[0], None))
+            self.logger.debug("BMP client disconnected, ip=%s, port=%s" %
+                              addr)
+            sock.close()
+
+    def _recv_loop(self, sock, router):
+        # Messages are split by offset in a chunk of received data.  As
+        # they are queued for parsing as buffer objects referring to the
+        # chunk, a chunk is never overwritten: a new one is allocated when
+        # it is full, and only the trailing partial message is copied.
+        hdr_len = bmp.BMPMessage._HDR_LEN
+        buf = bytearray(_RECV_CHUNK_SIZE)
+        start = 0  # the head of the first unprocessed message
+        end = 0  # the tail of the received data
+        msg_len = hdr_len
+        while True:
+            if end == len(buf):
+                new_buf = bytearray(max(_RECV_CHUNK_SIZE, msg_len))
+                new_buf[:end - start] = buf[start:end]
+                buf = new_buf
+                end -= start
+                start = 0
+            ret = sock.recv_into(memoryview(buf)[end:])
+            if ret == 0:
+                return
+            end += ret
+
+            msgs = []
+            while end - start >= hdr_len:
+                version, msg_len, _ = bmp.BMPMessage.parse_header(
+                    buffer(buf, start, hdr_len))
                 if version != bmp.VERSION:
                     self.logger.error("unsupported bmp version: %d" % version)
-                    is_active = False
+                    return
+                if msg_len < hdr_len:
+                    self.logger.error("invalid bmp message length: %d" %
+                                      msg_len)
+                    return
+                if end - start < msg_len:
                     break
+                msgs.append(buffer(buf, start, msg_len))
+                start += msg_len
+                msg_len = hdr_len
 
-                required_len = len_
-                if len(buf) < required_len:
-                    break
+            if msgs:
+                self._received(time.time(), router, msgs)
+
+    def _received(self, timestamp, router, msgs):
+        if self.archive is not None:
+            self.archive.write(timestamp, router, msgs)
+        self._parse_q.put((timestamp, router, msgs))
+
+    def _parse_loop(self):
+        while True:
+            batches = [self._parse_q.get()]
+            while not self._parse_q.empty():
+                batches.append(self._parse_q.get())
+            self._parse(batches)
 
+    def _parse(self, batches):
+        output = []
+        for timestamp, router, msgs in batches:
+            if msgs is None:
+                if self.adj_rib_in is not None:
+                    self.adj_rib_in.router_down(router)
+                continue
+            if self.output_fd is not None:
+                t = time.strftime("%Y %b %d %H:%M:%S",
+                                  time.localtime(timestamp))
+            for data in msgs:
                 try:
-                    msg, rest = bmp.BMPMessage.parser(buf)
+                    msg, rest = bmp.BMPMessage.parser(data)
                 except Exception, e:
-                    pkt = buf[:len_]
-                    self.failed_dump_fd.write(pkt)
-                    self.failed_dump_fd.flush()
-                    buf = buf[len_:]
+                    self.failed_dump_fd.write(data)
                     self.failed_pkt_count += 1
                     self.logger.error("failed to parse: %s"
                                       " (total fail count: %d)" %
                                       (e, self.failed_pkt_count))
-                else:
-                    t = time.strftime("%Y %b %d %H:%M:%S", time.localtime())
-                    self.logger.debug("%s | %s | %s\n" % (t, addr[0], msg))
-                    self.output_fd.write("%s | %s | %s\n\n" % (t, addr[0],
-                                                               msg))
-                    self.output_fd.flush()
-                    buf = rest
-
-                required_len = bmp.BMPMessage._HDR_LEN
-
-        self.logger.debug("BMP client disconnected, ip=%s, port=%s" % addr)
-        sock.close()
-        self.output_fd.close()
-        self.failed_dump_fd.close()
+                    continue
+                if self.adj_rib_in is not None:
+                    self.adj_rib_in.update(router, msg)
+                if self.output_fd is not None:
+                    output.append("%s | %s | %s\n\n" % (t, router, msg))
+
+        if output:
+            self.output_fd.write(''.join(output))
+            self.output_fd.flush()
+        self.failed_dump_fd.flush()
@@ -42,6 +42,7 @@ class GUIServerApp(app_manager.RyuApp):
     _CONTEXTS = {
         'wsgi': WSGIApplication,
     }
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(GUIServerApp, self).__init__(*args, **kwargs)
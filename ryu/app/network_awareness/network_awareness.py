@@ -22,12 +22,12 @@ import networkx as nx
 from operator import attrgetter
 from ryu import cfg
 from ryu.base import app_manager
+from ryu.base.app_manager import lookup_service_brick
 from ryu.controller import ofp_event
 from ryu.controller.handler import MAIN_DISPATCHER, DEAD_DISPATCHER
 from ryu.controller.handler import CONFIG_DISPATCHER
 from ryu.controller.handler import set_ev_cls
 from ryu.ofproto import ofproto_v1_3
-from ryu.lib.packet import packet
 from ryu.lib.packet import ethernet
 from ryu.lib.packet import ipv4
 from ryu.lib.packet import arp
@@ -40,6 +40,8 @@ import setting
 
 CONF = cfg.CONF
 
+app_manager.require_app('ryu.topology.graph')
+
 
 class NetworkAwareness(app_manager.RyuApp):
     """
@@ -120,6 +122,13 @@ class NetworkAwareness(app_manager.RyuApp):
         self.logger.info("%s location is not found." % host_ip)
         return None
 
+    @property
+    def topology_graph(self):
+        """
+            The topology graph service, which caches hop-count paths.
+        """
+        return lookup_service_brick('topology_graph')
+
     def get_switches(self):
         return self.switches
 
@@ -231,8 +240,25 @@ class NetworkAwareness(app_manager.RyuApp):
         self.create_interior_links(links)
         self.create_access_ports()
         self.get_graph(self.link_to_port.keys())
-        self.shortest_paths = self.all_k_shortest_paths(
-            self.graph, weight='weight', k=CONF.k_paths)
+        # Paths are computed on demand by get_shortest_paths().
+        self.shortest_paths = {}
+
+    def get_shortest_paths(self, weight='weight'):
+        """
+            Get K shortest paths between all datapaths.
+            Hop-count paths come from the topology graph service, which
+            only recomputes the paths affected by topology changes.
+        """
+        if weight == 'weight':
+            k = CONF.k_paths
+            nodes = self.topology_graph.graph.nodes()
+            self.shortest_paths = dict(
+                (src, dict((dst, self.topology_graph.k_shortest_paths(
+                    src, dst, k)) for dst in nodes)) for src in nodes)
+        else:
+            self.shortest_paths = self.all_k_shortest_paths(
+                self.graph, weight=weight, k=CONF.k_paths)
+        return self.shortest_paths
 
     def register_access_info(self, dpid, in_port, ip, mac):
         """
@@ -260,7 +286,7 @@ class NetworkAwareness(app_manager.RyuApp):
 
         parser = datapath.ofproto_parser
         in_port = msg.match['in_port']
-        pkt = packet.Packet(msg.data)
+        pkt = ev.pkt_headers
 
         eth_type = pkt.get_protocols(ethernet.ethernet)[0].ethertype
         arp_pkt = pkt.get_protocol(arp.arp)
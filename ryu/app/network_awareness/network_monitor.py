@@ -15,7 +15,6 @@
 # limitations under the License.
 
 from __future__ import division
-import copy
 from operator import attrgetter
 from ryu import cfg
 from ryu.base import app_manager
@@ -27,6 +26,7 @@ from ryu.controller.handler import set_ev_cls
 from ryu.ofproto import ofproto_v1_3
 from ryu.lib import hub
 from ryu.lib.packet import packet
+import port_stats
 import setting
 
 
@@ -44,13 +44,13 @@ class NetworkMonitor(app_manager.RyuApp):
         super(NetworkMonitor, self).__init__(*args, **kwargs)
         self.name = 'monitor'
         self.datapaths = {}
-        self.port_stats = {}
-        self.port_speed = {}
+        # speeds, free bandwidth and utilization of all the ports.
+        self.port_stats = port_stats.PortStatsStore(
+            period=setting.MONITOR_PERIOD)
         self.flow_stats = {}
         self.flow_speed = {}
         self.stats = {}
         self.port_features = {}
-        self.free_bandwidth = {}
         self.awareness = lookup_service_brick('awareness')
         self.graph = None
         self.capabilities = None
@@ -100,7 +100,7 @@ class NetworkMonitor(app_manager.RyuApp):
             Save bandwidth data into networkx graph object.
         """
         while CONF.weight == 'bw':
-            self.graph = self.create_bw_graph(self.free_bandwidth)
+            self.graph = self.create_bw_graph()
             self.logger.debug("save_freebandwidth")
             hub.sleep(setting.MONITOR_PERIOD)
 
@@ -142,51 +142,50 @@ class NetworkMonitor(app_manager.RyuApp):
     def get_best_path_by_bw(self, graph, paths):
         """
             Get best path by comparing paths.
+            The bandwidth of links is taken from the port stats rather
+            than graph, and the paths of all pairs are compared at once.
         """
         capabilities = {}
-        best_paths = copy.deepcopy(paths)
+        best_paths = {}
+        link_bw = self.port_stats.link_bandwidth(self.awareness.link_to_port)
 
+        pairs = []
+        candidates = []
         for src in paths:
+            capabilities.setdefault(src, {})
+            best_paths.setdefault(src, {})
             for dst in paths[src]:
                 if src == dst:
                     best_paths[src][src] = [src]
-                    capabilities.setdefault(src, {src: setting.MAX_CAPACITY})
                     capabilities[src][src] = setting.MAX_CAPACITY
                     continue
-                max_bw_of_paths = 0
-                best_path = paths[src][dst][0]
-                for path in paths[src][dst]:
-                    min_bw = setting.MAX_CAPACITY
-                    min_bw = self.get_min_bw_of_links(graph, path, min_bw)
-                    if min_bw > max_bw_of_paths:
-                        max_bw_of_paths = min_bw
-                        best_path = path
-
-                best_paths[src][dst] = best_path
-                capabilities.setdefault(src, {dst: max_bw_of_paths})
-                capabilities[src][dst] = max_bw_of_paths
+                if paths[src][dst]:
+                    pairs.append((src, dst, len(candidates),
+                                  len(paths[src][dst])))
+                    candidates.extend(paths[src][dst])
+
+        min_bws = port_stats.bottleneck_bandwidth(candidates, link_bw,
+                                                  setting.MAX_CAPACITY)
+        for src, dst, start, num in pairs:
+            # the first of the paths with the most bandwidth.
+            i = start + min_bws[start:start + num].argmax()
+            best_paths[src][dst] = candidates[i]
+            capabilities[src][dst] = float(min_bws[i])
         self.capabilities = capabilities
         self.best_paths = best_paths
         return capabilities, best_paths
 
-    def create_bw_graph(self, bw_dict):
+    def create_bw_graph(self):
         """
             Save bandwidth data into networkx graph object.
         """
         try:
             graph = self.awareness.graph
-            link_to_port = self.awareness.link_to_port
-            for link in link_to_port:
-                (src_dpid, dst_dpid) = link
-                (src_port, dst_port) = link_to_port[link]
-                if src_dpid in bw_dict and dst_dpid in bw_dict:
-                    bw_src = bw_dict[src_dpid][src_port]
-                    bw_dst = bw_dict[dst_dpid][dst_port]
-                    bandwidth = min(bw_src, bw_dst)
-                    # add key:value of bandwidth into graph.
-                    graph[src_dpid][dst_dpid]['bandwidth'] = bandwidth
-                else:
-                    graph[src_dpid][dst_dpid]['bandwidth'] = 0
+            link_bw = self.port_stats.link_bandwidth(
+                self.awareness.link_to_port)
+            for (src_dpid, dst_dpid), bandwidth in link_bw.iteritems():
+                # add key:value of bandwidth into graph.
+                graph[src_dpid][dst_dpid]['bandwidth'] = bandwidth
             return graph
         except:
             self.logger.info("Create bw graph exception")
@@ -194,17 +193,6 @@ class NetworkMonitor(app_manager.RyuApp):
                 self.awareness = lookup_service_brick('awareness')
             return self.awareness.graph
 
-    def _save_freebandwidth(self, dpid, port_no, speed):
-        # Calculate free bandwidth of port and save it.
-        port_state = self.port_features.get(dpid).get(port_no)
-        if port_state:
-            capacity = port_state[2]
-            curr_bw = self._get_free_bw(capacity, speed)
-            self.free_bandwidth[dpid].setdefault(port_no, None)
-            self.free_bandwidth[dpid][port_no] = curr_bw
-        else:
-            self.logger.info("Fail in getting port state")
-
     def _save_stats(self, _dict, key, value, length):
         if key not in _dict:
             _dict[key] = []
@@ -219,10 +207,6 @@ class NetworkMonitor(app_manager.RyuApp):
         else:
             return 0
 
-    def _get_free_bw(self, capacity, speed):
-        # BW:Mbit/s
-        return max(capacity/10**3 - speed * 8/10**6, 0)
-
     def _get_time(self, sec, nsec):
         return sec + nsec / (10 ** 9)
 
@@ -266,38 +250,17 @@ class NetworkMonitor(app_manager.RyuApp):
     @set_ev_cls(ofp_event.EventOFPPortStatsReply, MAIN_DISPATCHER)
     def _port_stats_reply_handler(self, ev):
         """
-            Save port's stats info
-            Calculate port's speed and save it.
+            Save port's stats info.
+            Port's speed and free bandwidth are calculated on demand.
         """
         body = ev.msg.body
         dpid = ev.msg.datapath.id
         self.stats['port'][dpid] = body
-        self.free_bandwidth.setdefault(dpid, {})
-
-        for stat in sorted(body, key=attrgetter('port_no')):
-            port_no = stat.port_no
-            if port_no != ofproto_v1_3.OFPP_LOCAL:
-                key = (dpid, port_no)
-                value = (stat.tx_bytes, stat.rx_bytes, stat.rx_errors,
-                         stat.duration_sec, stat.duration_nsec)
-
-                self._save_stats(self.port_stats, key, value, 5)
-
-                # Get port speed.
-                pre = 0
-                period = setting.MONITOR_PERIOD
-                tmp = self.port_stats[key]
-                if len(tmp) > 1:
-                    pre = tmp[-2][0] + tmp[-2][1]
-                    period = self._get_period(tmp[-1][3], tmp[-1][4],
-                                              tmp[-2][3], tmp[-2][4])
-
-                speed = self._get_speed(
-                    self.port_stats[key][-1][0] + self.port_stats[key][-1][1],
-                    pre, period)
 
-                self._save_stats(self.port_speed, key, speed, 5)
-                self._save_freebandwidth(dpid, port_no, speed)
+        self.port_stats.update(dpid, [
+            (stat.port_no, stat.tx_bytes, stat.rx_bytes, stat.rx_errors,
+             stat.duration_sec, stat.duration_nsec)
+            for stat in body if stat.port_no != ofproto_v1_3.OFPP_LOCAL])
 
     @set_ev_cls(ofp_event.EventOFPPortDescStatsReply, MAIN_DISPATCHER)
     def port_desc_stats_reply_handler(self, ev):
@@ -341,6 +304,7 @@ class NetworkMonitor(app_manager.RyuApp):
 
             port_feature = (config, state, p.curr_speed)
             self.port_features[dpid][p.port_no] = port_feature
+            self.port_stats.set_capacity(dpid, p.port_no, p.curr_speed)
 
     @set_ev_cls(ofp_event.EventOFPPortStatus, MAIN_DISPATCHER)
     def _port_status_handler(self, ev):
@@ -406,11 +370,13 @@ class NetworkMonitor(app_manager.RyuApp):
             for dpid in bodys.keys():
                 for stat in sorted(bodys[dpid], key=attrgetter('port_no')):
                     if stat.port_no != ofproto_v1_3.OFPP_LOCAL:
+                        speed = self.port_stats.port_speed(dpid,
+                                                           stat.port_no)
                         print(format % (
                             dpid, stat.port_no,
                             stat.rx_packets, stat.rx_bytes, stat.rx_errors,
                             stat.tx_packets, stat.tx_bytes, stat.tx_errors,
-                            abs(self.port_speed[(dpid, stat.port_no)][-1]),
+                            abs(speed or 0),
                             self.port_features[dpid][stat.port_no][2],
                             self.port_features[dpid][stat.port_no][0],
                             self.port_features[dpid][stat.port_no][1]))
@@ -0,0 +1,230 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Port statistics kept in NumPy arrays.
+
+Every (dpid, port_no) has a row of ring buffers of the counters in
+PortStatsStore, and the speeds, the free bandwidth and the utilization
+of all the ports are computed at once when they are queried after new
+statistics have been recorded.
+"""
+
+import numpy as np
+
+
+class PortStatsStore(object):
+    """Ring buffers of the port counters.
+
+    The speed of a port is in bytes per second, the free bandwidth is in
+    Mbit/s and the utilization is the ratio of the speed to the current
+    speed of the port.  The capacity of a port is in kbit/s as
+    curr_speed of OFPPort, and the free bandwidth and the utilization of
+    a port of unknown capacity are None.
+
+    The speed with only one sample is the counter divided by period.
+    """
+
+    _INITIAL_ROWS = 64
+
+    def __init__(self, length=5, period=10):
+        super(PortStatsStore, self).__init__()
+        self.length = length
+        self.period = period
+        self._rows = {}  # (dpid, port_no) -> row
+        self._keys = []  # row -> (dpid, port_no)
+        self._allocate(self._INITIAL_ROWS)
+        self._dirty = False
+
+    def _allocate(self, size):
+        def grow(old, shape, dtype, fill=0):
+            new = np.empty(shape, dtype)
+            new.fill(fill)
+            if old is not None:
+                new[:len(old)] = old
+            return new
+
+        ring = (size, self.length)
+        get = lambda name: getattr(self, name, None)
+        self.tx_bytes = grow(get('tx_bytes'), ring, np.int64)
+        self.rx_bytes = grow(get('rx_bytes'), ring, np.int64)
+        self.rx_errors = grow(get('rx_errors'), ring, np.int64)
+        self.time = grow(get('time'), ring, np.float64)
+        self._pos = grow(get('_pos'), size, np.intp, -1)
+        self._count = grow(get('_count'), size, np.intp)
+        self.capacity = grow(get('capacity'), size, np.float64, np.nan)
+        self.speed = grow(get('speed'), size, np.float64)
+        self.free_bw = grow(get('free_bw'), size, np.float64, np.nan)
+        self.utilization = grow(get('utilization'), size, np.float64,
+                                np.nan)
+
+    def _row(self, key):
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            if row == len(self._pos):
+                self._allocate(row * 2)
+            self._rows[key] = row
+            self._keys.append(key)
+        return row
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __len__(self):
+        return len(self._keys)
+
+    def update(self, dpid, stats):
+        """Records a sample of the ports of a switch.
+
+        stats is a list of (port_no, tx_bytes, rx_bytes, rx_errors,
+        duration_sec, duration_nsec).
+        """
+        if not stats:
+            return
+        rows = np.array([self._row((dpid, s[0])) for s in stats], np.intp)
+        (_port_no, tx_bytes, rx_bytes, rx_errors, sec,
+         nsec) = zip(*stats)
+        pos = (self._pos[rows] + 1) % self.length
+        self.tx_bytes[rows, pos] = tx_bytes
+        self.rx_bytes[rows, pos] = rx_bytes
+        self.rx_errors[rows, pos] = rx_errors
+        self.time[rows, pos] = (np.array(sec, np.float64) +
+                                np.array(nsec, np.float64) / 10 ** 9)
+        self._pos[rows] = pos
+        self._count[rows] = np.minimum(self._count[rows] + 1, self.length)
+        self._dirty = True
+
+    def set_capacity(self, dpid, port_no, curr_speed):
+        self.capacity[self._row((dpid, port_no))] = curr_speed
+        self._dirty = True
+
+    def compute(self):
+        """Computes the speed, the free bandwidth and the utilization of
+        all the ports from the last two samples.
+        """
+        n = len(self._keys)
+        rows = np.arange(n)
+        pos = self._pos[:n]
+        prev = (pos - 1) % self.length
+        has_prev = self._count[:n] > 1
+
+        now = self.tx_bytes[rows, pos] + self.rx_bytes[rows, pos]
+        pre = np.where(has_prev,
+                       self.tx_bytes[rows, prev] + self.rx_bytes[rows, prev],
+                       0)
+        period = np.where(has_prev,
+                          self.time[rows, pos] - self.time[rows, prev],
+                          self.period)
+        speed = np.zeros(n)
+        np.divide(now - pre, period, out=speed, where=period > 0)
+        speed[self._count[:n] == 0] = 0
+        self.speed[:n] = speed
+
+        capacity = self.capacity[:n]
+        bits = speed * 8
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.free_bw[:n] = np.maximum(capacity / 10 ** 3 -
+                                          bits / 10 ** 6, 0)
+            self.utilization[:n] = np.where(capacity > 0,
+                                            bits / 10 ** 3 / capacity,
+                                            np.nan)
+        self._dirty = False
+
+    def _lookup(self, array, key):
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        if self._dirty:
+            self.compute()
+        value = array[row]
+        if np.isnan(value):
+            return None
+        return float(value)
+
+    def port_speed(self, dpid, port_no):
+        return self._lookup(self.speed, (dpid, port_no))
+
+    def free_bandwidth(self, dpid, port_no):
+        return self._lookup(self.free_bw, (dpid, port_no))
+
+    def port_utilization(self, dpid, port_no):
+        return self._lookup(self.utilization, (dpid, port_no))
+
+    def _link_rows(self, link_to_port):
+        links = link_to_port.keys()
+        src = np.empty(len(links), np.intp)
+        dst = np.empty(len(links), np.intp)
+        for i, link in enumerate(links):
+            (src_port, dst_port) = link_to_port[link]
+            src[i] = self._rows.get((link[0], src_port), -1)
+            dst[i] = self._rows.get((link[1], dst_port), -1)
+        return links, src, dst
+
+    def link_bandwidth(self, link_to_port):
+        """Returns a dict of (src dpid, dst dpid) -> the free bandwidth
+        of the link, which is the smaller one of its ports.
+
+        link_to_port is a dict of (src dpid, dst dpid) -> (src port_no,
+        dst port_no).  It is 0 if either port is unknown.
+        """
+        if self._dirty:
+            self.compute()
+        links, src, dst = self._link_rows(link_to_port)
+        known = (src >= 0) & (dst >= 0)
+        bw = np.fmin(self.free_bw[src], self.free_bw[dst])
+        bw[~known | np.isnan(bw)] = 0
+        return dict(zip(links, bw.tolist()))
+
+    def link_utilization(self, link_to_port):
+        """Returns a dict of (src dpid, dst dpid) -> the utilization of
+        the link, which is the larger one of its ports, or None if
+        neither port is known.
+        """
+        if self._dirty:
+            self.compute()
+        links, src, dst = self._link_rows(link_to_port)
+        nan = np.array([np.nan])
+        util = np.fmax(np.where(src >= 0, self.utilization[src], nan),
+                       np.where(dst >= 0, self.utilization[dst], nan))
+        return dict((link, None if np.isnan(u) else u)
+                    for link, u in zip(links, util.tolist()))
+
+
+def bottleneck_bandwidth(paths, link_bw, default):
+    """Returns an array of the smallest bandwidth of the links of every
+    path.
+
+    link_bw is a dict of (src dpid, dst dpid) -> bandwidth, and the
+    bandwidth of a link not in it and of a path without links is default.
+    """
+    values = []
+    starts = []
+    for path in paths:
+        starts.append(len(values))
+        values.extend(link_bw.get(link, default)
+                      for link in zip(path[:-1], path[1:]))
+    result = np.empty(len(paths))
+    result.fill(default)
+    if not values:
+        return result
+    values.append(default)
+    starts = np.array(starts, np.intp)
+    result = np.minimum.reduceat(np.array(values, np.float64), starts)
+    np.minimum(result, default, out=result)
+    # reduceat gives the value at the start for an empty segment.
+    lengths = np.diff(np.append(starts, len(values) - 1))
+    result[lengths == 0] = default
+    return result
@@ -26,7 +26,6 @@ from ryu.controller.handler import MAIN_DISPATCHER, DEAD_DISPATCHER
 from ryu.controller.handler import CONFIG_DISPATCHER
 from ryu.controller.handler import set_ev_cls
 from ryu.ofproto import ofproto_v1_3
-from ryu.lib.packet import packet
 from ryu.lib.packet import ethernet
 from ryu.lib.packet import ipv4
 from ryu.lib.packet import arp
@@ -223,7 +222,7 @@ class ShortestForwarding(app_manager.RyuApp):
         graph = self.awareness.graph
 
         if weight == self.WEIGHT_MODEL['hop']:
-            return shortest_paths.get(src).get(dst)[0]
+            return self.awareness.topology_graph.shortest_path(src, dst)
         elif weight == self.WEIGHT_MODEL['delay']:
             # If paths existed, return it, else calculate it and save it.
             try:
@@ -247,8 +246,8 @@ class ShortestForwarding(app_manager.RyuApp):
                 return path
             except:
                 # else, calculate it, and return.
-                result = self.monitor.get_best_path_by_bw(graph,
-                                                          shortest_paths)
+                result = self.monitor.get_best_path_by_bw(
+                    graph, self.awareness.get_shortest_paths())
                 paths = result[1]
                 best_path = paths.get(src).get(dst)
                 return best_path
@@ -374,7 +373,7 @@ class ShortestForwarding(app_manager.RyuApp):
         msg = ev.msg
         datapath = msg.datapath
         in_port = msg.match['in_port']
-        pkt = packet.Packet(msg.data)
+        pkt = ev.pkt_headers
         arp_pkt = pkt.get_protocol(arp.arp)
         ip_pkt = pkt.get_protocol(ipv4.ipv4)
 
@@ -65,4 +65,87 @@ def send_msg(app, msg, reply_cls=None, reply_multi=False):
                                                  reply_multi=reply_multi))()
 
 
+def iter_stats(app, msg, reply_cls, max_chunks=16, timeout=60):
+    """
+    Send a multipart (stats) request and iterate over stats entries of
+    the replies as they arrive.
+
+    :param app: Client RyuApp instance
+    :param msg: An OpenFlow multipart request message to send
+    :param reply_cls: OpenFlow message class for expected replies
+    :param max_chunks: The number of reply messages received but not
+        iterated over yet, beyond which the controller stops reading
+        from the switch until the generator is resumed.  The default
+        is 16.
+    :param timeout: Seconds the controller waits for the generator to
+        be resumed, after which the generator raises ReplyOverflow.
+        None means forever.  The default is 60.
+
+    Returns a generator which yields each entry of the body of the reply
+    messages, e.g. OFPFlowStats, until the last reply is received.
+    Reply messages are released as soon as their entries are consumed,
+    so the whole replies are never kept in memory.  With the lazy parse
+    mode (--ofp-lazy-parse) each body is also decoded only when it is
+    iterated over.
+
+    The generator raises an exception on error, and SwitchDisconnected
+    if the switch is disconnected before the last reply.
+
+    Example::
+
+        import ryu.app.ofctl.api as api
+
+        msg = parser.OFPFlowStatsRequest(datapath=datapath)
+        for stats in api.iter_stats(self, msg,
+                                    reply_cls=parser.OFPFlowStatsReply):
+            self.logger.info('%s', stats.match)
+    """
+    stream = app.send_request(event.SendStatsStreamRequest(
+        msg=msg, reply_cls=reply_cls, max_chunks=max_chunks,
+        timeout=timeout))()
+    return iter(stream)
+
+
+def send_flow_mods(app, msgs, atomic=False):
+    """
+    Send OpenFlow messages, e.g. OFPFlowMod, to their datapaths and
+    track their completion.
+
+    :param app: Client RyuApp instance
+    :param msgs: A list of OpenFlow messages to send.  They may be for
+        different datapaths, and are sent to each in the given order.
+    :param atomic: True if the messages to an OpenFlow 1.4 switch are
+        sent in an atomic and ordered bundle.  The default is False.
+
+    The messages to a switch are pipelined and followed by one Barrier
+    Request.  Returns a batch handle without waiting for the replies:
+
+    ================ ======================================================
+    Attribute        Description
+    ================ ======================================================
+    wait(timeout)    Blocks until all the switches have completed or
+                     timeout seconds (None by default) have passed, and
+                     returns True if they have completed.
+    done()           True if all the switches have completed.
+    ok()             True if all the switches have completed without
+                     errors.
+    errors           A dict of the datapath ID of a completed switch ->
+                     the list of OFPErrorMsg replied to the messages.
+    lost             A set of the datapath IDs of the switches which
+                     were disconnected before completion.
+    ================ ======================================================
+
+    Example::
+
+        import ryu.app.ofctl.api as api
+
+        batch = api.send_flow_mods(self, [flow_mod1, flow_mod2])
+        if not batch.wait(timeout=5) or not batch.ok():
+            self.logger.error('reroute failed: %s %s',
+                              batch.errors, batch.lost)
+    """
+    return app.send_request(event.SendFlowModsRequest(msgs=msgs,
+                                                      atomic=atomic))()
+
+
 app_manager.require_app('ryu.app.ofctl.service', api_style=True)
@@ -47,6 +47,26 @@ class SendMsgRequest(_RequestBase):
         self.reply_multi = reply_multi
 
 
+# send a multipart request and stream replies
+
+class SendStatsStreamRequest(_RequestBase):
+    def __init__(self, msg, reply_cls, max_chunks, timeout):
+        super(SendStatsStreamRequest, self).__init__()
+        self.msg = msg
+        self.reply_cls = reply_cls
+        self.max_chunks = max_chunks
+        self.timeout = timeout
+
+
+# send flow mods to many datapaths and track their completion
+
+class SendFlowModsRequest(_RequestBase):
+    def __init__(self, msgs, atomic):
+        super(SendFlowModsRequest, self).__init__()
+        self.msgs = msgs
+        self.atomic = atomic
+
+
 # generic reply
 
 class Reply(_ReplyBase):
@@ -35,3 +35,15 @@ class OFError(_ExceptionBase):
     """OFPErrorMsg is received."""
 
     message = 'OpenFlow errors %(result)s'
+
+
+class ReplyOverflow(_ExceptionBase):
+    """The client has not consumed the replies of a stream in time."""
+
+    message = 'More than %(result)s replies not consumed'
+
+
+class SwitchDisconnected(_ExceptionBase):
+    """The switch is disconnected before the replies are completed."""
+
+    message = 'Switch %(result)s disconnected'
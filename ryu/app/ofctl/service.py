@@ -16,12 +16,15 @@
 
 # ofctl service
 
+import itertools
+
 from ryu.base import app_manager
 
 from ryu.controller import ofp_event
 from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER,\
     DEAD_DISPATCHER
 from ryu.controller.handler import set_ev_cls
+from ryu.lib import hub
 
 import event
 import exception
@@ -33,6 +36,158 @@ class _SwitchInfo(object):
         self.xids = {}
         self.barriers = {}
         self.results = {}
+        self.bundle_id = 0
+
+
+class _ReplyStream(object):
+    """Reply messages passed to a client as they arrive.
+
+    The stream observes the replies itself, so that they are queued by
+    the receive loop of the datapath rather than by the service.  Once
+    max_chunks replies are queued, the receive loop waits for the client
+    to consume one, which throttles the switch through TCP.  If the
+    client does not consume any for timeout seconds, the stream fails
+    with ReplyOverflow.
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self, datapath, reply_cls, max_chunks, timeout):
+        self.name = 'ofctl_stream-%d' % next(self._ids)
+        self.datapath = datapath
+        self.ev_cls = ofp_event.ofp_msg_to_ev_cls(reply_cls)
+        self.max_chunks = max_chunks
+        self.timeout = timeout
+        self.xid = None
+        self._q = hub.Queue()
+        self._room = hub.Semaphore(max_chunks)
+        self._observing = False
+        self._cancelled = False
+
+    def start(self, xid):
+        """Starts observing the replies to the request of xid."""
+        self.xid = xid
+        app_manager.SERVICE_BRICKS[self.name] = self
+        brick = app_manager._lookup_service_brick_by_ev_cls(self.ev_cls)
+        if brick is not None:
+            brick.register_observer(self.ev_cls, self.name)
+        self._observing = True
+
+    def _stop(self):
+        if not self._observing:
+            return
+        self._observing = False
+        brick = app_manager._lookup_service_brick_by_ev_cls(self.ev_cls)
+        if brick is not None:
+            brick.unregister_observer(self.ev_cls, self.name)
+        app_manager.SERVICE_BRICKS.pop(self.name, None)
+
+    def _send_event(self, ev, state):
+        # called by the receive loop of a datapath.
+        msg = ev.msg
+        if msg.datapath is not self.datapath or msg.xid != self.xid:
+            return
+        if self._cancelled:
+            return
+        try:
+            with hub.Timeout(self.timeout):
+                self._room.acquire()
+        except hub.Timeout:
+            self.fail(exception.ReplyOverflow(result=self.max_chunks))
+            return
+        if self._cancelled:
+            return
+        self._q.put(msg)
+
+    def fail(self, exc):
+        self._end(exc)
+
+    def close(self):
+        self._end(None)
+
+    def _end(self, msg):
+        if not self._cancelled:
+            self._cancelled = True
+            self._q.put(msg)
+            # wake up the receive loop if it is waiting for room.
+            self._room.release()
+        self._stop()
+
+    def __iter__(self):
+        try:
+            while True:
+                msg = self._q.get()
+                if msg is None:
+                    return
+                if isinstance(msg, Exception):
+                    raise msg
+                body = msg.body
+                if isinstance(body, list):
+                    for entry in body:
+                        yield entry
+                else:
+                    yield body
+                self._room.release()
+        finally:
+            # the client might stop iterating halfway.
+            # drop the rest and unblock the receive loop.
+            if not self._cancelled:
+                self._cancelled = True
+                self._room.release()
+            self._stop()
+            try:
+                while True:
+                    self._q.get(block=False)
+            except hub.QueueEmpty:
+                pass
+
+
+class _FlowModBatch(object):
+    """The completion of messages sent by send_flow_mods()."""
+
+    def __init__(self, dpids):
+        self.errors = {}
+        self.lost = set()
+        self._pending = set(dpids)
+        self._done = hub.Event()
+        if not self._pending:
+            self._done.set()
+
+    def _complete(self, dpid, errors=None):
+        if dpid not in self._pending:
+            return
+        self._pending.discard(dpid)
+        if errors is None:
+            self.lost.add(dpid)
+        else:
+            self.errors[dpid] = errors
+        if not self._pending:
+            self._done.set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def done(self):
+        return not self._pending
+
+    def ok(self):
+        return (self.done() and not self.lost and
+                not any(self.errors.itervalues()))
+
+
+class _BatchPart(object):
+    """The messages of a batch to a switch, which collects the errors
+    replied to them.
+    """
+
+    def __init__(self, batch, dpid):
+        self.batch = batch
+        self.dpid = dpid
+        self.xids = []
+        self.errors = []
+
+    def append(self, msg):
+        self.errors.append(msg)
 
 
 class OfctlService(app_manager.RyuApp):
@@ -92,6 +247,17 @@ class OfctlService(app_manager.RyuApp):
         if info.datapath is datapath:
             self.logger.debug('forget info %s' % (info,))
             self._switches.pop(id)
+            for result in info.results.values():
+                if isinstance(result, _BatchPart):
+                    result.batch._complete(result.dpid)
+                elif isinstance(result, _ReplyStream):
+                    result.fail(exception.SwitchDisconnected(result=id))
+            for xid, req in info.xids.items():
+                if isinstance(info.results.get(xid), _ReplyStream):
+                    continue
+                reply_cls = getattr(req, 'reply_cls', None)
+                if reply_cls is not None:
+                    self._unobserve_msg(reply_cls)
 
     @set_ev_cls(event.GetDatapathRequest, MAIN_DISPATCHER)
     def _handle_get_datapath(self, req):
@@ -105,11 +271,7 @@ class OfctlService(app_manager.RyuApp):
         rep = event.Reply(result=datapath)
         self.reply_to_request(req, rep)
 
-    @set_ev_cls(event.SendMsgRequest, MAIN_DISPATCHER)
-    def _handle_send_msg(self, req):
-        if req.reply_cls is not None:
-            self._observe_msg(req.reply_cls)
-
+    def _send_msg(self, req, result):
         msg = req.msg
         datapath = msg.datapath
         datapath.set_xid(msg)
@@ -122,13 +284,75 @@ class OfctlService(app_manager.RyuApp):
         assert xid not in si.results
         assert xid not in si.xids
         assert barrier_xid not in si.barriers
-        si.results[xid] = []
+        si.results[xid] = result
         si.xids[xid] = req
         si.barriers[barrier_xid] = xid
+        if isinstance(result, _ReplyStream):
+            result.start(xid)
 
         datapath.send_msg(msg)
         datapath.send_msg(barrier)
 
+    @set_ev_cls(event.SendMsgRequest, MAIN_DISPATCHER)
+    def _handle_send_msg(self, req):
+        if req.reply_cls is not None:
+            self._observe_msg(req.reply_cls)
+        self._send_msg(req, [])
+
+    @set_ev_cls(event.SendStatsStreamRequest, MAIN_DISPATCHER)
+    def _handle_send_stats_stream(self, req):
+        stream = _ReplyStream(req.msg.datapath, req.reply_cls,
+                              req.max_chunks, req.timeout)
+        self._send_msg(req, stream)
+        # replies are passed via the stream after this.
+        self.reply_to_request(req, event.Reply(result=stream))
+
+    def _send_part(self, si, part, msgs, atomic):
+        datapath = si.datapath
+        ofp = datapath.ofproto
+        parser = datapath.ofproto_parser
+        if atomic and hasattr(parser, 'OFPBundleCtrlMsg'):
+            si.bundle_id = (si.bundle_id + 1) & 0xffffffff
+            flags = ofp.OFPBF_ATOMIC | ofp.OFPBF_ORDERED
+            msgs = ([parser.OFPBundleCtrlMsg(datapath, si.bundle_id,
+                                             ofp.OFPBCT_OPEN_REQUEST,
+                                             flags, [])] +
+                    [parser.OFPBundleAddMsg(datapath, si.bundle_id, flags,
+                                            msg, []) for msg in msgs] +
+                    [parser.OFPBundleCtrlMsg(datapath, si.bundle_id,
+                                             ofp.OFPBCT_COMMIT_REQUEST,
+                                             flags, [])])
+        for msg in msgs:
+            datapath.set_xid(msg)
+            si.xids[msg.xid] = part
+            si.results[msg.xid] = part
+            part.xids.append(msg.xid)
+            datapath.send_msg(msg)
+        barrier = parser.OFPBarrierRequest(datapath)
+        datapath.set_xid(barrier)
+        si.barriers[barrier.xid] = part.xids[0]
+        datapath.send_msg(barrier)
+
+    @set_ev_cls(event.SendFlowModsRequest, MAIN_DISPATCHER)
+    def _handle_send_flow_mods(self, req):
+        dps = []
+        msgs = {}
+        for msg in req.msgs:
+            datapath = msg.datapath
+            if datapath.id not in msgs:
+                dps.append(datapath)
+                msgs[datapath.id] = []
+            msgs[datapath.id].append(msg)
+        batch = _FlowModBatch(msgs.keys())
+        for datapath in dps:
+            si = self._switches.get(datapath.id)
+            if si is None or si.datapath is not datapath:
+                batch._complete(datapath.id)
+                continue
+            self._send_part(si, _BatchPart(batch, datapath.id),
+                            msgs[datapath.id], req.atomic)
+        self.reply_to_request(req, event.Reply(result=batch))
+
     @set_ev_cls(ofp_event.EventOFPBarrierReply, MAIN_DISPATCHER)
     def _handle_barrier(self, ev):
         msg = ev.msg
@@ -145,6 +369,15 @@ class OfctlService(app_manager.RyuApp):
             return
         result = si.results.pop(xid)
         req = si.xids.pop(xid)
+        if isinstance(result, _BatchPart):
+            for xid in result.xids:
+                si.results.pop(xid, None)
+                si.xids.pop(xid, None)
+            result.batch._complete(result.dpid, result.errors)
+            return
+        if isinstance(result, _ReplyStream):
+            result.close()
+            return
         if req.reply_cls is not None:
             self._unobserve_msg(req.reply_cls)
         if any(self._is_error(r) for r in result):
@@ -174,12 +407,22 @@ class OfctlService(app_manager.RyuApp):
         except KeyError:
             self.logger.error('unknown error xid %s' % (msg.xid,))
             return
+        if isinstance(req, _BatchPart):
+            req.append(msg)
+            return
         if ((not isinstance(ev, ofp_event.EventOFPErrorMsg)) and
            (req.reply_cls is None or not isinstance(ev.msg, req.reply_cls))):
             self.logger.error('unexpected reply %s for xid %s' %
                               (ev, msg.xid,))
             return
         try:
-            si.results[msg.xid].append(ev.msg)
+            result = si.results[msg.xid]
         except KeyError:
             self.logger.error('unknown error xid %s' % (msg.xid,))
+            return
+        if isinstance(result, _ReplyStream):
+            # the stream observes the replies by itself.
+            if self._is_error(ev.msg):
+                result.fail(exception.OFError(result=[ev.msg]))
+            return
+        result.append(ev.msg)
@@ -29,11 +29,33 @@ from ryu.ofproto import ofproto_v1_3
 from ryu.lib import ofctl_v1_0
 from ryu.lib import ofctl_v1_2
 from ryu.lib import ofctl_v1_3
+from ryu.lib import hub
 from ryu.app.wsgi import ControllerBase, WSGIApplication
 
 
 LOG = logging.getLogger('ryu.app.ofctl_rest')
 
+_OFCTL = {
+    ofproto_v1_0.OFP_VERSION: ofctl_v1_0,
+    ofproto_v1_2.OFP_VERSION: ofctl_v1_2,
+    ofproto_v1_3.OFP_VERSION: ofctl_v1_3,
+}
+
+# the stats retrieved from all the switches at once, and the functions
+# of ofctl for them
+_ALL_STATS = {
+    'desc': 'get_desc_stats',
+    'flow': 'get_flow_stats',
+    'port': 'get_port_stats',
+    'meterfeatures': 'get_meter_features',
+    'meterconfig': 'get_meter_config',
+    'meter': 'get_meter_stats',
+    'groupfeatures': 'get_group_features',
+    'groupdesc': 'get_group_desc',
+    'group': 'get_group_stats',
+    'portdesc': 'get_port_desc',
+}
+
 # REST API
 #
 
@@ -74,6 +96,13 @@ LOG = logging.getLogger('ryu.app.ofctl_rest')
 #
 # get ports description of the switch
 # GET /stats/portdesc/<dpid>
+#
+# get the stats of all the switches at once
+# GET /stats/<desc|flow|port|meterfeatures|meterconfig|meter|
+#             groupfeatures|groupdesc|group|portdesc>[?timeout=<seconds>]
+# POST /stats/flow[?timeout=<seconds>]
+# (the reply is {"stats": {<dpid>: ...}, "timeout": [<dpid>, ...],
+#  "unsupported": [<dpid>, ...]})
 
 # Update the switch stats
 #
@@ -121,6 +150,62 @@ LOG = logging.getLogger('ryu.app.ofctl_rest')
 # POST /stats/experimenter/<dpid>
 
 
+class _Waiters(object):
+    """Waiters given to ofctl for a datapath, which keep the locks of
+    the requests to tell if the datapath replied to all of them.
+    """
+
+    def __init__(self, waiters):
+        self.waiters = waiters
+        self.locks = []
+        self._per_dp = None
+
+    def setdefault(self, dpid, default):
+        self._per_dp = self.waiters.setdefault(dpid, default)
+        return self
+
+    def __setitem__(self, xid, value):
+        self.locks.append(value[0])
+        self._per_dp[xid] = value
+
+    def __delitem__(self, xid):
+        del self._per_dp[xid]
+
+
+def collect_stats(dps, get_stats, waiters, timeout):
+    """Calls get_stats(dp, waiters), a function of ofctl, for all the
+    datapaths at once.
+
+    Returns a dict merged from the results of the datapaths which
+    replied in timeout seconds, and a list of the dpids of the others.
+    The datapaths also time out after ofctl's DEFAULT_TIMEOUT.
+    """
+    stats = {}
+    timed_out = []
+    done = set()
+
+    def _collect(dp):
+        dp_waiters = _Waiters(waiters)
+        result = get_stats(dp, dp_waiters)
+        if all(lock.is_set() for lock in dp_waiters.locks):
+            stats.update(result)
+        else:
+            timed_out.append(dp.id)
+        done.add(dp.id)
+
+    threads = [hub.spawn(_collect, dp) for dp in dps]
+    try:
+        with hub.Timeout(timeout):
+            hub.joinall(threads)
+    except hub.Timeout:
+        pass
+    for dp, thread in zip(dps, threads):
+        if dp.id not in done:
+            hub.kill(thread)
+            timed_out.append(dp.id)
+    return stats, sorted(timed_out)
+
+
 class StatsController(ControllerBase):
     def __init__(self, req, link, data, **config):
         super(StatsController, self).__init__(req, link, data, **config)
@@ -324,6 +409,43 @@ class StatsController(ControllerBase):
         body = json.dumps(groups)
         return Response(content_type='application/json', body=body)
 
+    def get_all_stats(self, req, stats, **_kwargs):
+        args = []
+        if stats == 'flow':
+            if req.body == '':
+                flow = {}
+            else:
+                try:
+                    flow = eval(req.body)
+                except SyntaxError:
+                    LOG.debug('invalid syntax %s', req.body)
+                    return Response(status=400)
+            args.append(flow)
+        try:
+            timeout = float(req.GET.get('timeout',
+                                        ofctl_v1_3.DEFAULT_TIMEOUT))
+        except ValueError:
+            return Response(status=400)
+
+        name = _ALL_STATS[stats]
+        dps = []
+        unsupported = []
+        for dpid, dp in self.dpset.get_all():
+            if hasattr(_OFCTL.get(dp.ofproto.OFP_VERSION), name):
+                dps.append(dp)
+            else:
+                unsupported.append(dpid)
+
+        def get_stats(dp, waiters):
+            ofctl = _OFCTL[dp.ofproto.OFP_VERSION]
+            return getattr(ofctl, name)(dp, waiters, *args)
+
+        result, timed_out = collect_stats(dps, get_stats, self.waiters,
+                                          timeout)
+        body = json.dumps({'stats': result, 'timeout': timed_out,
+                           'unsupported': sorted(unsupported)})
+        return (Response(content_type='application/json', body=body))
+
     def mod_flow_entry(self, req, cmd, **_kwargs):
         try:
             flow = eval(req.body)
@@ -520,6 +642,7 @@ class RestStatsApi(app_manager.RyuApp):
         'dpset': dpset.DPSet,
         'wsgi': WSGIApplication
     }
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(RestStatsApi, self).__init__(*args, **kwargs)
@@ -588,6 +711,12 @@ class RestStatsApi(app_manager.RyuApp):
                        controller=StatsController, action='get_port_desc',
                        conditions=dict(method=['GET']))
 
+        for stats in _ALL_STATS:
+            methods = ['GET', 'POST'] if stats == 'flow' else ['GET']
+            mapper.connect('stats', path + '/' + stats,
+                           controller=StatsController, action='get_all_stats',
+                           stats=stats, conditions=dict(method=methods))
+
         uri = path + '/flowentry/{cmd}'
         mapper.connect('stats', uri,
                        controller=StatsController, action='mod_flow_entry',
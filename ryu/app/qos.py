@@ -256,6 +256,7 @@ class RestQoSAPI(app_manager.RyuApp):
         'dpset': dpset.DPSet,
         'conf_switch': conf_switch.ConfSwitchSet,
         'wsgi': WSGIApplication}
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(RestQoSAPI, self).__init__(*args, **kwargs)
@@ -211,6 +211,7 @@ class RestAPI(app_manager.RyuApp):
         'network': network.Network,
         'wsgi': WSGIApplication
     }
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(RestAPI, self).__init__(*args, **kwargs)
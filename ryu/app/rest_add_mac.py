@@ -15,6 +15,7 @@ url = '/simpleswitch/mactable/{dpid}'
 class SimpleSwitchRest13(simple_switch_13.SimpleSwitch13):
 
     _CONTEXTS = { 'wsgi': WSGIApplication }
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(SimpleSwitchRest13, self).__init__(*args, **kwargs)
@@ -203,6 +203,7 @@ class RestFirewallAPI(app_manager.RyuApp):
 
     _CONTEXTS = {'dpset': dpset.DPSet,
                  'wsgi': WSGIApplication}
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(RestFirewallAPI, self).__init__(*args, **kwargs)
@@ -100,6 +100,7 @@ class QuantumIfaceAPI(app_manager.RyuApp):
         'quantum_ifaces': quantum_ifaces.QuantumIfaces,
         'wsgi': WSGIApplication,
     }
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(QuantumIfaceAPI, self).__init__(*args, **kwargs)
@@ -212,6 +212,7 @@ class RestRouterAPI(app_manager.RyuApp):
 
     _CONTEXTS = {'dpset': dpset.DPSet,
                  'wsgi': WSGIApplication}
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(RestRouterAPI, self).__init__(*args, **kwargs)
@@ -1163,25 +1164,24 @@ class VlanRouter(object):
         src_ip = header_list[ARP].src_ip
 
         gateway_flg = False
-        for key, value in self.routing_tbl.items():
-            if value.gateway_ip == src_ip:
-                gateway_flg = True
-                if value.gateway_mac == src_mac:
-                    continue
-                self.routing_tbl[key].gateway_mac = src_mac
-
-                cookie = self._id_to_cookie(REST_ROUTEID, value.route_id)
-                priority, log_msg = self._get_priority(PRIORITY_TYPE_ROUTE,
-                                                       route=value)
-                self.ofctl.set_routing_flow(cookie, priority, out_port,
-                                            dl_vlan=self.vlan_id,
-                                            src_mac=dst_mac,
-                                            dst_mac=src_mac,
-                                            nw_dst=value.dst_ip,
-                                            dst_mask=value.netmask,
-                                            dec_ttl=True)
-                self.logger.info('Set %s flow [cookie=0x%x]', log_msg, cookie,
-                                 extra=self.sw_id)
+        for value in self.routing_tbl.get_routes(src_ip):
+            gateway_flg = True
+            if value.gateway_mac == src_mac:
+                continue
+            self.routing_tbl.set_gateway_mac(value, src_mac)
+
+            cookie = self._id_to_cookie(REST_ROUTEID, value.route_id)
+            priority, log_msg = self._get_priority(PRIORITY_TYPE_ROUTE,
+                                                   route=value)
+            self.ofctl.set_routing_flow(cookie, priority, out_port,
+                                        dl_vlan=self.vlan_id,
+                                        src_mac=dst_mac,
+                                        dst_mac=src_mac,
+                                        nw_dst=value.dst_ip,
+                                        dst_mask=value.netmask,
+                                        dec_ttl=True)
+            self.logger.info('Set %s flow [cookie=0x%x]', log_msg, cookie,
+                             extra=self.sw_id)
         return gateway_flg
 
     def _learning_host_mac(self, msg, header_list):
@@ -1247,10 +1247,56 @@ class Port(object):
         self.mac = hw_addr
 
 
+class PrefixTrie(object):
+    """A binary trie of IPv4 prefixes for the longest prefix match."""
+
+    def __init__(self):
+        super(PrefixTrie, self).__init__()
+        self.root = [None, None, None]  # [child 0, child 1, value]
+
+    def insert(self, addr, prefix_len, value):
+        node = self.root
+        for i in xrange(prefix_len):
+            bit = (addr >> (31 - i)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        node[2] = value
+
+    def delete(self, addr, prefix_len):
+        path = []
+        node = self.root
+        for i in xrange(prefix_len):
+            bit = (addr >> (31 - i)) & 1
+            if node[bit] is None:
+                return
+            path.append((node, bit))
+            node = node[bit]
+        node[2] = None
+        # prune the nodes left empty.
+        while path and node == [None, None, None]:
+            parent, bit = path.pop()
+            parent[bit] = None
+            node = parent
+
+    def longest_match(self, addr):
+        node = self.root
+        match = node[2]
+        for i in xrange(32):
+            node = node[(addr >> (31 - i)) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                match = node[2]
+        return match
+
+
 class AddressData(dict):
     def __init__(self):
         super(AddressData, self).__init__()
         self.address_id = 1
+        self._ids = {}  # address_id -> key
+        self._trie = PrefixTrie()
 
     def add(self, address):
         err_msg = 'Invalid [%s] value.' % REST_ADDRESS
@@ -1270,6 +1316,8 @@ class AddressData(dict):
         ip_str = ip_addr_ntoa(nw_addr)
         key = '%s/%d' % (ip_str, mask)
         self[key] = address
+        self._ids[address.address_id] = key
+        self._trie.insert(ipv4_text_to_int(nw_addr), mask, address)
 
         self.address_id += 1
         self.address_id &= UINT32_MAX
@@ -1279,24 +1327,24 @@ class AddressData(dict):
         return address
 
     def delete(self, address_id):
-        for key, value in self.items():
-            if value.address_id == address_id:
-                del self[key]
-                return
+        key = self._ids.pop(address_id, None)
+        if key is not None:
+            address = self.pop(key)
+            self._trie.delete(ipv4_text_to_int(address.nw_addr),
+                              address.netmask)
 
     def get_default_gw(self):
         return [address.default_gw for address in self.values()]
 
     def get_data(self, addr_id=None, ip=None):
-        for address in self.values():
-            if addr_id is not None:
-                if addr_id == address.address_id:
-                    return address
-            else:
-                assert ip is not None
-                if ipv4_apply_mask(ip, address.netmask) == address.nw_addr:
-                    return address
-        return None
+        if addr_id is not None:
+            key = self._ids.get(addr_id)
+            if key is None:
+                return None
+            return self[key]
+        assert ip is not None
+        # the addresses do not overlap, so the match is the only one.
+        return self._trie.longest_match(ipv4_text_to_int(ip))
 
 
 class Address(object):
@@ -1315,6 +1363,10 @@ class RoutingTable(dict):
     def __init__(self):
         super(RoutingTable, self).__init__()
         self.route_id = 1
+        self._ids = {}          # route_id -> key
+        self._gateway_ips = {}  # gateway_ip -> {route_id: Route}
+        self._gateway_macs = {}  # gateway_mac -> {route_id: Route}
+        self._trie = PrefixTrie()
 
     def add(self, dst_nw_addr, gateway_ip):
         err_msg = 'Invalid [%s] value.'
@@ -1328,22 +1380,20 @@ class RoutingTable(dict):
 
         gateway_ip = ip_addr_aton(gateway_ip, err_msg=err_msg % REST_GATEWAY)
 
-        # Check overlaps
-        overlap_route = None
-        if dst_nw_addr == DEFAULT_ROUTE:
-            if DEFAULT_ROUTE in self:
-                overlap_route = self[DEFAULT_ROUTE].route_id
-        elif dst_nw_addr in self:
-            overlap_route = self[dst_nw_addr].route_id
-
-        if overlap_route is not None:
-            msg = 'Destination overlaps [route_id=%d]' % overlap_route
+        # Check overlaps with the normalized key,
+        # e.g. '10.0.0.0/24' for '10.0.0.1/24'
+        ip_str = ip_addr_ntoa(dst_ip)
+        key = '%s/%d' % (ip_str, netmask)
+        if key in self:
+            msg = 'Destination overlaps [route_id=%d]' % self[key].route_id
             raise CommandFailure(msg=msg)
 
         routing_data = Route(self.route_id, dst_ip, netmask, gateway_ip)
-        ip_str = ip_addr_ntoa(dst_ip)
-        key = '%s/%d' % (ip_str, netmask)
         self[key] = routing_data
+        self._ids[routing_data.route_id] = key
+        self._gateway_ips.setdefault(gateway_ip, {})[
+            routing_data.route_id] = routing_data
+        self._trie.insert(ipv4_text_to_int(dst_ip), netmask, routing_data)
 
         self.route_id += 1
         self.route_id &= UINT32_MAX
@@ -1353,34 +1403,44 @@ class RoutingTable(dict):
         return routing_data
 
     def delete(self, route_id):
-        for key, value in self.items():
-            if value.route_id == route_id:
-                del self[key]
-                return
+        key = self._ids.pop(route_id, None)
+        route = self.get(key)
+        if route is None or route.route_id != route_id:
+            return
+        del self[key]
+        self._trie.delete(ipv4_text_to_int(route.dst_ip), route.netmask)
+        self._unindex(self._gateway_ips, route.gateway_ip, route)
+        self._unindex(self._gateway_macs, route.gateway_mac, route)
+
+    @staticmethod
+    def _unindex(index, value, route):
+        routes = index.get(value)
+        if routes is not None:
+            routes.pop(route.route_id, None)
+            if not routes:
+                del index[value]
+
+    def set_gateway_mac(self, route, gateway_mac):
+        self._unindex(self._gateway_macs, route.gateway_mac, route)
+        route.gateway_mac = gateway_mac
+        self._gateway_macs.setdefault(gateway_mac, {})[
+            route.route_id] = route
 
     def get_gateways(self):
         return [routing_data.gateway_ip for routing_data in self.values()]
 
+    def get_routes(self, gateway_ip):
+        return self._gateway_ips.get(gateway_ip, {}).values()
+
     def get_data(self, gw_mac=None, dst_ip=None):
         if gw_mac is not None:
-            for route in self.values():
-                if gw_mac == route.gateway_mac:
-                    return route
-            return None
+            routes = self._gateway_macs.get(gw_mac)
+            if not routes:
+                return None
+            return next(routes.itervalues())
 
         elif dst_ip is not None:
-            get_route = None
-            mask = 0
-            for route in self.values():
-                if ipv4_apply_mask(dst_ip, route.netmask) == route.dst_ip:
-                    # For longest match
-                    if mask < route.netmask:
-                        get_route = route
-                        mask = route.netmask
-
-            if get_route is None:
-                get_route = self.get(DEFAULT_ROUTE, None)
-            return get_route
+            return self._trie.longest_match(ipv4_text_to_int(dst_ip))
         else:
             return None
 
@@ -43,6 +43,7 @@ class TopologyAPI(app_manager.RyuApp):
     _CONTEXTS = {
         'wsgi': WSGIApplication
     }
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(TopologyAPI, self).__init__(*args, **kwargs)
@@ -165,6 +165,7 @@ class TunnelAPI(app_manager.RyuApp):
         'tunnels': tunnels.Tunnels,
         'wsgi': WSGIApplication
     }
+    _GLOBAL = True
 
     def __init__(self, *_args, **kwargs):
         super(TunnelAPI, self).__init__()
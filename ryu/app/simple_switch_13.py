@@ -18,7 +18,6 @@ from ryu.controller import ofp_event
 from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER
 from ryu.controller.handler import set_ev_cls
 from ryu.ofproto import ofproto_v1_3
-from ryu.lib.packet import packet
 from ryu.lib.packet import ethernet
 
 
@@ -67,7 +66,7 @@ class SimpleSwitch13(app_manager.RyuApp):
         parser = datapath.ofproto_parser
         in_port = msg.match['in_port']
 
-        pkt = packet.Packet(msg.data)
+        pkt = ev.pkt_headers
         eth = pkt.get_protocols(ethernet.ethernet)[0]
 
         dst = eth.dst
@@ -62,6 +62,7 @@ class SimpleSwitchWebSocket13(simple_switch_13.SimpleSwitch13):
     _CONTEXTS = {
         'wsgi': WSGIApplication,
     }
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(SimpleSwitchWebSocket13, self).__init__(*args, **kwargs)
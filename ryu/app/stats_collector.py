@@ -0,0 +1,311 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A service which polls the switches for statistics on behalf of other
+applications.
+
+Applications subscribe to a type of statistics of a switch, or of all
+the switches, with an interval:
+
+    _CONTEXTS = {'stats_collector': stats_collector.StatsCollector}
+
+    def __init__(self, *args, **kwargs):
+        ...
+        collector = kwargs['stats_collector']
+        collector.subscribe(self.name, None, 'port', 10)
+
+    @set_ev_cls(stats_collector.EventStats)
+    def _stats_handler(self, ev):
+        for port_no, deltas in ev.deltas.items():
+            ...
+
+The subscriptions to the same statistics of a switch are polled with
+one request at the shortest of their intervals, and every subscriber
+receives EventStats of every reply.  The last replies are cached, so
+that they can be read by get_stats() without a request.
+"""
+
+import heapq
+import time
+
+from ryu.base import app_manager
+from ryu.controller import event
+from ryu.controller import ofp_event
+from ryu.controller.handler import MAIN_DISPATCHER, DEAD_DISPATCHER
+from ryu.controller.handler import set_ev_cls
+from ryu.lib import hub
+from ryu.ofproto import ofproto_v1_0
+
+
+def _port_stats_request(dp):
+    if dp.ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
+        return dp.ofproto_parser.OFPPortStatsRequest(dp, 0,
+                                                     dp.ofproto.OFPP_NONE)
+    return dp.ofproto_parser.OFPPortStatsRequest(dp)
+
+
+def _flow_stats_request(dp):
+    if dp.ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
+        parser = dp.ofproto_parser
+        return parser.OFPFlowStatsRequest(dp, 0, parser.OFPMatch(), 0xff,
+                                          dp.ofproto.OFPP_NONE)
+    return dp.ofproto_parser.OFPFlowStatsRequest(dp)
+
+
+def _flow_key(stats):
+    match = stats.match
+    if hasattr(match, 'iteritems'):
+        fields = tuple(sorted(match.iteritems()))
+    else:
+        # OpenFlow 1.0
+        fields = str(match)
+    return (stats.table_id, stats.priority, stats.cookie, fields)
+
+
+class _StatsType(object):
+    def __init__(self, request, key, counters):
+        self.request = request  # dp -> stats request message
+        self.key = key          # stats entry -> key of deltas
+        self.counters = counters
+
+
+STATS_TYPES = {
+    'port': _StatsType(_port_stats_request, lambda stats: stats.port_no,
+                       ('rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes',
+                        'rx_dropped', 'tx_dropped', 'rx_errors',
+                        'tx_errors')),
+    'flow': _StatsType(_flow_stats_request, _flow_key,
+                       ('packet_count', 'byte_count')),
+}
+
+
+class EventStats(event.EventBase):
+    """The statistics of a switch polled for the subscribers.
+
+    ================ =====================================================
+    Attribute        Description
+    ================ =====================================================
+    dpid             Datapath ID.
+    stats_type       'port' or 'flow'.
+    timestamp        The time when the last reply was received.
+    period           Seconds since the previous poll, or None.
+    body             A list of the stats entries, e.g. OFPPortStats.
+    deltas           A dict of the key of an entry -> the tuple of the
+                     increase of its counters since the previous poll.
+                     The key is port_no for 'port', and (table_id,
+                     priority, cookie, match) for 'flow'.  The counters
+                     are in STATS_TYPES[stats_type].counters.
+    ================ =====================================================
+
+    The deltas of a new entry are its counters.
+    """
+
+    def __init__(self, dpid, stats_type, timestamp, period, body, deltas):
+        super(EventStats, self).__init__()
+        self.dpid = dpid
+        self.stats_type = stats_type
+        self.timestamp = timestamp
+        self.period = period
+        self.body = body
+        self.deltas = deltas
+
+
+class _Poll(object):
+    """The state of polling a type of statistics of a switch."""
+
+    def __init__(self):
+        self.interval = None
+        self.due = None
+        self.xid = None      # the xid of the request being replied
+        self.msgs = []       # the replies received so far
+        self.timestamp = None
+        self.body = None
+        self.counters = {}   # key -> counters of the last reply
+
+
+class StatsCollector(app_manager.RyuApp):
+    _EVENTS = [EventStats]
+
+    def __init__(self, *args, **kwargs):
+        super(StatsCollector, self).__init__(*args, **kwargs)
+        self.name = 'stats_collector'
+        self.datapaths = {}
+        # (dpid or None for all, stats type) -> {app name: interval}
+        self.subscriptions = {}
+        self.polls = {}      # (dpid, stats type) -> _Poll
+        self._schedule = []  # heap of (due, dpid, stats type)
+        self._wakeup = hub.Event()
+
+    def start(self):
+        super(StatsCollector, self).start()
+        return hub.spawn(self._poll_loop)
+
+    def subscribe(self, name, dpid, stats_type, interval):
+        """Polls the statistics of the switch, or of all the switches if
+        dpid is None, at most every interval seconds and sends
+        EventStats to the application of name.
+        """
+        assert stats_type in STATS_TYPES
+        self.subscriptions.setdefault((dpid, stats_type), {})[name] = interval
+        self._reschedule(dpid, stats_type)
+
+    def unsubscribe(self, name, dpid, stats_type):
+        subscribers = self.subscriptions.get((dpid, stats_type), {})
+        subscribers.pop(name, None)
+        if not subscribers:
+            self.subscriptions.pop((dpid, stats_type), None)
+        self._reschedule(dpid, stats_type)
+
+    def get_stats(self, dpid, stats_type, ttl):
+        """Returns (timestamp, body) of the last reply if it was received
+        in ttl seconds, or None.
+        """
+        poll = self.polls.get((dpid, stats_type))
+        if poll is None or poll.body is None:
+            return None
+        if time.time() - poll.timestamp > ttl:
+            return None
+        return poll.timestamp, poll.body
+
+    def _subscribers(self, dpid, stats_type):
+        subscribers = dict(self.subscriptions.get((None, stats_type), {}))
+        for name, interval in self.subscriptions.get((dpid, stats_type),
+                                                     {}).iteritems():
+            subscribers[name] = min(interval,
+                                    subscribers.get(name, interval))
+        return subscribers
+
+    def _reschedule(self, dpid, stats_type):
+        # updates the interval of the polls of the subscription.
+        if dpid is None:
+            dpids = self.datapaths.keys()
+        else:
+            dpids = [dpid]
+        now = time.time()
+        for dpid in dpids:
+            key = (dpid, stats_type)
+            subscribers = self._subscribers(dpid, stats_type)
+            if not subscribers or dpid not in self.datapaths:
+                poll = self.polls.get(key)
+                if poll is not None:
+                    poll.interval = poll.due = None
+                continue
+            poll = self.polls.setdefault(key, _Poll())
+            poll.interval = min(subscribers.values())
+            due = now
+            if poll.timestamp is not None:
+                due = max(now, poll.timestamp + poll.interval)
+            if poll.due is None or due < poll.due:
+                poll.due = due
+                heapq.heappush(self._schedule, (due, dpid, stats_type))
+                self._wakeup.set()
+
+    def _poll_loop(self):
+        while self.is_active:
+            self._wakeup.clear()
+            self._wakeup.wait(self._poll(time.time()))
+
+    def _poll(self, now):
+        # sends the requests due, and returns the seconds until the next.
+        schedule = self._schedule
+        while schedule and schedule[0][0] <= now:
+            due, dpid, stats_type = heapq.heappop(schedule)
+            poll = self.polls.get((dpid, stats_type))
+            if poll is None or poll.due != due:
+                # rescheduled or unsubscribed
+                continue
+            dp = self.datapaths[dpid]
+            req = STATS_TYPES[stats_type].request(dp)
+            dp.set_xid(req)
+            # the replies to the previous request are dropped if any.
+            poll.xid = req.xid
+            poll.msgs = []
+            dp.send_msg(req)
+            poll.due = now + poll.interval
+            heapq.heappush(schedule, (poll.due, dpid, stats_type))
+        if schedule:
+            return schedule[0][0] - now
+        return None
+
+    @set_ev_cls(ofp_event.EventOFPStateChange,
+                [MAIN_DISPATCHER, DEAD_DISPATCHER])
+    def _state_change_handler(self, ev):
+        dp = ev.datapath
+        if ev.state == MAIN_DISPATCHER:
+            self.datapaths[dp.id] = dp
+            for dpid, stats_type in self.subscriptions.keys():
+                if dpid is None or dpid == dp.id:
+                    self._reschedule(dp.id, stats_type)
+        elif ev.state == DEAD_DISPATCHER:
+            if self.datapaths.pop(dp.id, None) is None:
+                return
+            for stats_type in STATS_TYPES:
+                self.polls.pop((dp.id, stats_type), None)
+
+    @set_ev_cls(ofp_event.EventOFPPortStatsReply, MAIN_DISPATCHER)
+    def _port_stats_reply_handler(self, ev):
+        self._stats_reply(ev.msg, 'port')
+
+    @set_ev_cls(ofp_event.EventOFPFlowStatsReply, MAIN_DISPATCHER)
+    def _flow_stats_reply_handler(self, ev):
+        self._stats_reply(ev.msg, 'flow')
+
+    def _stats_reply(self, msg, stats_type):
+        dpid = msg.datapath.id
+        poll = self.polls.get((dpid, stats_type))
+        if poll is None or poll.xid != msg.xid:
+            # a reply to another application or a stale one
+            return
+        poll.msgs.append(msg)
+        ofp = msg.datapath.ofproto
+        more = getattr(ofp, 'OFPMPF_REPLY_MORE', None)
+        if more is None:
+            more = ofp.OFPSF_REPLY_MORE
+        if msg.flags & more:
+            return
+
+        body = []
+        for m in poll.msgs:
+            body.extend(m.body)
+        poll.xid = None
+        poll.msgs = []
+        self._update(dpid, stats_type, poll, time.time(), body)
+
+    def _update(self, dpid, stats_type, poll, now, body):
+        spec = STATS_TYPES[stats_type]
+        counters = {}
+        deltas = {}
+        prev = poll.counters
+        for stats in body:
+            key = spec.key(stats)
+            values = tuple(getattr(stats, name) for name in spec.counters)
+            counters[key] = values
+            old = prev.get(key)
+            if old is None:
+                deltas[key] = values
+            else:
+                deltas[key] = tuple(v - o for v, o in zip(values, old))
+
+        period = None
+        if poll.timestamp is not None:
+            period = now - poll.timestamp
+        poll.timestamp = now
+        poll.body = body
+        poll.counters = counters
+
+        ev = EventStats(dpid, stats_type, now, period, body, deltas)
+        for name in self._subscribers(dpid, stats_type):
+            self.send_event(name, ev)
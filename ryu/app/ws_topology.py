@@ -54,6 +54,7 @@ class WebSocketTopology(app_manager.RyuApp):
         'wsgi': WSGIApplication,
         'switches': switches.Switches,
     }
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(WebSocketTopology, self).__init__(*args, **kwargs)
@@ -33,6 +33,7 @@ from ryu import cfg
 from ryu import utils
 from ryu.app import wsgi
 from ryu.controller.handler import register_instance, get_dependent_services
+from ryu.controller.handler import compile_handlers, compile_observers
 from ryu.controller.controller import Datapath
 from ryu.controller import event
 from ryu.controller.event import EventRequestBase, EventReplyBase
@@ -144,6 +145,22 @@ class RyuApp(object):
     the intersection of their OFP_VERSIONS is used.
     """
 
+    _GLOBAL = False
+    """
+    Whether this RyuApp runs only in the master process when
+    ryu-manager shards switch connections among worker processes.
+    (Cf. --ofp-workers)
+
+    By default a RyuApp, e.g. simple_switch_13, is instantiated in every
+    worker and sees only the datapaths connected to the worker.
+    A global RyuApp is instantiated once, in the master process.  It
+    receives OpenFlow events of all the workers over IPC, and messages it
+    sends to a datapath are relayed to the worker which owns it.
+    A RyuApp which requires a global one, e.g. a consumer of
+    ryu.topology, is global as well.  WSGI is served only by the master,
+    so a RyuApp using it must be global.
+    """
+
     @classmethod
     def context_iteritems(cls):
         """
@@ -156,6 +173,11 @@ class RyuApp(object):
         self.name = self.__class__.__name__
         self.event_handlers = {}        # ev_cls -> handlers:list
         self.observers = {}     # ev_cls -> observer-name -> states:set
+        # dispatch tables compiled from event_handlers and observers.
+        # they are flushed whenever a handler or an observer is
+        # (un)registered.
+        self._handlers_table = {}   # (ev_cls, state) -> handlers:tuple
+        self._observers_table = {}  # (ev_cls, state) -> observer-names:tuple
         self.threads = []
         self.events = hub.Queue(128)
         if hasattr(self.__class__, 'LOGGER_NAME'):
@@ -185,25 +207,30 @@ class RyuApp(object):
         assert callable(handler)
         self.event_handlers.setdefault(ev_cls, [])
         self.event_handlers[ev_cls].append(handler)
+        self._handlers_table.clear()
 
     def unregister_handler(self, ev_cls, handler):
         assert callable(handler)
         self.event_handlers[ev_cls].remove(handler)
         if not self.event_handlers[ev_cls]:
             del self.event_handlers[ev_cls]
+        self._handlers_table.clear()
 
     def register_observer(self, ev_cls, name, states=None):
         states = states or set()
         ev_cls_observers = self.observers.setdefault(ev_cls, {})
         ev_cls_observers.setdefault(name, set()).update(states)
+        self._observers_table.clear()
 
     def unregister_observer(self, ev_cls, name):
         observers = self.observers.get(ev_cls, {})
         observers.pop(name)
+        self._observers_table.clear()
 
     def unregister_observer_all_event(self, name):
         for observers in self.observers.values():
             observers.pop(name, None)
+        self._observers_table.clear()
 
     def observe_event(self, ev_cls, states=None):
         brick = _lookup_service_brick_by_ev_cls(ev_cls)
@@ -216,7 +243,7 @@ class RyuApp(object):
             brick.unregister_observer(ev_cls, self.name)
 
     def get_handlers(self, ev, state=None):
-        """Returns a list of handlers for the specific event.
+        """Returns a tuple of handlers for the specific event.
 
         :param ev: The event to handle.
         :param state: The current state. ("dispatcher")
@@ -226,29 +253,25 @@ class RyuApp(object):
                       The default is None.
         """
         ev_cls = ev.__class__
-        handlers = self.event_handlers.get(ev_cls, [])
-        if state is None:
-            return handlers
-
-        def test(h):
-            if not hasattr(h, 'callers') or ev_cls not in h.callers:
-                # dynamically registered handlers does not have
-                # h.callers element for the event.
-                return True
-            states = h.callers[ev_cls].dispatchers
-            if not states:
-                # empty states means all states
-                return True
-            return state in states
-
-        return filter(test, handlers)
+        key = (ev_cls, state)
+        try:
+            return self._handlers_table[key]
+        except KeyError:
+            pass
+        handlers = compile_handlers(self.event_handlers.get(ev_cls, []),
+                                    ev_cls, state)
+        self._handlers_table[key] = handlers
+        return handlers
 
     def get_observers(self, ev, state):
-        observers = []
-        for k, v in self.observers.get(ev.__class__, {}).iteritems():
-            if not state or not v or state in v:
-                observers.append(k)
-
+        ev_cls = ev.__class__
+        key = (ev_cls, state)
+        try:
+            return self._observers_table[key]
+        except KeyError:
+            pass
+        observers = compile_observers(self.observers.get(ev_cls, {}), state)
+        self._observers_table[key] = observers
         return observers
 
     def send_request(self, req):
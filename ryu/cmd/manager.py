@@ -40,6 +40,7 @@ from ryu import version
 from ryu.app import wsgi
 from ryu.base.app_manager import AppManager
 from ryu.controller import controller
+from ryu.controller import ofp_worker
 from ryu.topology import switches
 
 CONF = cfg.CONF
@@ -73,6 +74,9 @@ def main(args=None, prog=None):
     if not app_lists:
         app_lists = ['ryu.controller.ofp_handler']
 
+    if CONF.ofp_workers > 1:
+        app_lists = ofp_worker.fork_workers(app_lists)
+
     app_mgr = AppManager.get_instance()
     app_mgr.load_apps(app_lists)
     contexts = app_mgr.create_contexts()
@@ -80,7 +84,8 @@ def main(args=None, prog=None):
     services.extend(app_mgr.instantiate_apps(**contexts))
 
     webapp = wsgi.start_service(app_mgr)
-    if webapp:
+    # WSGI is served only by the master.
+    if webapp and not ofp_worker.is_worker():
         thr = hub.spawn(webapp)
         services.append(thr)
 
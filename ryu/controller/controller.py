@@ -22,6 +22,7 @@ The main component of OpenFlow controller.
 
 """
 
+import collections
 import contextlib
 from ryu import cfg
 import logging
@@ -40,6 +41,7 @@ from ryu.ofproto import ofproto_protocol
 from ryu.ofproto import ofproto_v1_0
 from ryu.ofproto import nx_match
 
+from ryu.controller import flow_mirror
 from ryu.controller import handler
 from ryu.controller import ofp_event
 
@@ -56,7 +58,25 @@ CONF.register_cli_opts([
                help='openflow ssl listen port'),
     cfg.StrOpt('ctl-privkey', default=None, help='controller private key'),
     cfg.StrOpt('ctl-cert', default=None, help='controller certificate'),
-    cfg.StrOpt('ca-certs', default=None, help='CA certificates')
+    cfg.StrOpt('ca-certs', default=None, help='CA certificates'),
+    cfg.IntOpt('ofp-recv-chunk-size', default=64 * 1024,
+               help='size of the chunk read from a switch connection '
+                    'at once'),
+    cfg.IntOpt('ofp-send-high-watermark', default=256 * 1024,
+               help='bytes queued for a switch connection above which '
+                    'senders block until the queue is flushed'),
+    cfg.IntOpt('ofp-workers', default=1,
+               help='number of processes among which switch connections '
+                    'are sharded'),
+    cfg.BoolOpt('ofp-lazy-parse', default=False,
+                help='decode parts of received OpenFlow messages, e.g. '
+                     'match of packet-in, only when they are accessed'),
+    cfg.BoolOpt('ofp-flow-mirror', default=False,
+                help='keep a copy of the flow tables of the switches of '
+                     'OpenFlow 1.2 or later in Datapath.flow_mirror'),
+    cfg.IntOpt('ofp-flow-mirror-interval', default=60,
+               help='interval in seconds of the dumps of the flow tables '
+                    'which the flow mirrors are replaced with')
 ])
 
 
@@ -67,9 +87,12 @@ class OpenFlowController(object):
     # entry point
     def __call__(self):
         # LOG.debug('call')
+        ofproto_parser.set_lazy_parse(CONF.ofp_lazy_parse)
         self.server_loop()
 
     def server_loop(self):
+        # with multiple workers, every worker listens on the same port.
+        reuse_port = CONF.ofp_workers > 1
         if CONF.ctl_privkey is not None and CONF.ctl_cert is not None:
             if CONF.ca_certs is not None:
                 server = StreamServer((CONF.ofp_listen_host,
@@ -79,18 +102,21 @@ class OpenFlowController(object):
                                       certfile=CONF.ctl_cert,
                                       cert_reqs=ssl.CERT_REQUIRED,
                                       ca_certs=CONF.ca_certs,
-                                      ssl_version=ssl.PROTOCOL_TLSv1)
+                                      ssl_version=ssl.PROTOCOL_TLSv1,
+                                      reuse_port=reuse_port)
             else:
                 server = StreamServer((CONF.ofp_listen_host,
                                        CONF.ofp_ssl_listen_port),
                                       datapath_connection_factory,
                                       keyfile=CONF.ctl_privkey,
                                       certfile=CONF.ctl_cert,
-                                      ssl_version=ssl.PROTOCOL_TLSv1)
+                                      ssl_version=ssl.PROTOCOL_TLSv1,
+                                      reuse_port=reuse_port)
         else:
             server = StreamServer((CONF.ofp_listen_host,
                                    CONF.ofp_tcp_listen_port),
-                                  datapath_connection_factory)
+                                  datapath_connection_factory,
+                                  reuse_port=reuse_port)
 
         # LOG.debug('loop')
         server.serve_forever()
@@ -114,14 +140,29 @@ class Datapath(ofproto_protocol.ProtocolDesc):
         self.address = address
         self.is_active = True
 
-        # The limit is arbitrary. We need to limit queue size to
-        # prevent it from eating memory up
-        self.send_q = hub.Queue(16)
+        # Messages waiting to be written.  The queue is limited by bytes
+        # (CONF.ofp_send_high_watermark) to prevent it from eating memory
+        # up, and is flushed at once by _send_loop.
+        self.send_q = collections.deque()
+        self.send_q_bytes = 0
+        self._send_q_ready = hub.Event()
+        self._send_q_writable = hub.Event()
+        self._send_q_writable.set()
+        self.send_stats = {
+            'flushes': 0,
+            'flushed_msgs': 0,
+            'flushed_bytes': 0,
+            'last_batch': 0,
+            'max_batch': 0,
+        }
 
         self.xid = random.randint(0, self.ofproto.MAX_XID)
         self.id = None  # datapath_id is unknown yet
         self.ports = None
         self.flow_format = ofproto_v1_0.NXFF_OPENFLOW10
+        self.flow_mirror = None
+        if CONF.ofp_flow_mirror:
+            self.flow_mirror = flow_mirror.FlowMirror(self)
         self.ofp_brick = ryu.base.app_manager.lookup_service_brick('ofp_event')
         self.set_state(handler.HANDSHAKE_DISPATCHER)
 
@@ -130,45 +171,65 @@ class Datapath(ofproto_protocol.ProtocolDesc):
 
     def set_state(self, state):
         self.state = state
+        if state == handler.MAIN_DISPATCHER and self.flow_mirror is not None:
+            self.flow_mirror.resync.set()
         ev = ofp_event.EventOFPStateChange(self)
         ev.state = state
         self.ofp_brick.send_event_to_observers(ev, state)
 
     # Low level socket handling layer
+    def _recv_chunk(self, buf, start, end):
+        # Messages are handed to the parser as buffer objects which
+        # refer to the chunk they were received in, and they may outlive
+        # this loop (e.g. queued for the observers).  So a chunk is never
+        # overwritten; a new one is allocated when the current one is
+        # full, and only the trailing partial message is copied over.
+        size = CONF.ofp_recv_chunk_size
+        if end - start >= ofproto_common.OFP_HEADER_SIZE:
+            (version, msg_type, msg_len, xid) = ofproto_parser.header(
+                buffer(buf, start, end - start))
+            size = max(size, msg_len)
+        new_buf = bytearray(size)
+        new_buf[:end - start] = buf[start:end]
+        return new_buf
+
     @_deactivate
     def _recv_loop(self):
-        buf = bytearray()
-        required_len = ofproto_common.OFP_HEADER_SIZE
+        buf = bytearray(CONF.ofp_recv_chunk_size)
+        start = 0  # the head of the first unprocessed message
+        end = 0  # the tail of the received data
+        header_size = ofproto_common.OFP_HEADER_SIZE
 
         count = 0
         while self.is_active:
-            ret = self.socket.recv(required_len)
-            if len(ret) == 0:
+            if end == len(buf):
+                buf = self._recv_chunk(buf, start, end)
+                end -= start
+                start = 0
+            ret = self.socket.recv_into(memoryview(buf)[end:])
+            if ret == 0:
                 self.is_active = False
                 break
-            buf += ret
-            while len(buf) >= required_len:
-                (version, msg_type, msg_len, xid) = ofproto_parser.header(buf)
-                required_len = msg_len
-                if len(buf) < required_len:
+            end += ret
+            while end - start >= header_size:
+                (version, msg_type, msg_len, xid) = ofproto_parser.header(
+                    buffer(buf, start, header_size))
+                if end - start < msg_len:
                     break
 
                 msg = ofproto_parser.msg(self,
-                                         version, msg_type, msg_len, xid, buf)
+                                         version, msg_type, msg_len, xid,
+                                         buffer(buf, start, msg_len))
                 # LOG.debug('queue msg %s cls %s', msg, msg.__class__)
                 if msg:
                     ev = ofp_event.ofp_msg_to_ev(msg)
                     self.ofp_brick.send_event_to_observers(ev, self.state)
 
-                    dispatchers = lambda x: x.callers[ev.__class__].dispatchers
-                    handlers = [handler for handler in
-                                self.ofp_brick.get_handlers(ev) if
-                                self.state in dispatchers(handler)]
+                    handlers = self.ofp_brick.get_handlers(ev, self.state)
                     for handler in handlers:
                         handler(ev)
 
-                buf = buf[required_len:]
-                required_len = ofproto_common.OFP_HEADER_SIZE
+                start += msg_len
 
                 # We need to schedule other greenlets. Otherwise, ryu
                 # can't accept new switches or handle the existing
@@ -179,27 +240,51 @@ class Datapath(ofproto_protocol.ProtocolDesc):
                     count = 0
                     hub.sleep(0)
 
+    def _flush_send_q(self):
+        bufs = self.send_q
+        nbytes = self.send_q_bytes
+        self.send_q = collections.deque()
+        self.send_q_bytes = 0
+        self._send_q_ready.clear()
+
+        if len(bufs) == 1:
+            self.socket.sendall(bufs[0])
+        else:
+            self.socket.sendall(bytearray().join(bufs))
+
+        stats = self.send_stats
+        stats['flushes'] += 1
+        stats['flushed_msgs'] += len(bufs)
+        stats['flushed_bytes'] += nbytes
+        stats['last_batch'] = len(bufs)
+        stats['max_batch'] = max(stats['max_batch'], len(bufs))
+
+        if self.send_q is not None:
+            self._send_q_writable.set()
+
     @_deactivate
     def _send_loop(self):
         try:
             while self.is_active:
-                buf = self.send_q.get()
-                self.socket.sendall(buf)
+                self._send_q_ready.wait()
+                self._flush_send_q()
         finally:
-            q = self.send_q
-            # first, clear self.send_q to prevent new references.
+            # clear self.send_q to prevent new references.
             self.send_q = None
-            # there might be threads currently blocking in send_q.put().
-            # unblock them by draining the queue.
-            try:
-                while q.get(block=False):
-                    pass
-            except hub.QueueEmpty:
-                pass
+            self.send_q_bytes = 0
+            # there might be threads currently blocking in send().
+            # unblock them.
+            self._send_q_writable.set()
 
     def send(self, buf):
-        if self.send_q:
-            self.send_q.put(buf)
+        while (self.send_q is not None and
+               self.send_q_bytes >= CONF.ofp_send_high_watermark):
+            self._send_q_writable.clear()
+            self._send_q_writable.wait()
+        if self.send_q is not None:
+            self.send_q.append(buf)
+            self.send_q_bytes += len(buf)
+            self._send_q_ready.set()
 
     def set_xid(self, msg):
         self.xid += 1
@@ -213,10 +298,22 @@ class Datapath(ofproto_protocol.ProtocolDesc):
             self.set_xid(msg)
         msg.serialize()
         # LOG.debug('send_msg %s', msg)
+        if self.flow_mirror is not None:
+            self.flow_mirror.sent(msg)
         self.send(msg.buf)
 
+    def _flow_mirror_loop(self):
+        mirror = self.flow_mirror
+        while self.is_active:
+            mirror.resync.wait(CONF.ofp_flow_mirror_interval)
+            mirror.resync.clear()
+            if self.state == handler.MAIN_DISPATCHER and mirror.supported():
+                self.send_msg(mirror.dump_request())
+
     def serve(self):
-        send_thr = hub.spawn(self._send_loop)
+        threads = [hub.spawn(self._send_loop)]
+        if self.flow_mirror is not None:
+            threads.append(hub.spawn(self._flow_mirror_loop))
 
         # send hello message immediately
         hello = self.ofproto_parser.OFPHello(self)
@@ -225,8 +322,9 @@ class Datapath(ofproto_protocol.ProtocolDesc):
         try:
             self._recv_loop()
         finally:
-            hub.kill(send_thr)
-            hub.joinall([send_thr])
+            for thr in threads:
+                hub.kill(thr)
+            hub.joinall(threads)
 
     #
     # Utility methods for convenience
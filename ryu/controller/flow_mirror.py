@@ -0,0 +1,301 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A controller side copy of the flow tables of a switch.
+
+When --ofp-flow-mirror is set, every Datapath of OpenFlow 1.2 or later
+has a FlowMirror in its flow_mirror attribute.  The Flow Mod messages
+sent to the switch are applied to the mirror, the flows are removed on
+Flow Removed messages, and the mirror is replaced with a dump of the
+flow tables when the switch enters MAIN_DISPATCHER, every
+--ofp-flow-mirror-interval seconds and after a Flow Mod or a bundle has
+failed.  Applications can then look the installed flows up without a
+request:
+
+    flows = datapath.flow_mirror.get_flows(table_id=0, cookie=cookie,
+                                           cookie_mask=0xffffffffffffffff)
+
+The mirror does not know the counters of the flows, and a flow
+expired by its idle timeout stays until the next dump unless it has
+OFPFF_SEND_FLOW_REM.
+"""
+
+import time
+
+from ryu.lib import hub
+from ryu.ofproto import ofproto_v1_2
+
+
+def _match_key(match):
+    return frozenset(match._fields2)
+
+
+class FlowEntry(object):
+    """A flow in FlowMirror.
+
+    The attributes are the ones of the Flow Mod message which installed
+    the flow, and install_time is the time when it was installed.
+    """
+
+    def __init__(self, table_id, priority, match, cookie, instructions,
+                 idle_timeout, hard_timeout, flags, install_time):
+        super(FlowEntry, self).__init__()
+        self.table_id = table_id
+        self.priority = priority
+        self.match = match
+        self.cookie = cookie
+        self.instructions = instructions
+        self.idle_timeout = idle_timeout
+        self.hard_timeout = hard_timeout
+        self.flags = flags
+        self.install_time = install_time
+        self.match_key = _match_key(match)
+
+    def expired(self, now):
+        return (self.hard_timeout and
+                now >= self.install_time + self.hard_timeout)
+
+    def outputs(self, port_no=None, group_id=None):
+        # True if the flow has an action to output to the port or group.
+        for inst in self.instructions:
+            for act in getattr(inst, 'actions', []):
+                if port_no is not None and getattr(act, 'port',
+                                                   None) == port_no:
+                    return True
+                if group_id is not None and getattr(act, 'group_id',
+                                                    None) == group_id:
+                    return True
+        return False
+
+
+class FlowMirror(object):
+    """The flows of a switch indexed by table, priority, match and
+    cookie.
+
+    A match selects the flows which have all of its fields with the same
+    values, as the non-strict Flow Mod commands.  A masked field is
+    compared with its mask, so a flow with a narrower mask of a field
+    than the one of the match is not selected.
+    """
+
+    def __init__(self, datapath):
+        super(FlowMirror, self).__init__()
+        self.datapath = datapath
+        self.tables = {}    # table_id -> {(priority, match key): FlowEntry}
+        self.cookies = {}   # cookie -> set of (table_id, priority, match key)
+        self.resync = hub.Event()
+        self.last_sync = None
+        self._generation = 0
+        self._dump_xid = None
+        self._dump_generation = None
+        self._dump_body = []
+
+    def __len__(self):
+        return sum(len(table) for table in self.tables.itervalues())
+
+    def supported(self):
+        return self.datapath.ofproto.OFP_VERSION >= ofproto_v1_2.OFP_VERSION
+
+    def _add(self, entry):
+        key = (entry.priority, entry.match_key)
+        table = self.tables.setdefault(entry.table_id, {})
+        old = table.get(key)
+        if old is not None:
+            self._remove(old)
+        table[key] = entry
+        self.cookies.setdefault(entry.cookie, set()).add(
+            (entry.table_id,) + key)
+
+    def _remove(self, entry):
+        key = (entry.priority, entry.match_key)
+        table = self.tables[entry.table_id]
+        del table[key]
+        if not table:
+            del self.tables[entry.table_id]
+        keys = self.cookies[entry.cookie]
+        keys.discard((entry.table_id,) + key)
+        if not keys:
+            del self.cookies[entry.cookie]
+
+    def _select(self, table_id, match, priority, cookie, cookie_mask,
+                strict):
+        # yields the flows selected as by a Flow Mod or a stats request.
+        if table_id is None:
+            tables = self.tables.values()
+        else:
+            tables = [self.tables.get(table_id, {})]
+        cookie &= cookie_mask
+
+        if strict:
+            key = (priority, _match_key(match))
+            for table in tables:
+                entry = table.get(key)
+                if (entry is not None and
+                        entry.cookie & cookie_mask == cookie):
+                    yield entry
+            return
+
+        if cookie_mask == 0xffffffffffffffff:
+            entries = []
+            for key in self.cookies.get(cookie, ()):
+                if table_id is None or key[0] == table_id:
+                    entries.append(self.tables[key[0]][key[1:]])
+        else:
+            entries = [entry for table in tables
+                       for entry in table.itervalues()
+                       if entry.cookie & cookie_mask == cookie]
+        if match is None:
+            for entry in entries:
+                yield entry
+        else:
+            key = _match_key(match)
+            for entry in entries:
+                if key <= entry.match_key:
+                    yield entry
+
+    def get_flows(self, table_id=None, match=None, priority=None,
+                  cookie=0, cookie_mask=0, strict=False):
+        """Returns a list of the FlowEntry of the flows selected.
+
+        table_id of None selects all the tables, and match of None
+        selects all the flows.  If strict is True, the flow of the
+        exact match and priority is selected.
+        """
+        now = time.time()
+        flows = []
+        expired = []
+        for entry in self._select(table_id, match, priority, cookie,
+                                  cookie_mask, strict):
+            if entry.expired(now):
+                expired.append(entry)
+            else:
+                flows.append(entry)
+        for entry in expired:
+            self._remove(entry)
+        return flows
+
+    def sent(self, msg):
+        """Applies a message sent to the switch if it is a Flow Mod,
+        or a Flow Mod added to a bundle.
+        """
+        ofp = self.datapath.ofproto
+        if msg.msg_type == getattr(ofp, 'OFPT_BUNDLE_ADD_MESSAGE', None):
+            msg = msg.message
+        if msg.msg_type != ofp.OFPT_FLOW_MOD or not self.supported():
+            return
+        self._generation += 1
+        match = msg.match
+        if getattr(match, '_composed_with_old_api', lambda: False)():
+            # the fields are known only in the serialized message.
+            match = self.datapath.ofproto_parser.OFPMatch.parser(
+                msg.buf, ofp.OFP_FLOW_MOD_SIZE - ofp.OFP_MATCH_SIZE)
+
+        command = msg.command
+        if command == ofp.OFPFC_ADD:
+            self._add(FlowEntry(msg.table_id, msg.priority, match,
+                                msg.cookie, msg.instructions,
+                                msg.idle_timeout, msg.hard_timeout,
+                                msg.flags, time.time()))
+        elif command in (ofp.OFPFC_MODIFY, ofp.OFPFC_MODIFY_STRICT):
+            strict = command == ofp.OFPFC_MODIFY_STRICT
+            entries = list(self._select(msg.table_id, match, msg.priority,
+                                        msg.cookie, msg.cookie_mask,
+                                        strict))
+            for entry in entries:
+                entry.instructions = msg.instructions
+            if not entries and ofp.OFP_VERSION == ofproto_v1_2.OFP_VERSION:
+                # OpenFlow 1.2 adds the flow if none is modified.
+                self._add(FlowEntry(msg.table_id, msg.priority, match,
+                                    msg.cookie, msg.instructions,
+                                    msg.idle_timeout, msg.hard_timeout,
+                                    msg.flags, time.time()))
+        elif command in (ofp.OFPFC_DELETE, ofp.OFPFC_DELETE_STRICT):
+            table_id = msg.table_id
+            if table_id == ofp.OFPTT_ALL:
+                table_id = None
+            out_port = msg.out_port
+            if out_port == ofp.OFPP_ANY:
+                out_port = None
+            out_group = msg.out_group
+            if out_group == ofp.OFPG_ANY:
+                out_group = None
+            entries = list(self._select(table_id, match, msg.priority,
+                                        msg.cookie, msg.cookie_mask,
+                                        command == ofp.OFPFC_DELETE_STRICT))
+            for entry in entries:
+                if out_port is not None and not entry.outputs(
+                        port_no=out_port):
+                    continue
+                if out_group is not None and not entry.outputs(
+                        group_id=out_group):
+                    continue
+                self._remove(entry)
+
+    def flow_removed(self, msg):
+        for entry in list(self._select(msg.table_id, msg.match,
+                                       msg.priority, 0, 0, True)):
+            self._remove(entry)
+
+    def error(self, msg):
+        """Dumps the flow tables again as a Flow Mod or a bundle has
+        failed.
+        """
+        ofp = self.datapath.ofproto
+        if msg.type in (ofp.OFPET_FLOW_MOD_FAILED,
+                        getattr(ofp, 'OFPET_BUNDLE_FAILED', None)):
+            self.resync.set()
+
+    def dump_request(self):
+        """Returns a request of the dump of the flow tables."""
+        req = self.datapath.ofproto_parser.OFPFlowStatsRequest(
+            self.datapath)
+        self.datapath.set_xid(req)
+        self._dump_xid = req.xid
+        self._dump_generation = self._generation
+        self._dump_body = []
+        return req
+
+    def stats_reply(self, msg):
+        """Replaces the flows with the dump requested by dump_request().
+
+        The dump is dropped if Flow Mod messages have been sent since
+        the request, as it might not have them applied.
+        """
+        if msg.xid != self._dump_xid:
+            return
+        self._dump_body.extend(msg.body)
+        ofp = self.datapath.ofproto
+        more = getattr(ofp, 'OFPMPF_REPLY_MORE', None)
+        if more is None:
+            more = ofp.OFPSF_REPLY_MORE
+        if msg.flags & more:
+            return
+
+        body = self._dump_body
+        self._dump_xid = None
+        self._dump_body = []
+        if self._generation != self._dump_generation:
+            return
+        now = time.time()
+        self.tables = {}
+        self.cookies = {}
+        for stats in body:
+            self._add(FlowEntry(stats.table_id, stats.priority, stats.match,
+                                stats.cookie, stats.instructions,
+                                stats.idle_timeout, stats.hard_timeout,
+                                getattr(stats, 'flags', 0),
+                                now - stats.duration_sec))
+        self.last_sync = now
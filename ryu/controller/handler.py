@@ -78,6 +78,40 @@ def _listify(may_list):
     return may_list
 
 
+def _is_interested(handler, ev_cls, state):
+    if not _has_caller(handler) or ev_cls not in handler.callers:
+        # dynamically registered handlers does not have
+        # handler.callers element for the event.
+        return True
+    states = handler.callers[ev_cls].dispatchers
+    if not states:
+        # empty states means all states
+        return True
+    return state in states
+
+
+def compile_handlers(handlers, ev_cls, state=None):
+    """Returns a tuple of the handlers which are in effect in the state.
+
+    The result is meant to be cached in a dispatch table keyed by
+    (ev_cls, state) and rebuilt when handlers are (un)registered.
+    If state is None, all the given handlers are returned.
+    """
+    if state is None:
+        return tuple(handlers)
+    return tuple(h for h in handlers if _is_interested(h, ev_cls, state))
+
+
+def compile_observers(observers, state=None):
+    """Returns a tuple of the observer names interested in the state.
+
+    observers is a dict of observer-name -> states:set for an event class.
+    Empty states means all states.
+    """
+    return tuple(name for name, states in observers.iteritems()
+                 if not state or not states or state in states)
+
+
 def register_instance(i):
     for _k, m in inspect.getmembers(i, inspect.ismethod):
         # LOG.debug('instance %s k %s m %s', i, _k, m)
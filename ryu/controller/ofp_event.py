@@ -23,6 +23,7 @@ import inspect
 from ryu.controller import handler
 from ryu import ofproto
 from ryu import utils
+from ryu.lib.packet import packet
 from . import event
 
 
@@ -32,12 +33,57 @@ class EventOFPMsgBase(event.EventBase):
         self.msg = msg
 
 
+def get_packet(msg, headers_only=False):
+    """Returns the data of a packet-in message as a decoded Packet.
+
+    The data is decoded once per message, and the Packet is shared by
+    all the applications observing the message, which therefore must
+    not modify it.
+    With headers_only=True, the decoding stops after the transport
+    protocol header.  (Cf. ryu.lib.packet.packet.Packet)  The fully
+    decoded Packet is returned instead if it is already available.
+    """
+    pkt = getattr(msg, '_packet', None)
+    if pkt is not None:
+        return pkt
+    if headers_only:
+        pkt = getattr(msg, '_packet_headers', None)
+        if pkt is None:
+            pkt = packet.Packet(msg.data, headers_only=True)
+            msg._packet_headers = pkt
+        return pkt
+    pkt = packet.Packet(msg.data)
+    msg._packet = pkt
+    return pkt
+
+
+class EventOFPPacketInBase(EventOFPMsgBase):
+    """The base class of EventOFPPacketIn.
+
+    ``pkt`` and ``pkt_headers`` are the decoded data of the message.
+    (Cf. get_packet)
+    """
+
+    @property
+    def pkt(self):
+        return get_packet(self.msg)
+
+    @property
+    def pkt_headers(self):
+        return get_packet(self.msg, headers_only=True)
+
+
 #
 # Create ofp_event type corresponding to OFP Msg
 #
 
 _OFP_MSG_EVENTS = {}
 
+# the base classes of the events with extra API
+_OFP_MSG_EVENT_BASES = {
+    'EventOFPPacketIn': EventOFPPacketInBase,
+}
+
 
 def _ofp_msg_name_to_ev_name(msg_name):
     return 'Event' + msg_name
@@ -59,7 +105,8 @@ def _create_ofp_msg_ev_class(msg_cls):
     if name in _OFP_MSG_EVENTS:
         return
 
-    cls = type(name, (EventOFPMsgBase,),
+    base = _OFP_MSG_EVENT_BASES.get(name, EventOFPMsgBase)
+    cls = type(name, (base,),
                dict(__init__=lambda self, msg:
                     super(self.__class__, self).__init__(msg)))
     globals()[name] = cls
@@ -248,3 +248,19 @@ class OFPHandler(ryu.base.app_manager.RyuApp):
         msg = ev.msg
         self.logger.debug('error msg ev %s type 0x%x code 0x%x %s',
                           msg, msg.type, msg.code, utils.hex_array(msg.data))
+        if msg.datapath.flow_mirror is not None:
+            msg.datapath.flow_mirror.error(msg)
+
+    @set_ev_handler(ofp_event.EventOFPFlowRemoved, MAIN_DISPATCHER)
+    def flow_removed_handler(self, ev):
+        msg = ev.msg
+        if msg.datapath.flow_mirror is not None:
+            msg.datapath.flow_mirror.flow_removed(msg)
+
+    @set_ev_handler([ofp_event.EventOFPFlowStatsReply,
+                     ofp_event.EventOFPStatsReply], MAIN_DISPATCHER)
+    def flow_stats_reply_handler(self, ev):
+        # the dumps which the flow mirror requested.
+        msg = ev.msg
+        if msg.datapath.flow_mirror is not None:
+            msg.datapath.flow_mirror.stats_reply(msg)
@@ -0,0 +1,201 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+The provider of OpenFlow events in the master process of a sharded
+controller.  (Cf. ryu.controller.ofp_worker)
+
+It takes the place of ofp_handler: global RyuApps observe OpenFlow
+events from it as usual, while the events are generated from the
+messages forwarded by the workers.
+"""
+
+import logging
+import os
+import random
+import signal
+
+from ryu.base import app_manager
+from ryu.controller import controller
+from ryu.controller import handler
+from ryu.controller import ofp_event
+from ryu.controller import ofp_worker
+from ryu.lib import hub
+from ryu.ofproto import ofproto_parser
+from ryu.ofproto import ofproto_protocol
+from ryu.ofproto import ofproto_v1_0
+
+
+LOG = logging.getLogger('ryu.controller.ofp_master')
+
+
+class RemoteDatapath(ofproto_protocol.ProtocolDesc):
+    """A datapath connected to a worker process.
+
+    This provides the subset of Datapath used by applications to send
+    messages.
+    """
+
+    def __init__(self, channel, id, version, address=None):
+        super(RemoteDatapath, self).__init__(version)
+        self.channel = channel
+        self.id = id
+        self.address = address
+        self.is_active = True
+        self.state = None
+        self.ports = None  # kept by OFPMaster as ofp_handler does
+        self.flow_format = ofproto_v1_0.NXFF_OPENFLOW10
+        self.xid = random.randint(0, self.ofproto.MAX_XID)
+
+    def send(self, buf):
+        if self.is_active:
+            self.channel.send('send_msg', [self.id, str(buf)])
+
+    def set_xid(self, msg):
+        self.xid += 1
+        self.xid &= self.ofproto.MAX_XID
+        msg.set_xid(self.xid)
+        return self.xid
+
+    def send_msg(self, msg):
+        assert isinstance(msg, self.ofproto_parser.MsgBase)
+        if msg.xid is None:
+            self.set_xid(msg)
+        msg.serialize()
+        self.send(msg.buf)
+
+    def send_barrier(self):
+        barrier_request = self.ofproto_parser.OFPBarrierRequest(self)
+        self.send_msg(barrier_request)
+
+    def is_reserved_port(self, port_no):
+        return port_no > self.ofproto.OFPP_MAX
+
+    # the utility methods of Datapath, e.g. for ryu.topology.switches.
+    send_packet_out = controller.Datapath.__dict__['send_packet_out']
+    send_flow_mod = controller.Datapath.__dict__['send_flow_mod']
+    send_flow_del = controller.Datapath.__dict__['send_flow_del']
+    send_delete_all_flows = \
+        controller.Datapath.__dict__['send_delete_all_flows']
+    send_nxt_set_flow_format = \
+        controller.Datapath.__dict__['send_nxt_set_flow_format']
+
+
+class OFPMaster(app_manager.RyuApp):
+    def __init__(self, *args, **kwargs):
+        super(OFPMaster, self).__init__(*args, **kwargs)
+        self.name = 'ofp_event'
+        self.workers = [(pid, ofp_worker.Channel(sock))
+                        for pid, sock in ofp_worker.get_workers()]
+        self.dps = {}  # dpid -> RemoteDatapath
+        self._subscribed = set()  # names of the event classes
+        self._subscribe(ofp_event.EventOFPStateChange)
+        # to keep the ports of the datapaths.
+        self._subscribe(ofp_event.EventOFPSwitchFeatures)
+        self._subscribe(ofp_event.EventOFPPortDescStatsReply)
+
+    def start(self):
+        super(OFPMaster, self).start()
+        ofproto_parser.set_lazy_parse(self.CONF.ofp_lazy_parse)
+        return hub.spawn(self._serve)
+
+    def register_observer(self, ev_cls, name, states=None):
+        super(OFPMaster, self).register_observer(ev_cls, name, states)
+        # observers are registered at runtime as well, e.g. by the
+        # ofctl service for the replies it waits for.
+        self._subscribe(ev_cls)
+
+    def _subscribe(self, ev_cls):
+        name = ev_cls.__name__
+        if name in self._subscribed:
+            return
+        self._subscribed.add(name)
+        # queued until the channel is served if it is not yet.
+        for _pid, channel in self.workers:
+            channel.send('subscribe', [[name]])
+
+    def _serve(self):
+        threads = [hub.spawn(self._serve_worker, pid, channel)
+                   for pid, channel in self.workers]
+        hub.joinall(threads)
+
+    def _serve_worker(self, pid, channel):
+        channel.serve(self._dispatch)
+
+        self.logger.error('worker %d exited', pid)
+        for dp in self.dps.values():
+            if dp.channel is channel:
+                self._state_change(channel, dp.id, dp.ofproto.OFP_VERSION,
+                                   dp.address, handler.DEAD_DISPATCHER)
+
+    def _dispatch(self, channel, method, params):
+        if method == 'state':
+            self._state_change(channel, *params)
+        elif method == 'msg':
+            self._msg(channel, *params)
+
+    def _get_dp(self, channel, dpid, version):
+        dp = self.dps.get(dpid)
+        if dp is None or dp.channel is not channel:
+            # the switch might have reconnected to another worker.
+            dp = RemoteDatapath(channel, dpid, version)
+            self.dps[dpid] = dp
+        return dp
+
+    def _state_change(self, channel, dpid, version, address, state):
+        if state == handler.DEAD_DISPATCHER:
+            dp = self.dps.get(dpid)
+            if dp is None or dp.channel is not channel:
+                return
+            del self.dps[dpid]
+            dp.is_active = False
+        else:
+            dp = self._get_dp(channel, dpid, version)
+        if address is not None:
+            dp.address = tuple(address)
+
+        dp.state = state
+        ev = ofp_event.EventOFPStateChange(dp)
+        ev.state = state
+        self.send_event_to_observers(ev, state)
+
+    def _msg(self, channel, dpid, state, buf):
+        (version, msg_type, msg_len, xid) = ofproto_parser.header(buf)
+        dp = self._get_dp(channel, dpid, version)
+        msg = ofproto_parser.msg(dp, version, msg_type, msg_len, xid, buf)
+        if msg:
+            self._update_ports(dp, msg)
+            ev = ofp_event.ofp_msg_to_ev(msg)
+            self.send_event_to_observers(ev, state)
+
+    def _update_ports(self, dp, msg):
+        # as ofp_handler does before the datapath enters MAIN_DISPATCHER.
+        ev_cls = ofp_event.ofp_msg_to_ev_cls(msg.__class__)
+        if ev_cls is ofp_event.EventOFPSwitchFeatures:
+            if dp.ofproto.OFP_VERSION < 0x04:
+                dp.ports = msg.ports
+            else:
+                dp.ports = {}
+        elif (ev_cls is ofp_event.EventOFPPortDescStatsReply and
+              dp.ports is not None):
+            for port in msg.body:
+                dp.ports[port.port_no] = port
+
+    def close(self):
+        for pid, _channel in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
@@ -0,0 +1,280 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Shard switch connections among worker processes.
+
+With --ofp-workers N (N > 1), ryu-manager forks N worker processes.
+Every worker listens on the OpenFlow port with SO_REUSEPORT, so that the
+kernel distributes switch connections among them, and runs its own
+AppManager hosting ofp_handler and the sharded RyuApps.
+
+The RyuApps with _GLOBAL = True, e.g. the REST APIs and
+ryu.topology.switches, and the ones which require them run in the master
+process instead.
+The OFPWorker application in each worker forwards the OpenFlow events
+they observe to the master over a socketpair, and relays the messages
+they send back to the datapaths.  (Cf. ryu.controller.ofp_master)
+
+IPC messages are msgpack-rpc notifications:
+
+    worker -> master
+        state [dpid, version, address, state]
+        msg [dpid, state, message bytes]
+    master -> worker
+        subscribe [event class names]
+        send_msg [dpid, message bytes]
+"""
+
+import itertools
+import logging
+import os
+import socket
+
+from ryu import cfg
+from ryu.app import wsgi
+from ryu.base import app_manager
+from ryu.controller import handler
+from ryu.controller import ofp_event
+from ryu.lib import hub
+from ryu.lib import rpc
+
+
+LOG = logging.getLogger('ryu.controller.ofp_worker')
+
+CONF = cfg.CONF
+
+app_manager.require_app('ryu.controller.ofp_handler')
+
+# the number of IPC messages queued for a peer.
+_CHANNEL_QUEUE_LEN = 1024
+
+_master_sock = None  # in a worker
+_workers = []  # in the master.  (pid, socket) of each worker
+
+
+class Channel(object):
+    """IPC channel between the master and a worker."""
+
+    def __init__(self, sock):
+        super(Channel, self).__init__()
+        self.sock = sock
+        self.is_active = True
+        self._encoder = rpc.MessageEncoder()
+        self._send_q = hub.Queue(_CHANNEL_QUEUE_LEN)
+
+    def send(self, method, params):
+        if self.is_active:
+            self._send_q.put(
+                self._encoder.create_notification(method, params))
+
+    def _send_loop(self):
+        while self.is_active:
+            bufs = [self._send_q.get()]
+            while not self._send_q.empty():
+                bufs.append(self._send_q.get())
+            self.sock.sendall(''.join(bufs))
+
+    def serve(self, dispatch):
+        """Call dispatch(channel, method, params) for each notification.
+
+        This blocks until the peer closes the channel.
+        """
+        table = {
+            rpc.MessageType.NOTIFY:
+            lambda m: dispatch(self, m[0], m[1]),
+        }
+        send_thr = hub.spawn(self._send_loop)
+        try:
+            while True:
+                buf = self.sock.recv(64 * 1024)
+                if not buf:
+                    break
+                self._encoder.get_and_dispatch_messages(buf, table)
+        finally:
+            self.is_active = False
+            hub.kill(send_thr)
+            hub.joinall([send_thr])
+
+
+def _is_global_app(app_mgr, app, seen=None):
+    """Returns whether the application runs in the master process.
+
+    That is the case if it has _GLOBAL = True, or if it requires a global
+    application, e.g. a consumer of ryu.topology.
+    """
+    if seen is None:
+        seen = set()
+    seen.add(app)
+    cls = app_mgr.load_app(app)
+    if cls is None:
+        return False
+    if cls._GLOBAL:
+        return True
+    for c in [cls] + [context_cls for _key, context_cls
+                      in cls.context_iteritems()]:
+        for service in handler.get_dependent_services(c):
+            if service not in seen and _is_global_app(app_mgr, service,
+                                                      seen):
+                return True
+    return False
+
+
+def _check_shard_apps(shard_apps):
+    # WSGI is served only by the master, so a REST API in a worker
+    # would silently be unreachable.
+    app_mgr = app_manager.AppManager()
+    app_mgr.load_apps(shard_apps)
+    wsgi_apps = [name for name, cls in app_mgr.applications_cls.items()
+                 if wsgi.WSGIApplication in
+                 [context_cls for _key, context_cls
+                  in cls.context_iteritems()]]
+    if wsgi_apps:
+        raise ValueError('%s would run in worker processes, which do not '
+                         'serve WSGI.  Set _GLOBAL = True to run it in the '
+                         'master process.' % ', '.join(sorted(wsgi_apps)))
+
+
+def fork_workers(app_lists):
+    """Fork CONF.ofp_workers worker processes.
+
+    Returns the list of applications to run in the calling process.
+    That is the global applications and ofp_master in the master, and
+    the sharded applications and ofp_worker in a worker.
+
+    Raises ValueError if an application using WSGI is not global.
+    """
+    app_mgr = app_manager.AppManager.get_instance()
+    app_lists = [app for app
+                 in itertools.chain.from_iterable(app.split(',')
+                                                  for app in app_lists)]
+    global_apps = [app for app in app_lists
+                   if _is_global_app(app_mgr, app)]
+    shard_apps = [app for app in app_lists if app not in global_apps]
+    _check_shard_apps(shard_apps)
+
+    for i in range(CONF.ofp_workers):
+        master_sock, worker_sock = socket.socketpair()
+        pid = os.fork()
+        if pid == 0:
+            global _master_sock
+
+            # close the master side of the channels so that the master
+            # can notice when a worker exits and vice versa.
+            master_sock.close()
+            for _pid, sock in _workers:
+                sock.close()
+            del _workers[:]
+            _master_sock = worker_sock
+            LOG.info('worker %d started: %s', i, shard_apps)
+            return shard_apps + [__name__]
+
+        worker_sock.close()
+        _workers.append((pid, master_sock))
+
+    # in the master, the OpenFlow events are provided by ofp_master
+    # instead of ofp_handler.
+    ofp_event._SERVICE_NAME = 'ryu.controller.ofp_master'
+    LOG.info('master started: %s', global_apps)
+    return global_apps + ['ryu.controller.ofp_master']
+
+
+def is_worker():
+    return _master_sock is not None
+
+
+def get_workers():
+    """Returns a list of (pid, socket) of the workers."""
+    return list(_workers)
+
+
+class OFPWorker(app_manager.RyuApp):
+    """Forward OpenFlow events to the master process."""
+
+    def __init__(self, *args, **kwargs):
+        super(OFPWorker, self).__init__(*args, **kwargs)
+        self.channel = Channel(_master_sock)
+        self.dps = {}  # dpid -> Datapath
+        self._subscribed = set()
+
+    def start(self):
+        super(OFPWorker, self).start()
+        return hub.spawn(self._serve)
+
+    def _serve(self):
+        self.channel.serve(self._dispatch)
+        # nothing can be done without the master.
+        self.logger.error('the master process exited')
+        os._exit(1)
+
+    def _dispatch(self, channel, method, params):
+        if method == 'subscribe':
+            self._subscribe(params[0])
+        elif method == 'send_msg':
+            dpid, buf = params
+            dp = self.dps.get(dpid)
+            if dp is not None:
+                dp.send(buf)
+
+    def _subscribe(self, names):
+        for name in names:
+            if name in self._subscribed:
+                continue
+            self._subscribed.add(name)
+            self.observe_event(getattr(ofp_event, name))
+
+    def _send_event(self, ev, state):
+        # forward the events as they are dispatched by the datapath,
+        # rather than from the event loop, when the datapath might be in
+        # another state.
+        if isinstance(ev, ofp_event.EventOFPStateChange):
+            self._forward_state(ev.datapath, state)
+        elif isinstance(ev, ofp_event.EventOFPMsgBase):
+            self._forward_msg(ev, state)
+        else:
+            super(OFPWorker, self)._send_event(ev, state)
+
+    def _send_state(self, dp, dpid, state):
+        self.channel.send('state', [dpid, dp.ofproto.OFP_VERSION,
+                                    list(dp.address), state])
+
+    def _forward_state(self, dp, state):
+        if dp.id is None:
+            # the datapath is unknown to the master until Switch
+            # Features.  (Cf. _forward_msg)
+            return
+        if state == handler.DEAD_DISPATCHER:
+            if self.dps.get(dp.id) is dp:
+                del self.dps[dp.id]
+        else:
+            self.dps[dp.id] = dp
+        self._send_state(dp, dp.id, state)
+
+    def _forward_msg(self, ev, state):
+        msg = ev.msg
+        dp = msg.datapath
+        dpid = dp.id
+        if dpid is None:
+            if not isinstance(ev, ofp_event.EventOFPSwitchFeatures):
+                # Hello, Echo and Error messages of the handshake are
+                # skipped, as the master cannot tell their datapath.
+                return
+            # ofp_handler sets the datapath ID after the observers.
+            # the state change to CONFIG_DISPATCHER, skipped as the ID
+            # was unknown, goes along.
+            dpid = msg.datapath_id
+            self._send_state(dp, dpid, state)
+        self.dps[dpid] = dp
+        self.channel.send('msg', [dpid, state, str(msg.buf)])
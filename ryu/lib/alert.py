@@ -105,9 +105,9 @@ class AlertPkt(object):
         self.event = event
 
     @classmethod
-    def parser(cls, buf):
-        alertmsg = struct.unpack_from(cls._ALERTMSG_PACK_STR, buf)
-        offset = calcsize(cls._ALERTMSG_PACK_STR)
+    def parser(cls, buf, offset=0):
+        alertmsg = struct.unpack_from(cls._ALERTMSG_PACK_STR, buf, offset)
+        offset += calcsize(cls._ALERTMSG_PACK_STR)
 
         pkth = PcapPktHdr32.parser(buf, offset)
         offset += PcapPktHdr32._SIZE
@@ -28,6 +28,7 @@ LOG = logging.getLogger('ryu.lib.hub')
 if HUB_TYPE == 'eventlet':
     import eventlet
     import eventlet.event
+    import eventlet.green.socket
     import eventlet.queue
     import eventlet.semaphore
     import eventlet.timeout
@@ -38,6 +39,9 @@ if HUB_TYPE == 'eventlet':
     import socket
     import traceback
 
+    # not defined by the socket module of python 2
+    SO_REUSEPORT = getattr(socket, 'SO_REUSEPORT', 15)
+
     getcurrent = eventlet.getcurrent
     patch = eventlet.monkey_patch
     sleep = eventlet.sleep
@@ -97,15 +101,26 @@ if HUB_TYPE == 'eventlet':
 
     class StreamServer(object):
         def __init__(self, listen_info, handle=None, backlog=None,
-                     spawn='default', **ssl_args):
+                     spawn='default', reuse_port=False, **ssl_args):
             assert backlog is None
             assert spawn == 'default'
 
             if ':' in listen_info[0]:
-                self.server = eventlet.listen(listen_info,
-                                              family=socket.AF_INET6)
+                family = socket.AF_INET6
+            else:
+                family = socket.AF_INET
+            if reuse_port:
+                # let processes listen on the same port.  the kernel
+                # distributes incoming connections among them.
+                self.server = eventlet.green.socket.socket(family,
+                                                           socket.SOCK_STREAM)
+                self.server.setsockopt(socket.SOL_SOCKET,
+                                       socket.SO_REUSEADDR, 1)
+                self.server.setsockopt(socket.SOL_SOCKET, SO_REUSEPORT, 1)
+                self.server.bind(listen_info)
+                self.server.listen(50)
             else:
-                self.server = eventlet.listen(listen_info)
+                self.server = eventlet.listen(listen_info, family=family)
             if ssl_args:
                 def wrap_and_handle(sock, addr):
                     ssl_args.setdefault('server_side', True)
@@ -99,7 +99,7 @@ class LacpLib(app_manager.RyuApp):
     def packet_in_handler(self, evt):
         """PacketIn event handler. when the received packet was LACP,
         proceed it. otherwise, send a event."""
-        req_pkt = packet.Packet(evt.msg.data)
+        req_pkt = evt.pkt_headers
         if slow.lacp in req_pkt:
             (req_lacp, ) = req_pkt.get_protocols(slow.lacp)
             (req_eth, ) = req_pkt.get_protocols(ethernet.ethernet)
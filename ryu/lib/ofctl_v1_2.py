@@ -543,9 +543,12 @@ def send_stats_request(dp, stats, waiters, msgs):
     waiters_per_dp[stats.xid] = (lock, msgs)
     dp.send_msg(stats)
 
-    lock.wait(timeout=DEFAULT_TIMEOUT)
-    if not lock.is_set():
-        del waiters_per_dp[stats.xid]
+    try:
+        lock.wait(timeout=DEFAULT_TIMEOUT)
+    finally:
+        # also when the waiting thread is killed.
+        if not lock.is_set():
+            del waiters_per_dp[stats.xid]
 
 
 def get_desc_stats(dp, waiters):
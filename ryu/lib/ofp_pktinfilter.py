@@ -15,21 +15,113 @@
 # vim: tabstop=4 shiftwidth=4 softtabstop=4
 
 import logging
+import struct
 from abc import ABCMeta, abstractmethod
 import six
 
-from ryu.lib.packet import packet
+from ryu.controller import ofp_event
+from ryu.lib.packet import arp
+from ryu.lib.packet import ethernet
+from ryu.lib.packet import icmp
+from ryu.lib.packet import icmpv6
+from ryu.lib.packet import ipv4
+from ryu.lib.packet import ipv6
+from ryu.lib.packet import lldp
+from ryu.lib.packet import sctp
+from ryu.lib.packet import tcp
+from ryu.lib.packet import udp
+from ryu.lib.packet import vlan
 
 LOG = logging.getLogger(__name__)
 
+# the protocols peek_protocols() looks through.
+# class -> (header length, offset of the next type)
+_LINK_HEADERS = {
+    ethernet.ethernet: (ethernet.ethernet._MIN_LEN, 12),
+    vlan.vlan: (vlan.vlan._MIN_LEN, 2),
+    vlan.svlan: (vlan.svlan._MIN_LEN, 2),
+}
+
+# the protocols after which Packet() decodes nothing else.
+# class -> minimum length
+_LAST_HEADERS = {
+    arp.arp: arp.arp._MIN_LEN,
+    lldp.lldp: lldp.LLDP_TLV_SIZE,
+    icmp.icmp: icmp.icmp._MIN_LEN,
+    icmpv6.icmpv6: icmpv6.icmpv6._MIN_LEN,
+    tcp.tcp: tcp.tcp._MIN_LEN,
+    udp.udp: udp.udp._MIN_LEN,
+    sctp.sctp: sctp.sctp._MIN_LEN,
+}
+
+
+def peek_protocols(data):
+    """Classify a frame by its headers without decoding it.
+
+    Returns (protocols, complete).  protocols is a set of the protocol
+    classes which packet.Packet(data) decodes, following the type fields
+    of ethernet, VLAN, IPv4 and IPv6 headers in the buffer.
+    complete is False if the classification stopped at a protocol it
+    does not look through, such as MPLS or an IPv6 extension header,
+    in which case Packet(data) may have more protocols.
+    """
+    protocols = set()
+    data = data or ''
+    cls = ethernet.ethernet
+    offset = 0
+    end = len(data)
+    while cls is not None:
+        link = _LINK_HEADERS.get(cls)
+        if link is not None:
+            hdr_len, type_offset = link
+            if end - offset < hdr_len:
+                break
+            protocols.add(cls)
+            (type_, ) = struct.unpack_from('!H', data, offset + type_offset)
+            offset += hdr_len
+            cls = cls.get_packet_type(type_)
+        elif cls is ipv4.ipv4:
+            if end - offset < ipv4.ipv4._MIN_LEN:
+                break
+            protocols.add(cls)
+            (ver_ihl, total_length) = struct.unpack_from('!BxH', data, offset)
+            (proto, ) = struct.unpack_from('!B', data, offset + 9)
+            end = min(end, offset + total_length)
+            offset += (ver_ihl & 0xf) * 4
+            cls = ipv4.ipv4.get_packet_type(proto)
+        elif cls is ipv6.ipv6:
+            if end - offset < ipv6.ipv6._MIN_LEN:
+                break
+            protocols.add(cls)
+            (payload_length, nxt) = struct.unpack_from('!HB', data,
+                                                       offset + 4)
+            if nxt in ipv6.ipv6._IPV6_EXT_HEADER_TYPE:
+                return protocols, False
+            offset += ipv6.ipv6._MIN_LEN
+            end = min(end, offset + payload_length)
+            cls = ipv6.ipv6.get_packet_type(nxt)
+        elif cls in _LAST_HEADERS:
+            if end - offset >= _LAST_HEADERS[cls]:
+                protocols.add(cls)
+            break
+        else:
+            return protocols, False
+    return protocols, True
+
 
 def packet_in_filter(cls, args=None, logging=False):
     def _packet_in_filter(packet_in_handler):
         def __packet_in_filter(self, ev):
-            pkt = packet.Packet(ev.msg.data)
-            if not packet_in_handler.pkt_in_filter.filter(pkt):
+            # ev may be an EventPacketIn of lacplib etc.
+            msg = ev.msg
+            pkt_in_filter = packet_in_handler.pkt_in_filter
+            passed = pkt_in_filter.peek_filter(*peek_protocols(msg.data))
+            if passed is None:
+                passed = pkt_in_filter.filter(ofp_event.get_packet(msg))
+            if not passed:
                 if logging:
-                    LOG.debug('The packet is discarded by %s: %s' % (cls, pkt))
+                    LOG.debug('The packet is discarded by %s: %s' %
+                              (cls, ofp_event.get_packet(msg)))
                 return
             return packet_in_handler(self, ev)
         pkt_in_filter = cls(args)
@@ -47,12 +139,33 @@ class PacketInFilterBase(object):
     def filter(self, pkt):
         pass
 
+    def peek_filter(self, protocols, complete):
+        """Filter by the result of peek_protocols() before decoding.
+
+        Returns True or False, or None if the packet needs to be decoded
+        and passed to filter().
+        """
+        return None
+
 
 class RequiredTypeFilter(PacketInFilterBase):
 
+    def __init__(self, args):
+        super(RequiredTypeFilter, self).__init__(args)
+        # precompiled for peek_filter
+        self._required_types = tuple((args or {}).get('types') or [])
+
     def filter(self, pkt):
         required_types = self.args.get('types') or []
         for required_type in required_types:
             if not pkt.get_protocol(required_type):
                 return False
         return True
+
+    def peek_filter(self, protocols, complete):
+        for required_type in self._required_types:
+            if not any(issubclass(protocol, required_type)
+                       for protocol in protocols):
+                # it might be found by decoding further
+                return False if complete else None
+        return True
@@ -18,6 +18,16 @@ import struct
 
 from . import packet_base
 from . import ethernet
+from . import icmp
+from . import icmpv6
+from . import sctp
+from . import tcp
+from . import udp
+
+
+# the protocols after which the header-only decoding stops.
+_TRANSPORT_PROTOCOLS = (tcp.tcp, udp.udp, sctp.sctp, icmp.icmp,
+                        icmpv6.icmpv6)
 
 
 class Packet(object):
@@ -32,9 +42,14 @@ class Packet(object):
     The payload is a bytearray.  They are iterated in on-wire order.
 
     *data* should be omitted when encoding a packet.
+
+    If *headers_only* is True, decoding stops after the transport
+    protocol header (tcp, udp, sctp, icmp or icmpv6), and the rest is
+    left as the payload bytearray without being decoded.
     """
 
-    def __init__(self, data=None, protocols=None, parse_cls=ethernet.ethernet):
+    def __init__(self, data=None, protocols=None, parse_cls=ethernet.ethernet,
+                 headers_only=False):
         super(Packet, self).__init__()
         self.data = data
         if protocols is None:
@@ -42,9 +57,9 @@ class Packet(object):
         else:
             self.protocols = protocols
         if self.data:
-            self._parser(parse_cls)
+            self._parser(parse_cls, headers_only)
 
-    def _parser(self, cls):
+    def _parser(self, cls, headers_only=False):
         rest_data = self.data
         while cls:
             try:
@@ -53,6 +68,8 @@ class Packet(object):
                 break
             if proto:
                 self.protocols.append(proto)
+                if headers_only and isinstance(proto, _TRANSPORT_PROTOCOLS):
+                    break
         if rest_data:
             self.protocols.append(rest_data)
 
@@ -14,8 +14,11 @@
 # limitations under the License.
 
 
+import errno
 import os
 import logging
+import select
+import time
 
 from ryu.lib import hub
 from ryu.base import app_manager
@@ -26,6 +29,12 @@ import alert
 BUFSIZE = alert.AlertPkt._ALERTPKT_SIZE
 SOCKFILE = "/tmp/snort_alert"
 
+# the number of alerts received into a chunk at once
+_RECV_BATCH = 16
+
+# snort sets this in AlertPkt.val when there is no packet.
+_NOPACKET_STRUCT = 0x1
+
 
 class EventAlert(event.EventBase):
     def __init__(self, msg):
@@ -33,17 +42,83 @@ class EventAlert(event.EventBase):
         self.msg = msg
 
 
+class EventAlerts(event.EventBase):
+    """The alerts received at once, sent before EventAlert of each."""
+
+    def __init__(self, msgs):
+        super(EventAlerts, self).__init__()
+        self.msgs = msgs
+
+
+def _alert_key(msg):
+    # the signature and the IPv4 addresses of the packet, or None for
+    # an alert without an IPv4 packet.
+    net = msg.nethdr
+    if (msg.val & _NOPACKET_STRUCT or net + 20 > len(msg.pkt) or
+            ord(msg.pkt[net]) >> 4 != 4):
+        return None
+    ev = msg.event
+    return (ev.sig_generator, ev.sig_id, ev.sig_rev,
+            msg.pkt[net + 12:net + 20])
+
+
+class AlertFilter(object):
+    """Passes up to limit identical alerts in a window of seconds.
+
+    Alerts are identical if they are of the same signature for the
+    same IPv4 source and destination.  Alerts without an IPv4 packet
+    are always passed, and window of 0 passes all alerts.
+    """
+
+    def __init__(self, window, limit):
+        super(AlertFilter, self).__init__()
+        self.window = window
+        self.limit = limit
+        self.suppressed_count = 0
+        self._start = 0
+        self._counts = {}
+
+    def filter(self, msgs, now):
+        if not self.window:
+            return msgs
+        if now - self._start >= self.window:
+            self._start = now
+            self._counts = {}
+        counts = self._counts
+        passed = []
+        for msg in msgs:
+            key = _alert_key(msg)
+            if key is None:
+                passed.append(msg)
+                continue
+            count = counts.get(key, 0)
+            if count < self.limit:
+                passed.append(msg)
+            counts[key] = count + 1
+        self.suppressed_count += len(msgs) - len(passed)
+        return passed
+
+
 class SnortLib(app_manager.RyuApp):
 
     def __init__(self):
         super(SnortLib, self).__init__()
         self.name = 'snortlib'
         self.config = {'unixsock': True}
+        self.alert_filter = AlertFilter(0, 1)
         self._set_logger()
 
     def set_config(self, config):
+        """Sets the config.
+
+        'dedup_window' (seconds) and 'dedup_limit' (1 by default)
+        configure AlertFilter.  Alerts are not deduplicated unless
+        'dedup_window' is set.
+        """
         assert isinstance(config, dict)
         self.config = config
+        self.alert_filter = AlertFilter(config.get('dedup_window', 0),
+                                        config.get('dedup_limit', 1))
 
     def start_socket_server(self):
         if not self.config.get('unixsock'):
@@ -57,13 +132,41 @@ class SnortLib(app_manager.RyuApp):
 
         self.logger.info(self.config)
 
+    def _received(self, buf, end):
+        # parses the alerts in buf[:end], which is reused after return.
+        msgs = [alert.AlertPkt.parser(buf, offset)
+                for offset in xrange(0, end - BUFSIZE + 1, BUFSIZE)]
+        msgs = self.alert_filter.filter(msgs, time.time())
+        if msgs:
+            self.send_event_to_observers(EventAlerts(msgs))
+            for msg in msgs:
+                self.send_event_to_observers(EventAlert(msg))
+
     def _recv_loop(self):
         self.logger.info("Unix socket start listening...")
+        buf = bytearray(BUFSIZE * _RECV_BATCH)
+        self.sock.setblocking(False)
         while True:
-            data = self.sock.recv(BUFSIZE)
-            msg = alert.AlertPkt.parser(data)
-            if msg:
-                self.send_event_to_observers(EventAlert(msg))
+            select.select([self.sock], [], [])
+            self._received(buf, self._recv_batch(self.sock, buf))
+
+    def _recv_batch(self, sock, buf):
+        # receives the queued datagrams into buf until it is full, and
+        # returns the length received.
+        view = memoryview(buf)
+        end = 0
+        while end < len(buf):
+            try:
+                ret = sock.recv_into(view[end:], BUFSIZE)
+            except hub.socket.error as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if ret == BUFSIZE:
+                end += ret
+            else:
+                self.logger.debug(ret)
+        return end
 
     def _start_recv(self):
         if os.path.exists(SOCKFILE):
@@ -88,14 +191,29 @@ class SnortLib(app_manager.RyuApp):
         while True:
             conn, addr = self.nwsock.accept()
             self.logger.info("Connected with %s", addr[0])
-            data = conn.recv(BUFSIZE, hub.socket.MSG_WAITALL)
-
-            if len(data) == BUFSIZE:
-                msg = alert.AlertPkt.parser(data)
-                if msg:
-                    self.send_event_to_observers(EventAlert(msg))
-            else:
-                self.logger.debug(len(data))
+            hub.spawn(self._recv_loop_conn, conn, addr)
+
+    def _recv_loop_conn(self, conn, addr):
+        # alerts are streamed on a connection until it is closed.
+        buf = bytearray(BUFSIZE * _RECV_BATCH)
+        view = memoryview(buf)
+        end = 0
+        try:
+            while True:
+                ret = conn.recv_into(view[end:])
+                if ret == 0:
+                    break
+                end += ret
+                tail = end - end % BUFSIZE
+                self._received(buf, tail)
+                # move the partial alert to the head.
+                buf[:end - tail] = buf[tail:end]
+                end -= tail
+        finally:
+            if end:
+                self.logger.debug(end)
+            self.logger.info("Disconnected from %s", addr[0])
+            conn.close()
 
     def _set_logger(self):
         """change log format."""
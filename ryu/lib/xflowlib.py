@@ -0,0 +1,340 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+sFlow v5 and NetFlow v5 collector.
+
+XFlowLib receives the datagrams on UDP, aggregates the sampled traffic
+per flow and per interface in time windows, and sends EventTopTalkers
+to the observers at the end of every window:
+
+    _CONTEXTS = {'xflowlib': xflowlib.XFlowLib}
+
+    @set_ev_cls(xflowlib.EventTopTalkers)
+    def _top_talkers_handler(self, ev):
+        for flow, packets, bytes_ in ev.flows:
+            ...
+
+Only IPv4 traffic is accounted per flow.  A flow sampled by several
+agents is counted at each of them.
+"""
+
+import array
+import collections
+import errno
+import heapq
+import itertools
+import select
+import socket
+import struct
+import time
+
+from ryu import cfg
+from ryu.base import app_manager
+from ryu.controller import event
+from ryu.lib import addrconv
+from ryu.lib import hub
+from ryu.lib.xflow import netflow
+from ryu.lib.xflow import sflow
+from ryu.ofproto import ether
+from ryu.ofproto import inet
+
+
+CONF = cfg.CONF
+CONF.register_cli_opts([
+    cfg.IntOpt('xflow-sflow-port', default=6343,
+               help='UDP port to receive sFlow (0 to disable)'),
+    cfg.IntOpt('xflow-netflow-port', default=2055,
+               help='UDP port to receive NetFlow (0 to disable)'),
+    cfg.FloatOpt('xflow-window', default=10.,
+                 help='seconds over which sampled traffic is aggregated'),
+    cfg.IntOpt('xflow-top-talkers', default=10,
+               help='the number of flows reported per window'),
+])
+
+# datagrams are received into a chunk of this size until it cannot hold
+# one of _MAX_DATAGRAM.
+_RECV_CHUNK_SIZE = 1024 * 1024
+_MAX_DATAGRAM = 65535
+
+FlowKey = collections.namedtuple(
+    'FlowKey', ['src', 'dst', 'proto', 'src_port', 'dst_port'])
+
+
+class EventTopTalkers(event.EventBase):
+    """Sampled traffic in a window.
+
+    ================ =====================================================
+    Attribute        Description
+    ================ =====================================================
+    start, end       The window in seconds since the epoch.
+    flows            A list of (FlowKey, packets, bytes) of the top
+                     talkers, from the largest bytes.
+    interfaces       A dict of (agent address, ifIndex) ->
+                     (input bytes, output bytes).
+    ================ =====================================================
+
+    The counts are estimated from the samples and their sampling rates.
+    """
+
+    def __init__(self, start, end, flows, interfaces):
+        super(EventTopTalkers, self).__init__()
+        self.start = start
+        self.end = end
+        self.flows = flows
+        self.interfaces = interfaces
+
+
+class FlowRecords(object):
+    """Decoded flow samples stored as columns of arrays.
+
+    IPv4 addresses are kept as integers, and interfaces are ifIndex
+    (0 if unknown).  The counts are already scaled by the sampling rate.
+    """
+
+    _COLUMNS = [('agent', 'I'), ('src', 'I'), ('dst', 'I'), ('proto', 'B'),
+                ('src_port', 'H'), ('dst_port', 'H'),
+                ('in_if', 'I'), ('out_if', 'I'),
+                ('packets', 'd'), ('bytes', 'd')]
+    __slots__ = [name for name, _typecode in _COLUMNS]
+
+    def __init__(self):
+        for name, typecode in self._COLUMNS:
+            setattr(self, name, array.array(typecode))
+
+    def __len__(self):
+        return len(self.agent)
+
+    def append(self, agent, src, dst, proto, src_port, dst_port,
+               in_if, out_if, packets, bytes_):
+        self.agent.append(agent)
+        self.src.append(src)
+        self.dst.append(dst)
+        self.proto.append(proto)
+        self.src_port.append(src_port)
+        self.dst_port.append(dst_port)
+        self.in_if.append(in_if)
+        self.out_if.append(out_if)
+        self.packets.append(packets)
+        self.bytes.append(bytes_)
+
+
+_NETFLOW_V5_HDR = struct.Struct(netflow.NetFlowV5._PACK_STR)
+_NETFLOW_V5_FLOW = struct.Struct(netflow.NetFlowV5Flow._PACK_STR)
+
+
+def decode_netflow(records, agent, buf):
+    """Appends the flows in a NetFlow v5 datagram to records."""
+    (version, count, _uptime, _secs, _nsecs, _seq, _engine_type,
+     _engine_id, sampling) = _NETFLOW_V5_HDR.unpack_from(buf)
+    if version != netflow.NETFLOW_V5:
+        return
+    # the lower 14 bits are the sampling interval.
+    rate = (sampling & 0x3fff) or 1
+    count = min(count, (len(buf) - _NETFLOW_V5_HDR.size) //
+                _NETFLOW_V5_FLOW.size)
+    unpack_from = _NETFLOW_V5_FLOW.unpack_from
+    offset = _NETFLOW_V5_HDR.size
+    for _i in range(count):
+        (src, dst, _nexthop, in_if, out_if, packets, bytes_, _first,
+         _last, src_port, dst_port, _flags, proto, _tos, _src_as, _dst_as,
+         _src_mask, _dst_mask) = unpack_from(buf, offset)
+        records.append(agent, src, dst, proto, src_port, dst_port,
+                       in_if, out_if, packets * rate, bytes_ * rate)
+        offset += _NETFLOW_V5_FLOW.size
+
+
+_SFLOW_FORMAT_FLOW_SAMPLE = 1
+_SFLOW_FORMAT_EXPANDED_FLOW_SAMPLE = 3
+_SFLOW_FORMAT_RAW_HEADER = 1
+_SFLOW_HEADER_PROTOCOL_ETHERNET = 1
+_SFLOW_IF_MASK = 0x3fffffff
+
+
+def _decode_ethernet(buf, offset, end):
+    # (src, dst, proto, src port, dst port) of an IPv4 packet, or None.
+    (ethertype, ) = struct.unpack_from('!H', buf, offset + 12)
+    offset += 14
+    while ethertype in (ether.ETH_TYPE_8021Q, ether.ETH_TYPE_8021AD):
+        (ethertype, ) = struct.unpack_from('!H', buf, offset + 2)
+        offset += 4
+    if ethertype != ether.ETH_TYPE_IP or offset + 20 > end:
+        return None
+    (ver_ihl, _tos, _len, _id, frag, _ttl, proto, _csum, src,
+     dst) = struct.unpack_from('!BBHHHBBHII', buf, offset)
+    src_port = dst_port = 0
+    offset += (ver_ihl & 0xf) * 4
+    if (proto in (inet.IPPROTO_TCP, inet.IPPROTO_UDP, inet.IPPROTO_SCTP) and
+            not frag & 0x1fff and offset + 4 <= end):
+        src_port, dst_port = struct.unpack_from('!HH', buf, offset)
+    return src, dst, proto, src_port, dst_port
+
+
+def _decode_flow_records(records, agent, buf, offset, num, rate,
+                         in_if, out_if):
+    for _i in range(num):
+        fmt, length = struct.unpack_from('!II', buf, offset)
+        offset += 8
+        if fmt == _SFLOW_FORMAT_RAW_HEADER:
+            (protocol, frame_length, _stripped,
+             size) = struct.unpack_from('!IIII', buf, offset)
+            if protocol == _SFLOW_HEADER_PROTOCOL_ETHERNET:
+                flow = _decode_ethernet(buf, offset + 16, offset + 16 + size)
+                if flow is not None:
+                    records.append(agent, flow[0], flow[1], flow[2],
+                                   flow[3], flow[4], in_if, out_if,
+                                   rate, frame_length * rate)
+        offset += length
+
+
+def decode_sflow(records, agent, buf):
+    """Appends the sampled flows in an sFlow v5 datagram to records."""
+    (version, address_type) = struct.unpack_from('!II', buf)
+    if version != sflow.SFLOW_V5:
+        return
+    if address_type == sflow.sFlowV5._AGENT_IPTYPE_V4:
+        offset = sflow.sFlowV5._MIN_LEN_V4
+    elif address_type == sflow.sFlowV5._AGENT_IPTYPE_V6:
+        offset = sflow.sFlowV5._MIN_LEN_V6
+    else:
+        return
+    (num, ) = struct.unpack_from('!I', buf, offset - 4)
+    for _i in range(num):
+        fmt, length = struct.unpack_from('!II', buf, offset)
+        offset += 8
+        if fmt == _SFLOW_FORMAT_FLOW_SAMPLE:
+            (_seq, _source, rate, _pool, _drops, in_if, out_if,
+             num_records) = struct.unpack_from('!8I', buf, offset)
+            _decode_flow_records(records, agent, buf, offset + 32,
+                                 num_records, rate, in_if & _SFLOW_IF_MASK,
+                                 out_if & _SFLOW_IF_MASK)
+        elif fmt == _SFLOW_FORMAT_EXPANDED_FLOW_SAMPLE:
+            (_seq, _source_type, _source_index, rate, _pool, _drops,
+             _in_format, in_if, _out_format, out_if,
+             num_records) = struct.unpack_from('!11I', buf, offset)
+            _decode_flow_records(records, agent, buf, offset + 44,
+                                 num_records, rate, in_if, out_if)
+        offset += length
+
+
+class _Window(object):
+    def __init__(self, start):
+        self.start = start
+        self.flows = {}       # FlowKey as a tuple -> [packets, bytes]
+        self.interfaces = {}  # (agent, ifIndex) -> [input, output bytes]
+
+    def add(self, records):
+        flows = self.flows
+        interfaces = self.interfaces
+        for (agent, src, dst, proto, src_port, dst_port, in_if, out_if,
+             packets, bytes_) in itertools.izip(
+                 records.agent, records.src, records.dst, records.proto,
+                 records.src_port, records.dst_port, records.in_if,
+                 records.out_if, records.packets, records.bytes):
+            counts = flows.get((src, dst, proto, src_port, dst_port))
+            if counts is None:
+                flows[(src, dst, proto, src_port, dst_port)] = [packets,
+                                                                bytes_]
+            else:
+                counts[0] += packets
+                counts[1] += bytes_
+            if in_if:
+                interfaces.setdefault((agent, in_if), [0, 0])[0] += bytes_
+            if out_if:
+                interfaces.setdefault((agent, out_if), [0, 0])[1] += bytes_
+
+    def top_talkers(self, n):
+        top = heapq.nlargest(n, self.flows.iteritems(),
+                             key=lambda item: item[1][1])
+        return [(FlowKey(_int_to_ipv4(src), _int_to_ipv4(dst), proto,
+                         src_port, dst_port), packets, bytes_)
+                for ((src, dst, proto, src_port, dst_port),
+                     (packets, bytes_)) in top]
+
+
+def _int_to_ipv4(addr):
+    return addrconv.ipv4.bin_to_text(struct.pack('!I', addr))
+
+
+def _ipv4_to_int(addr):
+    return struct.unpack('!I', addrconv.ipv4.text_to_bin(addr))[0]
+
+
+class XFlowLib(app_manager.RyuApp):
+    _EVENTS = [EventTopTalkers]
+
+    def __init__(self, *args, **kwargs):
+        super(XFlowLib, self).__init__(*args, **kwargs)
+        self.name = 'xflowlib'
+        self.window = _Window(time.time())
+        self.dropped_count = 0
+
+    def start(self):
+        super(XFlowLib, self).start()
+        for port, decode in [(self.CONF.xflow_sflow_port, decode_sflow),
+                             (self.CONF.xflow_netflow_port, decode_netflow)]:
+            if port:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                sock.bind(('0.0.0.0', port))
+                sock.setblocking(False)
+                self.threads.append(hub.spawn(self._recv_loop, sock, decode))
+        return hub.spawn(self._window_loop)
+
+    def _window_loop(self):
+        while self.is_active:
+            hub.sleep(self.CONF.xflow_window)
+            self._publish(time.time())
+
+    def _publish(self, now):
+        window = self.window
+        self.window = _Window(now)
+        interfaces = dict(((_int_to_ipv4(agent), if_index), tuple(counts))
+                          for (agent, if_index), counts
+                          in window.interfaces.iteritems())
+        self.send_event_to_observers(EventTopTalkers(
+            window.start, now,
+            window.top_talkers(self.CONF.xflow_top_talkers), interfaces))
+
+    def _recv_loop(self, sock, decode):
+        buf = bytearray(_RECV_CHUNK_SIZE)
+        while self.is_active:
+            select.select([sock], [], [])
+            self._recv_batch(sock, buf, decode)
+
+    def _recv_batch(self, sock, buf, decode):
+        # receive the datagrams queued on the socket at once, and decode
+        # them before the chunk is reused for the next batch.
+        view = memoryview(buf)
+        datagrams = []
+        offset = 0
+        while offset + _MAX_DATAGRAM <= len(buf):
+            try:
+                size, addr = sock.recvfrom_into(view[offset:], _MAX_DATAGRAM)
+            except socket.error as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            datagrams.append((offset, size, addr[0]))
+            offset += size
+
+        records = FlowRecords()
+        for offset, size, addr in datagrams:
+            try:
+                decode(records, _ipv4_to_int(addr), buffer(buf, offset, size))
+            except struct.error:
+                self.dropped_count += 1
+                self.logger.debug('malformed datagram from %s', addr)
+        self.window.add(records)
+        return len(datagrams)
@@ -29,6 +29,16 @@ from . import ofproto_common
 
 LOG = logging.getLogger('ryu.ofproto.ofproto_parser')
 
+# When enabled, message parsers defer decoding of sub-structures
+# (e.g. match of packet-in, body of multipart replies) until the
+# attribute is accessed.  Cf. MsgBase.set_lazy_attr
+_LAZY_PARSE = False
+
+
+def set_lazy_parse(enable):
+    global _LAZY_PARSE
+    _LAZY_PARSE = enable
+
 
 def header(buf):
     assert len(buf) >= ofproto_common.OFP_HEADER_SIZE
@@ -148,6 +158,43 @@ class MsgBase(StringifyMixin):
         self.msg_len = None
         self.xid = None
         self.buf = None
+        self._lazy_attrs = {}
+
+    def set_lazy_attr(self, name, decoder, *args):
+        """Set the attribute to decoder(*args).
+
+        In the lazy parse mode, the decoder is not called until the
+        attribute is accessed for the first time, and the result is
+        cached on the instance.
+        """
+        if not _LAZY_PARSE:
+            setattr(self, name, decoder(*args))
+            return
+        self.__dict__.pop(name, None)
+        self._lazy_attrs[name] = (decoder, args)
+
+    def __getattr__(self, name):
+        # called only if the attribute is not found in the usual ways.
+        lazy_attrs = self.__dict__.get('_lazy_attrs')
+        if not lazy_attrs or name not in lazy_attrs:
+            raise AttributeError(name)
+        decoder, args = lazy_attrs.pop(name)
+        value = decoder(*args)
+        setattr(self, name, value)
+        return value
+
+    def decode_lazy_attrs(self):
+        """Decode all the attributes deferred by the lazy parse mode."""
+        for name in self._lazy_attrs.keys():
+            if name in self.__dict__:
+                # overwritten before being decoded
+                del self._lazy_attrs[name]
+            else:
+                getattr(self, name)
+
+    def stringify_attrs(self):
+        self.decode_lazy_attrs()
+        return super(MsgBase, self).stringify_attrs()
 
     def set_headers(self, version, msg_type, msg_len, xid):
         assert msg_type == self.cls_msg_type
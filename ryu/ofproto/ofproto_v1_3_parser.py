@@ -777,17 +777,50 @@ class OFPMatch(StringifyMixin):
             self._fields2 = [ofproto.oxm_to_user(n, v, m) for (n, v, m)
                              in fields]
 
+    @property
+    def _fields2(self):
+        return self._ordered_fields
+
+    @_fields2.setter
+    def _fields2(self, fields):
+        self._ordered_fields = fields
+        self._index = None
+
+    def _field_index(self):
+        # built by the first query and dropped when _fields2 is replaced
+        if self._index is None:
+            self._index = dict(self._ordered_fields)
+        return self._index
+
     def __getitem__(self, key):
-        return dict(self._fields2)[key]
+        return self._field_index()[key]
 
     def __contains__(self, key):
-        return key in dict(self._fields2)
+        return key in self._field_index()
 
     def iteritems(self):
-        return dict(self._fields2).iteritems()
+        return self._field_index().iteritems()
 
     def get(self, key, default=None):
-        return dict(self._fields2).get(key, default)
+        return self._field_index().get(key, default)
+
+    # shortcuts for the fields which most applications look at.
+    # None if the match does not have the field.
+    @property
+    def in_port(self):
+        return self._field_index().get('in_port')
+
+    @property
+    def eth_type(self):
+        return self._field_index().get('eth_type')
+
+    @property
+    def ipv4_src(self):
+        return self._field_index().get('ipv4_src')
+
+    @property
+    def ipv4_dst(self):
+        return self._field_index().get('ipv4_dst')
 
     def stringify_attrs(self):
         yield "oxm_fields", dict(self._fields2)
@@ -2075,10 +2108,12 @@ class OFPPacketIn(MsgBase):
          ) = struct.unpack_from(ofproto.OFP_PACKET_IN_PACK_STR,
                                 msg.buf, ofproto.OFP_HEADER_SIZE)
 
-        msg.match = OFPMatch.parser(msg.buf, ofproto.OFP_PACKET_IN_SIZE -
-                                    ofproto.OFP_MATCH_SIZE)
+        offset = ofproto.OFP_PACKET_IN_SIZE - ofproto.OFP_MATCH_SIZE
+        msg.set_lazy_attr('match', OFPMatch.parser, msg.buf, offset)
 
-        match_len = utils.round_up(msg.match.length, 8)
+        (_type, length) = struct.unpack_from(ofproto.OFP_MATCH_PACK_STR,
+                                             msg.buf, offset)[:2]
+        match_len = utils.round_up(length, 8)
         msg.data = msg.buf[(ofproto.OFP_PACKET_IN_SIZE -
                             ofproto.OFP_MATCH_SIZE + match_len + 2):]
 
@@ -2193,7 +2228,7 @@ class OFPFlowRemoved(MsgBase):
         offset = (ofproto.OFP_FLOW_REMOVED_SIZE -
                   ofproto.OFP_MATCH_SIZE)
 
-        msg.match = OFPMatch.parser(msg.buf, offset)
+        msg.set_lazy_attr('match', OFPMatch.parser, msg.buf, offset)
 
         return msg
 
@@ -3603,19 +3638,22 @@ class OFPMultipartReply(MsgBase):
             datapath, version, msg_type, msg_len, xid, buf)
         msg.type = type_
         msg.flags = flags
+        msg.set_lazy_attr('body', cls._parser_body, stats_type_cls,
+                          msg.buf, msg_len)
+        return msg
 
+    @staticmethod
+    def _parser_body(stats_type_cls, buf, msg_len):
         offset = ofproto.OFP_MULTIPART_REPLY_SIZE
         body = []
         while offset < msg_len:
-            b = stats_type_cls.cls_stats_body_cls.parser(msg.buf, offset)
+            b = stats_type_cls.cls_stats_body_cls.parser(buf, offset)
             body.append(b)
             offset += b.length if hasattr(b, 'length') else b.len
 
         if stats_type_cls.cls_body_single_struct:
-            msg.body = body[0]
-        else:
-            msg.body = body
-        return msg
+            return body[0]
+        return body
 
 
 class OFPDescStats(ofproto_parser.namedtuple('OFPDescStats', (
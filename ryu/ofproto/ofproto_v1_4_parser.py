@@ -713,17 +713,50 @@ class OFPMatch(StringifyMixin):
 
         return length + pad_len
 
+    @property
+    def _fields2(self):
+        return self._ordered_fields
+
+    @_fields2.setter
+    def _fields2(self, fields):
+        self._ordered_fields = fields
+        self._index = None
+
+    def _field_index(self):
+        # built by the first query and dropped when _fields2 is replaced
+        if self._index is None:
+            self._index = dict(self._ordered_fields)
+        return self._index
+
     def __getitem__(self, key):
-        return dict(self._fields2)[key]
+        return self._field_index()[key]
 
     def __contains__(self, key):
-        return key in dict(self._fields2)
+        return key in self._field_index()
 
     def iteritems(self):
-        return dict(self._fields2).iteritems()
+        return self._field_index().iteritems()
 
     def get(self, key, default=None):
-        return dict(self._fields2).get(key, default)
+        return self._field_index().get(key, default)
+
+    # shortcuts for the fields which most applications look at.
+    # None if the match does not have the field.
+    @property
+    def in_port(self):
+        return self._field_index().get('in_port')
+
+    @property
+    def eth_type(self):
+        return self._field_index().get('eth_type')
+
+    @property
+    def ipv4_src(self):
+        return self._field_index().get('ipv4_src')
+
+    @property
+    def ipv4_dst(self):
+        return self._field_index().get('ipv4_dst')
 
     def stringify_attrs(self):
         yield "oxm_fields", dict(self._fields2)
@@ -1642,10 +1675,12 @@ class OFPPacketIn(MsgBase):
             ofproto.OFP_PACKET_IN_PACK_STR,
             msg.buf, ofproto.OFP_HEADER_SIZE)
 
-        msg.match = OFPMatch.parser(msg.buf, ofproto.OFP_PACKET_IN_SIZE -
-                                    ofproto.OFP_MATCH_SIZE)
+        offset = ofproto.OFP_PACKET_IN_SIZE - ofproto.OFP_MATCH_SIZE
+        msg.set_lazy_attr('match', OFPMatch.parser, msg.buf, offset)
 
-        match_len = utils.round_up(msg.match.length, 8)
+        (_type, length) = struct.unpack_from(ofproto.OFP_MATCH_PACK_STR,
+                                             msg.buf, offset)[:2]
+        match_len = utils.round_up(length, 8)
         msg.data = msg.buf[(ofproto.OFP_PACKET_IN_SIZE -
                             ofproto.OFP_MATCH_SIZE + match_len + 2):]
 
@@ -1748,7 +1783,7 @@ class OFPFlowRemoved(MsgBase):
 
         offset = (ofproto.OFP_FLOW_REMOVED_SIZE - ofproto.OFP_MATCH_SIZE)
 
-        msg.match = OFPMatch.parser(msg.buf, offset)
+        msg.set_lazy_attr('match', OFPMatch.parser, msg.buf, offset)
 
         return msg
 
@@ -2008,19 +2043,22 @@ class OFPMultipartReply(MsgBase):
             datapath, version, msg_type, msg_len, xid, buf)
         msg.type = type_
         msg.flags = flags
+        msg.set_lazy_attr('body', cls._parser_body, stats_type_cls,
+                          msg.buf, msg_len)
+        return msg
 
+    @staticmethod
+    def _parser_body(stats_type_cls, buf, msg_len):
         offset = ofproto.OFP_MULTIPART_REPLY_SIZE
         body = []
         while offset < msg_len:
-            b = stats_type_cls.cls_stats_body_cls.parser(msg.buf, offset)
+            b = stats_type_cls.cls_stats_body_cls.parser(buf, offset)
             body.append(b)
             offset += b.length if hasattr(b, 'length') else b.len
 
         if stats_type_cls.cls_body_single_struct:
-            msg.body = body[0]
-        else:
-            msg.body = body
-        return msg
+            return body[0]
+        return body
 
 
 class OFPDescStats(ofproto_parser.namedtuple('OFPDescStats', (
@@ -5899,6 +5937,7 @@ class OFPSetAsync(MsgBase):
         self.buf += bin_props
 
 
+@_register_parser
 @_set_msg_type(ofproto.OFPT_BUNDLE_CONTROL)
 class OFPBundleCtrlMsg(MsgBase):
     """
@@ -5938,13 +5977,29 @@ class OFPBundleCtrlMsg(MsgBase):
                                               [ofp.OFPBF_ATOMIC], [])
             datapath.send_msg(req)
     """
-    def __init__(self, datapath, bundle_id, type_, flags, properties):
+    def __init__(self, datapath, bundle_id=None, type_=None, flags=None,
+                 properties=None):
         super(OFPBundleCtrlMsg, self).__init__(datapath)
         self.bundle_id = bundle_id
         self.type = type_
         self.flags = flags
         self.properties = properties
 
+    @classmethod
+    def parser(cls, datapath, version, msg_type, msg_len, xid, buf):
+        msg = super(OFPBundleCtrlMsg, cls).parser(datapath, version,
+                                                  msg_type, msg_len,
+                                                  xid, buf)
+        (msg.bundle_id, msg.type, msg.flags) = struct.unpack_from(
+            ofproto.OFP_BUNDLE_CTRL_MSG_PACK_STR, msg.buf,
+            ofproto.OFP_HEADER_SIZE)
+        msg.properties = []
+        rest = msg.buf[ofproto.OFP_BUNDLE_CTRL_MSG_SIZE:]
+        while rest:
+            p, rest = OFPBundleProp.parse(rest)
+            msg.properties.append(p)
+        return msg
+
     def _serialize_body(self):
         bin_props = bytearray()
         for p in self.properties:
@@ -34,6 +34,7 @@ class BgpWSJsonRpc(app_manager.RyuApp):
     _CONTEXTS = {
         'wsgi': WSGIApplication,
     }
+    _GLOBAL = True
 
     def __init__(self, *args, **kwargs):
         super(BgpWSJsonRpc, self).__init__(*args, **kwargs)
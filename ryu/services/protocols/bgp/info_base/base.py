@@ -24,8 +24,10 @@ from abc import abstractmethod
 from copy import copy
 import logging
 import netaddr
+import weakref
 
 from ryu.lib.packet.bgp import RF_IPv4_UC
+from ryu.lib.packet.bgp import RF_IPv6_UC
 from ryu.lib.packet.bgp import RouteTargetMembershipNLRI
 from ryu.lib.packet.bgp import BGP_ATTR_TYPE_EXTENDED_COMMUNITIES
 from ryu.lib.packet.bgp import BGPPathAttributeLocalPref
@@ -37,6 +39,9 @@ from ryu.services.protocols.bgp.constants import VRF_TABLE
 from ryu.services.protocols.bgp.model import OutgoingRoute
 from ryu.services.protocols.bgp.processor import BPR_ONLY_PATH
 from ryu.services.protocols.bgp.processor import BPR_UNKNOWN
+from ryu.services.protocols.bgp.utils.radix import Ipv4RadixTree
+from ryu.services.protocols.bgp.utils.radix import Ipv6RadixTree
+from ryu.services.protocols.bgp.utils.internable import Internable
 
 
 LOG = logging.getLogger('bgpspeaker.info_base.base')
@@ -51,9 +56,15 @@ class Table(object):
     """
     __metaclass__ = abc.ABCMeta
     ROUTE_FAMILY = RF_IPv4_UC
+    # RadixTree sub-class indexing destinations by nlri.prefix, for the
+    # tables which can answer longest-match and covering-prefix lookups.
+    PREFIX_INDEX_CLASS = None
 
     def __init__(self, scope_id, core_service, signal_bus):
         self._destinations = dict()
+        self._prefix_index = None
+        if self.PREFIX_INDEX_CLASS is not None:
+            self._prefix_index = self.PREFIX_INDEX_CLASS()
         # Scope in which this table exists.
         # If this table represents the VRF, then this could be a VPN ID.
         # For global/VPN tables this should be None
@@ -163,11 +174,41 @@ class Table(object):
         self._validate_nlri(nlri)
         dest = self._get_dest(nlri)
         if dest:
-            self._destinations.pop(dest)
+            self.delete_dest(dest)
         return dest
 
     def delete_dest(self, dest):
         del self._destinations[self._table_key(dest.nlri)]
+        if self._prefix_index is not None:
+            self._prefix_index.remove(dest.nlri.prefix)
+
+    def _get_prefix_index(self):
+        if self._prefix_index is None:
+            raise ValueError('%s does not support prefix lookups' % self)
+        return self._prefix_index
+
+    def longest_match(self, prefix):
+        """Returns the destination of the longest prefix covering given
+        `prefix` or address, or None if there is no such destination.
+        """
+        match = self._get_prefix_index().longest_match(prefix)
+        if match is None:
+            return None
+        return match[1]
+
+    def covering_dests(self, prefix):
+        """Returns the destinations of the prefixes covering given
+        `prefix`, including itself, from the shortest prefix.
+        """
+        return [dest for _prefix, dest
+                in self._get_prefix_index().covering(prefix)]
+
+    def covered_dests(self, prefix):
+        """Returns the destinations of the prefixes covered by given
+        `prefix`, including itself.
+        """
+        return [dest for _prefix, dest
+                in self._get_prefix_index().covered(prefix)]
 
     def _validate_nlri(self, nlri):
         """Validated *nlri* is the type that this table stores/supports.
@@ -191,6 +232,8 @@ class Table(object):
         if dest is None:
             dest = self._create_dest(nlri)
             self._destinations[table_key] = dest
+            if self._prefix_index is not None:
+                self._prefix_index.add(nlri.prefix, dest)
         return dest
 
     def _get_dest(self, nlri):
@@ -356,7 +399,7 @@ class Destination(object):
             return True
         return False
 
-    def _process(self):
+    def _process(self, selector=None):
         """Calculate best path for this destination.
 
         A destination is processed when known paths to this destination has
@@ -366,7 +409,7 @@ class Destination(object):
         choose new best-path. Communicates best-path to core service.
         """
         LOG.debug('Processing destination: %s', self)
-        new_best_path, reason = self._process_paths()
+        new_best_path, reason = self._process_paths(selector)
         self._best_path_reason = reason
 
         if self._best_path == new_best_path:
@@ -395,8 +438,13 @@ class Destination(object):
                 (cls.ROUTE_FAMILY, path)
             )
 
-    def process(self):
-        self._process()
+    def process(self, selector=None):
+        """Processes this destination.
+
+        `selector` is a BestPathSelector shared by the destinations
+        processed in a batch.
+        """
+        self._process(selector)
         if not self._known_path_list and not self._best_path:
             self._remove_dest_from_table()
 
@@ -446,7 +494,7 @@ class Destination(object):
         sent_route.sent_peer.enque_outgoing_msg(outgoing_route)
         return True
 
-    def _process_paths(self):
+    def _process_paths(self, selector=None):
         """Calculates best-path among known paths for this destination.
 
         Returns:
@@ -485,7 +533,7 @@ class Destination(object):
             return None, BPR_UNKNOWN
 
         # Compute new best path
-        current_best_path, reason = self._compute_best_known_path()
+        current_best_path, reason = self._compute_best_known_path(selector)
         return current_best_path, reason
 
     def _remove_withdrawals(self):
@@ -568,7 +616,7 @@ class Destination(object):
                 LOG.debug('Implicit withdrawal of old path, since we have'
                           ' learned new path from same source: %s' % old_path)
 
-    def _compute_best_known_path(self):
+    def _compute_best_known_path(self, selector=None):
         """Computes the best path among known paths.
 
         Returns current best path among `known_paths`.
@@ -583,12 +631,13 @@ class Destination(object):
         # calculation steps lead to tie.
         current_best_path = self._known_path_list[0]
         best_path_reason = BPR_ONLY_PATH
+        if len(self._known_path_list) > 1 and selector is None:
+            from ryu.services.protocols.bgp.processor import BestPathSelector
+            selector = BestPathSelector(self._core_service.asn)
         for next_path in self._known_path_list[1:]:
-            from ryu.services.protocols.bgp.processor import compute_best_path
             # Compare next path with current best path.
             new_best_path, reason = \
-                compute_best_path(self._core_service.asn, current_best_path,
-                                  next_path)
+                selector.compute_best_path(current_best_path, next_path)
             best_path_reason = reason
             if new_best_path is not None:
                 current_best_path = new_best_path
@@ -648,6 +697,80 @@ class Destination(object):
         return result
 
 
+class PathAttrs(Internable):
+    """An immutable set of path attributes keyed by attribute type.
+
+    Paths share interned instances, so that a table holds one copy of
+    each distinct set, and of each distinct attribute, however many
+    paths use them.  Interned sets are equal if and only if they are
+    identical.
+
+    Create an interned instance by::
+
+        pattrs = PathAttrs(pathattr_map).intern()
+    """
+
+    # Canonical attributes.  (type, bytes) -> path attribute
+    _attrs = weakref.WeakValueDictionary()
+
+    def __init__(self, pattrs=None):
+        self._map = OrderedDict()
+        key = []
+        for attr_type, attr in (pattrs or {}).iteritems():
+            bin_attr = str(attr.serialize())
+            attr = self._intern_attr(attr_type, bin_attr, attr)
+            self._map[attr_type] = attr
+            key.append((attr_type, bin_attr))
+        self._key = tuple(key)
+        self._hash = hash(self._key)
+
+    @classmethod
+    def _intern_attr(cls, attr_type, bin_attr, attr):
+        try:
+            return cls._attrs[(attr_type, bin_attr)]
+        except KeyError:
+            cls._attrs[(attr_type, bin_attr)] = attr
+            return attr
+
+    def __eq__(self, other):
+        return self is other or (isinstance(other, PathAttrs) and
+                                 self._key == other._key)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return self._hash
+
+    def __len__(self):
+        return len(self._map)
+
+    def __iter__(self):
+        return iter(self._map)
+
+    def __contains__(self, attr_type):
+        return attr_type in self._map
+
+    def __getitem__(self, attr_type):
+        return self._map[attr_type]
+
+    def get(self, attr_type, default=None):
+        return self._map.get(attr_type, default)
+
+    def iteritems(self):
+        return self._map.iteritems()
+
+    def itervalues(self):
+        return self._map.itervalues()
+
+    def to_dict(self):
+        """Returns a mutable copy as OrderedDict."""
+        return copy(self._map)
+
+    def __repr__(self):
+        return repr(self._map)
+
+
 class Path(object):
     """Represents a way of reaching an IP destination.
 
@@ -701,10 +824,9 @@ class Path(object):
         self._source = source
 
         # Path attribute of this path.
-        if pattrs:
-            self._path_attr_map = copy(pattrs)
-        else:
-            self._path_attr_map = OrderedDict()
+        if not isinstance(pattrs, PathAttrs):
+            pattrs = PathAttrs(pattrs)
+        self._path_attr_map = pattrs.intern()
 
         # NLRI that this path represents.
         self._nlri = nlri
@@ -747,7 +869,12 @@ class Path(object):
 
     @property
     def pathattr_map(self):
-        return copy(self._path_attr_map)
+        return self._path_attr_map.to_dict()
+
+    @property
+    def pathattrs(self):
+        """Interned `PathAttrs` of this path."""
+        return self._path_attr_map
 
     @property
     def nexthop(self):
@@ -763,7 +890,7 @@ class Path(object):
     def clone(self, for_withdrawal=False):
         pathattrs = None
         if not for_withdrawal:
-            pathattrs = self.pathattr_map
+            pathattrs = self._path_attr_map
         clone = self.__class__(
             self.source,
             self.nlri,
@@ -939,6 +1066,16 @@ class PrefixFilter(Filter):
     def le(self):
         return self._le
 
+    def match_length(self, length):
+        """Returns True if the prefix length `length` meets ge and le
+        condition of this object.
+        """
+        if self._ge and length < self._ge:
+            return False
+        if self._le and length > self._le:
+            return False
+        return True
+
     def evaluate(self, path):
         """ This method evaluates the prefix.
 
@@ -953,24 +1090,10 @@ class PrefixFilter(Filter):
         nlri = path.nlri
 
         result = False
-        length = nlri.length
         net = netaddr.IPNetwork(nlri.prefix)
 
         if net in self._network:
-            if self._ge is None and self._le is None:
-                result = True
-
-            elif self._ge is None and self._le:
-                if length <= self._le:
-                    result = True
-
-            elif self._ge and self._le is None:
-                if self._ge <= length:
-                    result = True
-
-            elif self._ge and self._le:
-                if self._ge <= length <= self._le:
-                    result = True
+            result = self.match_length(nlri.length)
 
         return self.policy, result
 
@@ -1114,6 +1237,90 @@ class ASPathFilter(Filter):
                               policy=self._policy)
 
 
+class FilterList(object):
+    """A list of filters compiled for evaluation.
+
+    The prefixes of PrefixFilters are stored in a radix tree per route
+    family, so that evaluating the list costs about a single tree walk
+    however many PrefixFilters it has.  The other filters are evaluated
+    one by one.  As with a plain list of filters, the first matching
+    filter decides whether a path is blocked.
+    """
+    _RADIX_TREE_CLASSES = {
+        RF_IPv4_UC: Ipv4RadixTree,
+        RF_IPv6_UC: Ipv6RadixTree,
+    }
+
+    def __init__(self, filters):
+        self._filters = list(filters)
+        self._trees = {}  # route family -> RadixTree of [(index, filter)]
+        self._others = []  # [(index, filter)]
+        for index, filter_ in enumerate(self._filters):
+            if not self._add_prefix_filter(index, filter_):
+                self._others.append((index, filter_))
+
+    def _add_prefix_filter(self, index, filter_):
+        if (not isinstance(filter_, PrefixFilter) or
+                filter_.policy not in (Filter.POLICY_PERMIT,
+                                       Filter.POLICY_DENY)):
+            return False
+        tree_cls = self._RADIX_TREE_CLASSES.get(filter_.ROUTE_FAMILY)
+        if tree_cls is None:
+            return False
+        tree = self._trees.get(filter_.ROUTE_FAMILY)
+        if tree is None:
+            tree = self._trees[filter_.ROUTE_FAMILY] = tree_cls()
+        try:
+            entries = tree.get(filter_.prefix)
+            if entries is None:
+                entries = []
+                tree.add(filter_.prefix, entries)
+        except ValueError:
+            # e.g. IPv6 prefix in a filter for IPv4
+            return False
+        entries.append((index, filter_))
+        return True
+
+    def __iter__(self):
+        return iter(self._filters)
+
+    def __len__(self):
+        return len(self._filters)
+
+    def evaluate(self, path):
+        """Evaluates the filters for given path.
+
+        Returns a tuple of whether the path is blocked and the cause.
+        """
+        route_family = path.ROUTE_FAMILY
+        match = None
+        tree = self._trees.get(route_family)
+        if tree is not None:
+            length = path.nlri.length
+            for _prefix, entries in tree.covering(path.nlri.prefix):
+                for index, filter_ in entries:
+                    if match is not None and match[0] < index:
+                        break
+                    if filter_.match_length(length):
+                        match = (index, filter_)
+                        break
+
+        for index, filter_ in self._others:
+            if match is not None and match[0] < index:
+                break
+            if filter_.ROUTE_FAMILY != route_family:
+                continue
+            policy, is_matched = filter_.evaluate(path)
+            if is_matched and policy in (Filter.POLICY_PERMIT,
+                                         Filter.POLICY_DENY):
+                match = (index, filter_)
+                break
+
+        if match is None or match[1].policy != Filter.POLICY_DENY:
+            return False, None
+        return True, match[1].prefix + ' - DENY'
+
+
 class AttributeMap(object):
     """
     This class is used to specify an attribute to add if the path matches
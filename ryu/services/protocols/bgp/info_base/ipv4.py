@@ -26,6 +26,7 @@ from ryu.services.protocols.bgp.info_base.base import Table
 from ryu.services.protocols.bgp.info_base.base import Destination
 from ryu.services.protocols.bgp.info_base.base import NonVrfPathProcessingMixin
 from ryu.services.protocols.bgp.info_base.base import PrefixFilter
+from ryu.services.protocols.bgp.utils.radix import Ipv4RadixTree
 
 LOG = logging.getLogger('bgpspeaker.info_base.ipv4')
 
@@ -54,6 +55,7 @@ class Ipv4Table(Table):
     paths.
     """
     ROUTE_FAMILY = RF_IPv4_UC
+    PREFIX_INDEX_CLASS = Ipv4RadixTree
     VPN_DEST_CLASS = IPv4Dest
 
     def __init__(self, core_service, signal_bus):
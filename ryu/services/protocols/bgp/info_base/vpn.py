@@ -66,7 +66,7 @@ class VpnPath(Path):
 
         pathattrs = None
         if not is_withdraw:
-            pathattrs = self.pathattr_map
+            pathattrs = self.pathattrs
 
         vrf_path = self.VRF_PATH_CLASS(
             self.VRF_PATH_CLASS.create_puid(
@@ -158,7 +158,7 @@ class VrfTable(Table):
             source,
             vrf_nlri,
             vpn_path.source_version_num,
-            pattrs=vpn_path.pathattr_map,
+            pattrs=vpn_path.pathattrs,
             nexthop=vpn_path.nexthop,
             is_withdraw=vpn_path.is_withdraw,
             label_list=vpn_path.nlri.label_list
@@ -473,7 +473,7 @@ class VrfPath(Path):
     def clone(self, for_withdrawal=False):
         pathattrs = None
         if not for_withdrawal:
-            pathattrs = self.pathattr_map
+            pathattrs = self.pathattrs
 
         clone = self.__class__(
             self.puid,
@@ -496,7 +496,7 @@ class VrfPath(Path):
 
         pathattrs = None
         if not for_withdrawal:
-            pathattrs = self.pathattr_map
+            pathattrs = self.pathattrs
         vpnv_path = self.VPN_PATH_CLASS(
             self.source, vpn_nlri,
             self.source_version_num,
@@ -517,7 +517,7 @@ class VrfPath(Path):
             return False
         if not self.nexthop == b_path.nexthop:
             return False
-        if not self.pathattr_map == b_path.pathattr_map:
+        if not self.pathattrs == b_path.pathattrs:
             return False
 
         return True
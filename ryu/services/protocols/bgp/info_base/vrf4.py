@@ -31,6 +31,7 @@ from ryu.services.protocols.bgp.info_base.vrf import VrfDest
 from ryu.services.protocols.bgp.info_base.vrf import VrfNlriImportMap
 from ryu.services.protocols.bgp.info_base.vrf import VrfPath
 from ryu.services.protocols.bgp.info_base.vrf import VrfTable
+from ryu.services.protocols.bgp.utils.radix import Ipv4RadixTree
 
 LOG = logging.getLogger('bgpspeaker.info_base.vrf4')
 
@@ -49,6 +50,7 @@ class Vrf4Dest(VrfDest):
 class Vrf4Table(VrfTable):
     """Virtual Routing and Forwarding information base for IPv4."""
     ROUTE_FAMILY = RF_IPv4_UC
+    PREFIX_INDEX_CLASS = Ipv4RadixTree
     VPN_ROUTE_FAMILY = RF_IPv4_VPN
     NLRI_CLASS = IPAddrPrefix
     VRF_PATH_CLASS = Vrf4Path
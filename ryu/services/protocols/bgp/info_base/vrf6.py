@@ -31,6 +31,7 @@ from ryu.services.protocols.bgp.info_base.vrf import VrfDest
 from ryu.services.protocols.bgp.info_base.vrf import VrfNlriImportMap
 from ryu.services.protocols.bgp.info_base.vrf import VrfPath
 from ryu.services.protocols.bgp.info_base.vrf import VrfTable
+from ryu.services.protocols.bgp.utils.radix import Ipv6RadixTree
 
 LOG = logging.getLogger('bgpspeaker.info_base.vrf6')
 
@@ -50,6 +51,7 @@ class Vrf6Dest(VrfDest):
 class Vrf6Table(VrfTable):
     """Virtual Routing and Forwarding information base for IPv6."""
     ROUTE_FAMILY = RF_IPv6_UC
+    PREFIX_INDEX_CLASS = Ipv6RadixTree
     VPN_ROUTE_FAMILY = RF_IPv6_VPN
     NLRI_CLASS = IP6AddrPrefix
     VRF_PATH_CLASS = Vrf6Path
@@ -19,7 +19,8 @@ class Count(Command):
     def __init__(self, *args, **kwargs):
         super(Count, self).__init__(*args, **kwargs)
         self.subcommands = {
-            'all': self.All
+            'all': self.All,
+            'processor': self.Processor
         }
 
     def action(self, params):
@@ -51,3 +52,13 @@ class Count(Command):
             if len(params) > 0:
                 return WrongParamResp()
             return CommandsResponse(STATUS_OK, self.api.count_all_vrf_routes())
+
+    class Processor(Command):
+        help_msg = 'shows stats of destinations processed for best path'
+        command = 'processor'
+
+        def action(self, params):
+            if len(params) > 0:
+                return WrongParamResp()
+            return CommandsResponse(STATUS_OK,
+                                    self.api.get_processor_stats())
@@ -15,8 +15,8 @@ class RibBase(Command, RouteFormatterMixin):
 
 
 class Rib(RibBase):
-    help_msg = 'show all routes for address family'
-    param_help_msg = '<address-family>'
+    help_msg = 'show all routes for address family or longest prefix match'
+    param_help_msg = '<address-family> [<prefix>]'
     command = 'rib'
 
     def __init__(self, *args, **kwargs):
@@ -25,14 +25,15 @@ class Rib(RibBase):
             'all': self.All}
 
     def action(self, params):
-        if len(params) != 1 or params[0] not in self.supported_families:
+        if (len(params) not in (1, 2) or
+                params[0] not in self.supported_families):
             return WrongParamResp()
         from ryu.services.protocols.bgp.operator.internal_api \
             import WrongParamError
         try:
             return CommandsResponse(
                 STATUS_OK,
-                self.api.get_single_rib_routes(params[0])
+                self.api.get_single_rib_routes(*params)
             )
         except WrongParamError as e:
             return WrongParamResp(e)
@@ -76,7 +76,7 @@ class InternalApi(object):
     def _get_vrf_tables(self):
         return CORE_MANAGER.get_core_service().table_manager.get_vrf_tables()
 
-    def get_single_rib_routes(self, addr_family):
+    def get_single_rib_routes(self, addr_family, prefix=None):
         rfs = {
             'ipv4': RF_IPv4_UC,
             'ipv6': RF_IPv6_UC,
@@ -90,11 +90,20 @@ class InternalApi(object):
         rf = rfs.get(addr_family)
         table_manager = self.get_core_service().table_manager
         gtable = table_manager.get_global_table_by_route_family(rf)
-        if gtable is not None:
+        if gtable is None:
+            return []
+        if prefix is None:
             return [self._dst_to_dict(dst)
                     for dst in sorted(gtable.itervalues())]
-        else:
+
+        # Only the longest match of the given prefix or address.
+        try:
+            dst = gtable.longest_match(prefix)
+        except ValueError as e:
+            raise WrongParamError(str(e))
+        if dst is None:
             return []
+        return [self._dst_to_dict(dst)]
 
     def _dst_to_dict(self, dst):
         ret = {'paths': [],
@@ -189,6 +198,12 @@ class InternalApi(object):
             raise WrongParamError(str(e))
         return None
 
+    def get_processor_stats(self):
+        bgp_processor = self.get_core_service().bgp_processor
+        if bgp_processor is None:
+            return {}
+        return bgp_processor.get_stats_summary_dict()
+
     def get_core_service(self):
         return CORE_MANAGER.get_core_service()
 
@@ -29,7 +29,8 @@ from ryu.services.protocols.bgp.base import SUPPORTED_GLOBAL_RF
 from ryu.services.protocols.bgp import constants as const
 from ryu.services.protocols.bgp.model import OutgoingRoute
 from ryu.services.protocols.bgp.model import SentRoute
-from ryu.services.protocols.bgp.info_base.base import PrefixFilter
+from ryu.services.protocols.bgp.info_base.base import FilterList
+from ryu.services.protocols.bgp.info_base.base import PathAttrs
 from ryu.services.protocols.bgp.info_base.base import AttributeMap
 from ryu.services.protocols.bgp.model import ReceivedRoute
 from ryu.services.protocols.bgp.net_ctrl import NET_CONTROLLER
@@ -88,6 +89,9 @@ from ryu.lib.packet.bgp import BGPIPv4AddressSpecificExtendedCommunity
 
 LOG = logging.getLogger('bgpspeaker.peer')
 
+# Maximum number of queued routes packed into update messages at a time.
+MAX_PACKED_ROUTES = 4096
+
 
 def is_valid_state(state):
     """Returns True if given state is a valid bgp finite state machine state.
@@ -343,9 +347,11 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
 
         # in-bound filters
         self._in_filters = self._neigh_conf.in_filter
+        self._in_filter_list = FilterList(self._in_filters)
 
         # out-bound filters
         self._out_filters = self._neigh_conf.out_filter
+        self._out_filter_list = FilterList(self._out_filters)
 
         # Adj-rib-in
         self._adj_rib_in = {}
@@ -395,6 +401,7 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
     @in_filters.setter
     def in_filters(self, filters):
         self._in_filters = [f.clone() for f in filters]
+        self._in_filter_list = FilterList(self._in_filters)
         LOG.debug('set in-filter : %s' % filters)
         self.on_update_in_filter()
 
@@ -405,6 +412,7 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
     @out_filters.setter
     def out_filters(self, filters):
         self._out_filters = [f.clone() for f in filters]
+        self._out_filter_list = FilterList(self._out_filters)
         LOG.debug('set out-filter : %s' % filters)
         self.on_update_out_filter()
 
@@ -529,30 +537,11 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
             for af in negotiated_afs:
                 self._fire_route_refresh(af)
 
-    def _apply_filter(self, filters, path):
-        block = False
-        blocked_cause = None
-
-        for filter_ in filters:
-            if filter_.ROUTE_FAMILY != path.ROUTE_FAMILY:
-                continue
-
-            policy, is_matched = filter_.evaluate(path)
-            if policy == PrefixFilter.POLICY_PERMIT and is_matched:
-                block = False
-                break
-            elif policy == PrefixFilter.POLICY_DENY and is_matched:
-                block = True
-                blocked_cause = filter_.prefix + ' - DENY'
-                break
-
-        return block, blocked_cause
-
     def _apply_in_filter(self, path):
-        return self._apply_filter(self._in_filters, path)
+        return self._in_filter_list.evaluate(path)
 
     def _apply_out_filter(self, path):
-        return self._apply_filter(self._out_filters, path)
+        return self._out_filter_list.evaluate(path)
 
     def on_update_in_filter(self):
         LOG.debug('on_update_in_filter fired')
@@ -645,12 +634,12 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
                               self._enqueue_eor_msg, rr_msg)
             LOG.debug('Enhanced RR max. EOR timer set.')
 
-    def _send_outgoing_route(self, outgoing_route):
-        """Constructs `Update` message from given `outgoing_route` and sends
-        it to peer.
+    def _filter_outgoing_route(self, outgoing_route):
+        """Constructs `Update` message from given `outgoing_route`.
 
         Also, checks if any policies prevent sending this message.
         Populates Adj-RIB-out with corresponding `SentRoute`.
+        Returns None if the route is blocked.
         """
 
         path = outgoing_route.path
@@ -661,13 +650,9 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
         self._adj_rib_out[nlri_str] = sent_route
         self._signal_bus.adj_rib_out_changed(self, sent_route)
 
-        # TODO(PH): optimized by sending several prefixes per update.
-        # Construct and send update message.
+        update_msg = None
         if not block:
             update_msg = self._construct_update(outgoing_route)
-            self._protocol.send(update_msg)
-            # Collect update statistics.
-            self.state.incr(PeerCounterNames.SENT_UPDATES)
         else:
             LOG.debug('prefix : %s is not sent by filter : %s'
                       % (path.nlri, blocked_cause))
@@ -680,6 +665,43 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
             tm = self._core_service.table_manager
             tm.remember_sent_route(sent_route)
 
+        return update_msg
+
+    def _send_outgoing_routes(self, outgoing_routes):
+        """Sends `outgoing_routes` to peer packing prefixes which share
+        path attributes into the same `Update` messages.
+        """
+        # Only the last update for a prefix is sent, so that packing
+        # does not reorder updates for the same prefix.
+        update_msgs = OrderedDict()
+        for outgoing_route in outgoing_routes:
+            update_msg = self._filter_outgoing_route(outgoing_route)
+            if update_msg is None:
+                continue
+            nlri_str = outgoing_route.path.nlri.formatted_nlri_str
+            update_msgs.pop(nlri_str, None)
+            update_msgs[nlri_str] = update_msg
+
+        for update_msg in bgp_utils.pack_updates(update_msgs.values()):
+            self._protocol.send(update_msg)
+            # Collect update statistics.
+            self.state.incr(PeerCounterNames.SENT_UPDATES)
+
+    def _pop_outgoing_routes(self, outgoing_route):
+        """Pops the `OutgoingRoute`s queued just after `outgoing_route`.
+
+        Returns a list of at most MAX_PACKED_ROUTES routes starting with
+        `outgoing_route`.
+        """
+        outgoing_routes = [outgoing_route]
+        for outgoing_msg in self.outgoing_msg_list:
+            if (not isinstance(outgoing_msg, OutgoingRoute) or
+                    len(outgoing_routes) >= MAX_PACKED_ROUTES):
+                break
+            self.outgoing_msg_list.remove(outgoing_msg)
+            outgoing_routes.append(outgoing_msg)
+        return outgoing_routes
+
     def _process_outgoing_msg_list(self):
         while True:
             outgoing_msg = None
@@ -705,7 +727,9 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
             if isinstance(outgoing_msg, BGPRouteRefresh):
                 self._send_outgoing_route_refresh_msg(outgoing_msg)
             elif isinstance(outgoing_msg, OutgoingRoute):
-                self._send_outgoing_route(outgoing_msg)
+                # Routes queued in a row are sent together.
+                self._send_outgoing_routes(
+                    self._pop_outgoing_routes(outgoing_msg))
 
             # EOR are enqueued as plain Update messages.
             elif isinstance(outgoing_msg, BGPUpdate):
@@ -950,7 +974,8 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
             if path_extcomm_attr:
                 # SOO list can be configured per VRF and/or per Neighbor.
                 # NeighborConf has this setting we add this to existing list.
-                communities = path_extcomm_attr.communities
+                # Copy not to modify the attribute shared by paths.
+                communities = list(path_extcomm_attr.communities)
                 if self._neigh_conf.soo_list:
                     # construct extended community
                     soo_list = self._neigh_conf.soo_list
@@ -1363,13 +1388,16 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
             LOG.debug('Update message did not have any new MP_REACH_NLRIs.')
             return
 
+        # Paths from the update message share the interned attributes.
+        pattrs = PathAttrs(umsg_pattrs).intern()
+
         # Create path instances for each NLRI from the update message.
         for msg_nlri in msg_nlri_list:
             LOG.debug('NLRI: %s' % msg_nlri)
             new_path = bgp_utils.create_path(
                 self,
                 msg_nlri,
-                pattrs=umsg_pattrs,
+                pattrs=pattrs,
                 nexthop=next_hop
             )
             LOG.debug('Extracted paths from Update msg.: %s' % new_path)
@@ -1517,12 +1545,15 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
             LOG.debug('Update message did not have any new MP_REACH_NLRIs.')
             return
 
+        # Paths from the update message share the interned attributes.
+        pattrs = PathAttrs(umsg_pattrs).intern()
+
         # Create path instances for each NLRI from the update message.
         for msg_nlri in msg_nlri_list:
             new_path = bgp_utils.create_path(
                 self,
                 msg_nlri,
-                pattrs=umsg_pattrs,
+                pattrs=pattrs,
                 nexthop=next_hop
             )
             LOG.debug('Extracted paths from Update msg.: %s' % new_path)
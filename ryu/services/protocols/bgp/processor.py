@@ -17,6 +17,7 @@
 """
 
 import logging
+import time
 
 from ryu.services.protocols.bgp.base import Activity
 from ryu.services.protocols.bgp.base import add_bgp_error_metadata
@@ -58,9 +59,17 @@ class BgpProcessor(Activity):
     works to achieve the desired work flow.
     """
 
-    # Max. number of destinations processed per cycle.
+    # Max. number of destinations processed per cycle, when a few
+    # destinations are queued.
     MAX_DEST_PROCESSED_PER_CYCLE = 100
 
+    # Max. number of destinations processed per cycle when many
+    # destinations are queued.
+    MAX_DEST_BATCH_SIZE = 4000
+
+    # A cycle processes at least this fraction of queued destinations.
+    DEST_BATCH_RATIO = 0.1
+
     #
     # DestQueue
     #
@@ -77,14 +86,21 @@ class BgpProcessor(Activity):
         # Back pointer to core service instance that created this processor.
         self._core_service = core_service
         self._dest_queue = BgpProcessor._DestQueue()
+        self._dest_queue_len = 0
         self._rtdest_queue = BgpProcessor._DestQueue()
         self.dest_que_evt = EventletIOFactory.create_custom_event()
         self.work_units_per_cycle =\
             work_units_per_cycle or BgpProcessor.MAX_DEST_PROCESSED_PER_CYCLE
 
+        # Statistics of processed destinations.
+        self._dest_processed = 0
+        self._last_batch_size = 0
+        self._busy_time = 0.0
+        self._dest_per_sec = 0.0
+
     def _run(self, *args, **kwargs):
         # Sit in tight loop, getting destinations from the queue and processing
-        # one at a time.
+        # one batch at a time.
         while True:
             LOG.debug('Starting new processing run...')
             # We process all RT destination first so that we get a new RT
@@ -103,16 +119,59 @@ class BgpProcessor(Activity):
             else:
                 self.pause(0)
 
+    def _batch_size(self):
+        """Returns the number of destinations to process in this cycle.
+
+        Batches grow with the queue, so that a long queue is processed
+        in fewer cycles, each paying the per-batch costs once.
+        """
+        size = int(self._dest_queue_len * self.DEST_BATCH_RATIO)
+        return max(self.work_units_per_cycle,
+                   min(size, self.MAX_DEST_BATCH_SIZE))
+
+    def _pop_dests(self, size):
+        dests = []
+        while len(dests) < size and not self._dest_queue.is_empty():
+            dests.append(self._dest_queue.pop_first())
+        self._dest_queue_len -= len(dests)
+        return dests
+
     def _process_dest(self):
-        dest_processed = 0
         LOG.debug('Processing destination...')
-        while (dest_processed < self.work_units_per_cycle and
-                not self._dest_queue.is_empty()):
-            # We process the first destination in the queue.
-            next_dest = self._dest_queue.pop_first()
-            if next_dest:
-                next_dest.process()
-                dest_processed += 1
+        dests = self._pop_dests(self._batch_size())
+        if not dests:
+            return
+
+        start = time.time()
+        # Paths and peers do not change while processing a batch, so that
+        # the values compared by best path selection are shared.
+        selector = BestPathSelector(self._core_service.asn)
+        for dest in dests:
+            dest.process(selector)
+        self._update_stats(len(dests), time.time() - start)
+
+    def _update_stats(self, dest_processed, elapsed):
+        self._dest_processed += dest_processed
+        self._last_batch_size = dest_processed
+        self._busy_time += elapsed
+        if elapsed > 0:
+            # Exponentially weighted moving average.
+            rate = dest_processed / elapsed
+            self._dest_per_sec += (rate - self._dest_per_sec) * 0.2
+
+    def get_stats_summary_dict(self):
+        """Returns stats of processed destinations.
+
+        `dest_per_sec` is the average number of destinations processed
+        per second of processing time over the last batches.
+        """
+        return {
+            'dest_processed': self._dest_processed,
+            'dest_queued': self._dest_queue_len,
+            'last_batch_size': self._last_batch_size,
+            'busy_time': self._busy_time,
+            'dest_per_sec': self._dest_per_sec,
+        }
 
     def _process_rtdest(self):
         LOG.debug('Processing RT NLRI destination...')
@@ -120,11 +179,12 @@ class BgpProcessor(Activity):
             return
         else:
             processed_any = False
+            selector = BestPathSelector(self._core_service.asn)
             while not self._rtdest_queue.is_empty():
                 # We process the first destination in the queue.
                 next_dest = self._rtdest_queue.pop_first()
                 if next_dest:
-                    next_dest.process()
+                    next_dest.process(selector)
                     processed_any = True
 
             if processed_any:
@@ -148,6 +208,8 @@ class BgpProcessor(Activity):
         # it is already on the queue.
         if not dest_queue.is_on_list(destination):
             dest_queue.append(destination)
+            if dest_queue is self._dest_queue:
+                self._dest_queue_len += 1
 
         # Wake-up processing thread if sleeping.
         self.dest_que_evt.set()
@@ -213,301 +275,150 @@ def compute_best_path(local_asn, path1, path2):
     10. Select the route received from the peer with the lowest BGP
         router ID.
 
-    Returns None if best-path among given paths cannot be computed else best
-    path.
+    Returns the best path, or None if best-path among given paths cannot be
+    computed, and the reason of the selection.
     Assumes paths from NC has source equal to None.
     """
-    best_path = None
-    best_path_reason = BPR_UNKNOWN
-
-    # Follow best path calculation algorithm steps.
-    if best_path is None:
-        best_path = _cmp_by_reachable_nh(path1, path2)
-        best_path_reason = BPR_REACHABLE_NEXT_HOP
-    if best_path is None:
-        best_path = _cmp_by_higest_wg(path1, path2)
-        best_path_reason = BPR_HIGHEST_WEIGHT
-    if best_path is None:
-        best_path = _cmp_by_local_pref(path1, path2)
-        best_path_reason = BPR_LOCAL_PREF
-    if best_path is None:
-        best_path = _cmp_by_local_origin(path1, path2)
-        best_path_reason = BPR_LOCAL_ORIGIN
-    if best_path is None:
-        best_path = _cmp_by_aspath(path1, path2)
-        best_path_reason = BPR_ASPATH
-    if best_path is None:
-        best_path = _cmp_by_origin(path1, path2)
-        best_path_reason = BPR_ORIGIN
-    if best_path is None:
-        best_path = _cmp_by_med(path1, path2)
-        best_path_reason = BPR_MED
-    if best_path is None:
-        best_path = _cmp_by_asn(local_asn, path1, path2)
-        best_path_reason = BPR_ASN
-    if best_path is None:
-        best_path = _cmp_by_igp_cost(path1, path2)
-        best_path_reason = BPR_IGP_COST
-    if best_path is None:
-        best_path = _cmp_by_router_id(local_asn, path1, path2)
-        best_path_reason = BPR_ROUTER_ID
-    if best_path is None:
-        best_path_reason = BPR_UNKNOWN
-
-    return (best_path, best_path_reason)
-
-
-def _cmp_by_reachable_nh(path1, path2):
-    """Compares given paths and selects best path based on reachable next-hop.
-
-    If no path matches this criteria, return None.
-    """
-    # TODO(PH): Currently we do not have a way to check if a IGP route to
-    # NEXT_HOP exists from BGPS.
-    return None
+    return BestPathSelector(local_asn).compute_best_path(path1, path2)
 
 
-def _cmp_by_higest_wg(path1, path2):
-    """Selects a path with highest weight.
-
-    Weight is BGPS specific parameter. It is local to the router on which it
-     is configured.
-    Return:
-        None if best path among given paths cannot be decided, else best path.
-    """
-    # TODO(PH): Revisit this when BGPS has concept of policy to be applied to
-    # in-bound NLRIs.
-    return None
+class _PathValues(object):
+    """Values of a path compared by best path selection."""
+    __slots__ = ['path', 'local_pref', 'as_path_len', 'origin', 'origin_pref',
+                 'med']
 
+    def __init__(self, path):
+        self.path = path
 
-def _cmp_by_local_pref(path1, path2):
-    """Selects a path with highest local-preference.
-
-    Unlike the weight attribute, which is only relevant to the local
-    router, local preference is an attribute that routers exchange in the
-    same AS. Highest local-pref is preferred. If we cannot decide,
-    we return None.
-    """
-    # TODO(PH): Revisit this when BGPS has concept of policy to be applied to
-    # in-bound NLRIs.
-    # Default local-pref values is 100
-    lp1 = path1.get_pattr(BGP_ATTR_TYPE_LOCAL_PREF)
-    lp2 = path2.get_pattr(BGP_ATTR_TYPE_LOCAL_PREF)
-    if not (lp1 and lp2):
-        return None
-
-    # Highest local-preference value is preferred.
-    lp1 = lp1.value
-    lp2 = lp2.value
-    if lp1 > lp2:
-        return path1
-    elif lp2 > lp1:
-        return path2
-    else:
-        return None
-
-
-def _cmp_by_local_origin(path1, path2):
-    """Select locally originating path as best path.
-
-    Locally originating routes are network routes, redistributed routes,
-    or aggregated routes. For now we are going to prefer routes received
-    through a Flexinet-Peer as locally originating route compared to routes
-    received from a BGP peer.
-    Returns None if given paths have same source.
-    """
-    # If both paths are from same sources we cannot compare them here.
-    if path1.source == path2.source:
-        return None
-
-    # Here we consider prefix from NC as locally originating static route.
-    # Hence it is preferred.
-    if path1.source is None:
-        return path1
-
-    if path2.source is None:
-        return path2
-
-    return None
-
+        local_pref = path.get_pattr(BGP_ATTR_TYPE_LOCAL_PREF)
+        self.local_pref = local_pref.value if local_pref else None
 
-def _cmp_by_aspath(path1, path2):
-    """Calculated the best-paths by comparing as-path lengths.
+        as_path = path.get_pattr(BGP_ATTR_TYPE_AS_PATH)
+        assert as_path
+        self.as_path_len = as_path.get_as_path_len()
+        assert self.as_path_len is not None
 
-    Shortest as-path length is preferred. If both path have same lengths,
-    we return None.
-    """
-    as_path1 = path1.get_pattr(BGP_ATTR_TYPE_AS_PATH)
-    as_path2 = path2.get_pattr(BGP_ATTR_TYPE_AS_PATH)
-    assert as_path1 and as_path2
-    l1 = as_path1.get_as_path_len()
-    l2 = as_path2.get_as_path_len()
-    assert l1 is not None and l2 is not None
-    if l1 > l2:
-        return path2
-    elif l2 > l1:
-        return path1
-    else:
-        return None
-
-
-def _cmp_by_origin(path1, path2):
-    """Select the best path based on origin attribute.
-
-    IGP is preferred over EGP; EGP is preferred over Incomplete.
-    If both paths have same origin, we return None.
-    """
-    def get_origin_pref(origin):
-        if origin.value == BGP_ATTR_ORIGIN_IGP:
-            return 3
-        elif origin.value == BGP_ATTR_ORIGIN_EGP:
-            return 2
-        elif origin.value == BGP_ATTR_ORIGIN_INCOMPLETE:
-            return 1
-        else:
+        origin = path.get_pattr(BGP_ATTR_TYPE_ORIGIN)
+        assert origin is not None
+        self.origin = origin.value
+        self.origin_pref = _ORIGIN_PREF.get(origin.value)
+        if self.origin_pref is None:
             LOG.error('Invalid origin value encountered %s.' % origin)
-            return 0
-
-    origin1 = path1.get_pattr(BGP_ATTR_TYPE_ORIGIN)
-    origin2 = path2.get_pattr(BGP_ATTR_TYPE_ORIGIN)
-    assert origin1 is not None and origin2 is not None
-
-    # If both paths have same origins
-    if origin1.value == origin2.value:
-        return None
-
-    # Translate origin values to preference.
-    origin1 = get_origin_pref(origin1)
-    origin2 = get_origin_pref(origin2)
-    # Return preferred path.
-    if origin1 == origin2:
-        return None
-    elif origin1 > origin2:
-        return path1
-    return path2
-
-
-def _cmp_by_med(path1, path2):
-    """Select the path based with lowest MED value.
-
-    If both paths have same MED, return None.
-    By default, a route that arrives with no MED value is treated as if it
-    had a MED of 0, the most preferred value.
-    RFC says lower MED is preferred over higher MED value.
-    """
-    def get_path_med(path):
-        med = path.get_pattr(BGP_ATTR_TYPE_MULTI_EXIT_DISC)
-        if not med:
-            return 0
-        return med.value
-
-    med1 = get_path_med(path1)
-    med2 = get_path_med(path2)
-
-    if med1 == med2:
-        return None
-    elif med1 < med2:
-        return path1
-    return path2
-
-
-def _cmp_by_asn(local_asn, path1, path2):
-    """Select the path based on source (iBGP/eBGP) peer.
-
-    eBGP path is preferred over iBGP. If both paths are from same kind of
-    peers, return None.
-    """
-    def get_path_source_asn(path):
-        asn = None
-        if path.source is None:
-            asn = local_asn
-        else:
-            asn = path.source.remote_as
-        return asn
-
-    p1_asn = get_path_source_asn(path1)
-    p2_asn = get_path_source_asn(path2)
-    # If path1 is from ibgp peer and path2 is from ebgp peer.
-    if (p1_asn == local_asn) and (p2_asn != local_asn):
-        return path2
-
-    # If path2 is from ibgp peer and path1 is from ebgp peer,
-    if (p2_asn == local_asn) and (p1_asn != local_asn):
-        return path1
-
-    # If both paths are from ebgp or ibpg peers, we cannot decide.
-    return None
+            self.origin_pref = 0
 
+        med = path.get_pattr(BGP_ATTR_TYPE_MULTI_EXIT_DISC)
+        self.med = med.value if med else 0
 
-def _cmp_by_igp_cost(path1, path2):
-    """Select the route with the lowest IGP cost to the next hop.
 
-    Return None if igp cost is same.
-    """
-    # TODO(PH): Currently BGPS has no concept of IGP and IGP cost.
-    return None
+_ORIGIN_PREF = {
+    BGP_ATTR_ORIGIN_IGP: 3,
+    BGP_ATTR_ORIGIN_EGP: 2,
+    BGP_ATTR_ORIGIN_INCOMPLETE: 1,
+}
 
 
-def _cmp_by_router_id(local_asn, path1, path2):
-    """Select the route received from the peer with the lowest BGP router ID.
+class BestPathSelector(object):
+    """Compares paths by the steps of `compute_best_path`, computing the
+    compared values once per path and per peer.
 
-    If both paths are eBGP paths, then we do not do any tie breaking, i.e we do
-    not pick best-path based on this criteria.
-    RFC: http://tools.ietf.org/html/rfc5004
-    We pick best path between two iBGP paths as usual.
+    An instance is meant to be used for a batch of destinations, during
+    which known paths and peer sessions do not change.
     """
-    def get_asn(path_source):
-        if path_source is None:
-            return local_asn
-        else:
-            return path_source.remote_as
 
-    def get_router_id(path_source, local_bgp_id):
-        if path_source is None:
-            return local_bgp_id
-        else:
-            return path_source.protocol.recv_open_msg.bgp_identifier
-
-    path_source1 = path1.source
-    path_source2 = path2.source
-
-    # If both paths are from NC we have same router Id, hence cannot compare.
-    if path_source1 is None and path_source2 is None:
-        return None
-
-    asn1 = get_asn(path_source1)
-    asn2 = get_asn(path_source2)
-
-    is_ebgp1 = asn1 != local_asn
-    is_ebgp2 = asn2 != local_asn
-    # If both paths are from eBGP peers, then according to RFC we need
-    # not tie break using router id.
-    if (is_ebgp1 and is_ebgp2):
-        return None
-
-    if ((is_ebgp1 is True and is_ebgp2 is False) or
-            (is_ebgp1 is False and is_ebgp2 is True)):
-        raise ValueError('This method does not support comparing ebgp with'
-                         ' ibgp path')
-
-    # At least one path is not coming from NC, so we get local bgp id.
-    if path_source1 is not None:
-        local_bgp_id = path_source1.protocol.sent_open_msg.bgp_identifier
-    else:
-        local_bgp_id = path_source2.protocol.sent_open_msg.bgp_identifier
-
-    # Get router ids.
-    router_id1 = get_router_id(path_source1, local_bgp_id)
-    router_id2 = get_router_id(path_source2, local_bgp_id)
-
-    # If both router ids are same/equal we cannot decide.
-    # This case is possible since router ids are arbitrary.
-    if router_id1 == router_id2:
-        return None
-
-    # Select the path with lowest router Id.
-    from ryu.services.protocols.bgp.utils.bgp import from_inet_ptoi
-    if (from_inet_ptoi(router_id1) < from_inet_ptoi(router_id2)):
-        return path1
-    else:
+    def __init__(self, local_asn):
+        self.local_asn = local_asn
+        self._path_values = {}  # id(path) -> _PathValues
+        self._router_ids = {}  # peer -> (router id, local router id)
+
+    def _get_path_values(self, path):
+        values = self._path_values.get(id(path))
+        if values is None or values.path is not path:
+            values = self._path_values[id(path)] = _PathValues(path)
+        return values
+
+    def _get_asn(self, source):
+        if source is None:
+            return self.local_asn
+        return source.remote_as
+
+    def _get_router_ids(self, source):
+        router_ids = self._router_ids.get(source)
+        if router_ids is None:
+            from ryu.services.protocols.bgp.utils.bgp import from_inet_ptoi
+            protocol = source.protocol
+            router_ids = self._router_ids[source] = (
+                from_inet_ptoi(protocol.recv_open_msg.bgp_identifier),
+                from_inet_ptoi(protocol.sent_open_msg.bgp_identifier))
+        return router_ids
+
+    def compute_best_path(self, path1, path2):
+        """Compares given paths and returns best path and the reason.
+
+        See `compute_best_path` for the steps.
+        """
+        values1 = self._get_path_values(path1)
+        values2 = self._get_path_values(path2)
+
+        # Reachable next hop and weight are not supported yet.
+
+        lp1 = values1.local_pref
+        lp2 = values2.local_pref
+        if lp1 is not None and lp2 is not None and lp1 != lp2:
+            return (path1 if lp1 > lp2 else path2), BPR_LOCAL_PREF
+
+        source1 = path1.source
+        source2 = path2.source
+        if source1 != source2:
+            if source1 is None:
+                return path1, BPR_LOCAL_ORIGIN
+            if source2 is None:
+                return path2, BPR_LOCAL_ORIGIN
+
+        if values1.as_path_len != values2.as_path_len:
+            if values1.as_path_len < values2.as_path_len:
+                return path1, BPR_ASPATH
+            return path2, BPR_ASPATH
+
+        if (values1.origin != values2.origin and
+                values1.origin_pref != values2.origin_pref):
+            if values1.origin_pref > values2.origin_pref:
+                return path1, BPR_ORIGIN
+            return path2, BPR_ORIGIN
+
+        if values1.med != values2.med:
+            return (path1 if values1.med < values2.med else path2), BPR_MED
+
+        local_asn = self.local_asn
+        is_ebgp1 = self._get_asn(source1) != local_asn
+        is_ebgp2 = self._get_asn(source2) != local_asn
+        if is_ebgp1 != is_ebgp2:
+            return (path1 if is_ebgp1 else path2), BPR_ASN
+
+        # IGP cost is not supported yet.
+
+        best_path = self._cmp_by_router_id(path1, path2, is_ebgp1 and is_ebgp2)
+        if best_path is not None:
+            return best_path, BPR_ROUTER_ID
+        return None, BPR_UNKNOWN
+
+    def _cmp_by_router_id(self, path1, path2, is_ebgp):
+        source1 = path1.source
+        source2 = path2.source
+        # Do not tie break paths both from NC or eBGP peers.
+        if (source1 is None and source2 is None) or is_ebgp:
+            return None
+
+        if source1 is not None:
+            router_id1, local_router_id = self._get_router_ids(source1)
+        if source2 is not None:
+            router_id2, local_router_id = self._get_router_ids(source2)
+        if source1 is None:
+            router_id1 = local_router_id
+        if source2 is None:
+            router_id2 = local_router_id
+
+        if router_id1 == router_id2:
+            return None
+        if router_id1 < router_id2:
+            return path1
         return path2
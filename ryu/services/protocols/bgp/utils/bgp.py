@@ -27,9 +27,13 @@ from ryu.lib.packet.bgp import RF_IPv6_VPN
 from ryu.lib.packet.bgp import RF_RTC_UC
 from ryu.lib.packet.bgp import RouteTargetMembershipNLRI
 from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MULTI_EXIT_DISC
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MP_REACH_NLRI
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MP_UNREACH_NLRI
+from ryu.lib.packet.bgp import BGPPathAttributeMpReachNLRI
 from ryu.lib.packet.bgp import BGPPathAttributeMultiExitDisc
 from ryu.lib.packet.bgp import BGPPathAttributeMpUnreachNLRI
 from ryu.lib.packet.bgp import BGPPathAttributeUnknown
+from ryu.services.protocols.bgp.base import OrderedDict
 from ryu.services.protocols.bgp.info_base.rtc import RtcPath
 from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
 from ryu.services.protocols.bgp.info_base.ipv6 import Ipv6Path
@@ -39,6 +43,9 @@ from ryu.services.protocols.bgp.info_base.vpnv6 import Vpnv6Path
 
 LOG = logging.getLogger('utils.bgp')
 
+# Maximum length of BGP message including the header (RFC 4271).
+BGP_MAX_MSG_LEN = 4096
+
 # RouteFmaily to path sub-class mapping.
 _ROUTE_FAMILY_TO_PATH_MAP = {RF_IPv4_UC: Ipv4Path,
                              RF_IPv6_UC: Ipv6Path,
@@ -84,7 +91,7 @@ def clone_rtcpath_update_rt_as(path, new_rt_as):
     old_nlri = path.nlri
     new_rt_nlri = RouteTargetMembershipNLRI(new_rt_as, old_nlri.route_target)
     return RtcPath(path.source, new_rt_nlri, path.source_version_num,
-                   pattrs=path.pathattr_map, nexthop=path.nexthop,
+                   pattrs=path.pathattrs, nexthop=path.nexthop,
                    is_withdraw=path.is_withdraw)
 
 
@@ -128,3 +135,110 @@ def create_end_of_rib_update():
 
 # Bgp update message instance that can used as End of RIB marker.
 UPDATE_EOR = create_end_of_rib_update()
+
+
+def _serialize_attr(attr, attr_bins):
+    # Attributes interned by PathAttrs are shared among updates, so that
+    # each of them is serialized once.
+    bin_attr = attr_bins.get(id(attr))
+    if bin_attr is None:
+        bin_attr = attr_bins[id(attr)] = str(attr.serialize())
+    return bin_attr
+
+
+def _update_key(update, attr_bins):
+    """Returns the key and NLRIs of the given single route `update`.
+
+    Updates with the same key differ only in their NLRIs.
+    """
+    pathattr_map = update.pathattr_map
+    if update.withdrawn_routes and not update.path_attributes:
+        return ('withdraw',), update.withdrawn_routes
+
+    mpunreach_attr = pathattr_map.get(BGP_ATTR_TYPE_MP_UNREACH_NLRI)
+    if mpunreach_attr and len(update.path_attributes) == 1:
+        return (('mp_unreach', mpunreach_attr.afi, mpunreach_attr.safi),
+                mpunreach_attr.withdrawn_routes)
+
+    mpreach_attr = pathattr_map.get(BGP_ATTR_TYPE_MP_REACH_NLRI)
+    attrs = ''.join(_serialize_attr(attr, attr_bins)
+                    for attr in update.path_attributes
+                    if attr is not mpreach_attr)
+    if mpreach_attr:
+        return (('mp_reach', mpreach_attr.afi, mpreach_attr.safi,
+                 mpreach_attr.next_hop, attrs),
+                mpreach_attr.nlri)
+    if update.nlri and not update.withdrawn_routes:
+        return ('reach', attrs), update.nlri
+
+    # Cannot be merged, e.g. End-of-RIB marker.
+    return None, None
+
+
+def _build_update(key, template, nlri_list):
+    kind = key[0]
+    if kind == 'withdraw':
+        return BGPUpdate(withdrawn_routes=nlri_list)
+    elif kind == 'mp_unreach':
+        return BGPUpdate(path_attributes=[
+            BGPPathAttributeMpUnreachNLRI(key[1], key[2], nlri_list)])
+    elif kind == 'mp_reach':
+        path_attributes = []
+        for attr in template.path_attributes:
+            if attr.type == BGP_ATTR_TYPE_MP_REACH_NLRI:
+                attr = BGPPathAttributeMpReachNLRI(attr.afi, attr.safi,
+                                                   attr.next_hop, nlri_list)
+            path_attributes.append(attr)
+        return BGPUpdate(path_attributes=path_attributes)
+    else:
+        return BGPUpdate(path_attributes=template.path_attributes,
+                         nlri=nlri_list)
+
+
+def pack_updates(updates, max_len=BGP_MAX_MSG_LEN):
+    """Packs the NLRIs of `updates` sharing path attributes into as few
+    UPDATE messages as possible.
+
+    `updates` is a list of updates as constructed by
+    `Peer._construct_update`, each of which advertises or withdraws a
+    single route.  Advertisements with identical path attributes and
+    withdrawals of the same route family are merged into messages of at
+    most `max_len` bytes, in the order of their first occurrence.
+    The caller must not pass several updates for the same prefix, as
+    they might be reordered.
+
+    Returns a list of `BGPUpdate`.
+    """
+    groups = OrderedDict()
+    attr_bins = {}  # id(attr) -> serialized attr
+    for update in updates:
+        key, nlri_list = _update_key(update, attr_bins)
+        if not nlri_list:
+            groups[id(update)] = (None, update, None)
+            continue
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = (key, update, OrderedDict())
+        for nlri in nlri_list:
+            group[2].setdefault(str(nlri.serialize()), nlri)
+
+    packed = []
+    for key, template, nlris in groups.itervalues():
+        if key is None:
+            packed.append(template)
+            continue
+
+        # The length of the attribute carrying NLRIs can grow by one byte
+        # when it gets the extended length flag.
+        base_len = len(_build_update(key, template, []).serialize()) + 1
+        nlri_list = []
+        msg_len = base_len
+        for bin_nlri, nlri in nlris.iteritems():
+            if nlri_list and msg_len + len(bin_nlri) > max_len:
+                packed.append(_build_update(key, template, nlri_list))
+                nlri_list = []
+                msg_len = base_len
+            nlri_list.append(nlri)
+            msg_len += len(bin_nlri)
+        packed.append(_build_update(key, template, nlri_list))
+    return packed
@@ -0,0 +1,249 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+ Radix (Patricia) tree of IP prefixes.
+
+ Supports exact, longest-match, covering-prefix and covered-prefix
+ lookups in time proportional to the address width.
+"""
+import socket
+import struct
+
+
+# Marks nodes which only join two sub-trees.
+_EMPTY = object()
+
+
+class _Node(object):
+    __slots__ = ['key', 'length', 'prefix', 'value', 'children']
+
+    def __init__(self, key, length, prefix=None, value=_EMPTY):
+        self.key = key
+        self.length = length
+        self.prefix = prefix
+        self.value = value
+        self.children = [None, None]
+
+
+class RadixTree(object):
+    """A path-compressed binary trie of prefixes of `WIDTH` bits.
+
+    Prefixes are strings such as '10.0.0.0/8', which are converted by
+    `_parse`.  An address without length is the host prefix.
+    Host bits of the given prefixes are ignored.
+    """
+    WIDTH = None
+
+    def __init__(self):
+        width = self.WIDTH
+        full = (1 << width) - 1
+        self._masks = [full & ~((1 << (width - length)) - 1)
+                       for length in range(width + 1)]
+        self._root = _Node(0, 0)
+        self._len = 0
+
+    def _parse(self, prefix):
+        """Returns (key, length) of the given prefix string."""
+        raise NotImplementedError()
+
+    def _bit(self, key, pos):
+        return (key >> (self.WIDTH - 1 - pos)) & 1
+
+    def _common_length(self, key1, key2, limit):
+        diff = key1 ^ key2
+        if not diff:
+            return limit
+        return min(self.WIDTH - diff.bit_length(), limit)
+
+    def _key(self, prefix):
+        key, length = self._parse(prefix)
+        return key & self._masks[length], length
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, prefix):
+        return self._find(*self._key(prefix)) is not None
+
+    def add(self, prefix, value):
+        """Adds `prefix` with `value`, replacing the existing value."""
+        key, length = self._key(prefix)
+        node = self._root
+        while True:
+            if node.length == length:
+                # node.key == key, as node covers the prefix.
+                if node.value is _EMPTY:
+                    self._len += 1
+                node.prefix = prefix
+                node.value = value
+                return
+
+            bit = self._bit(key, node.length)
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _Node(key, length, prefix, value)
+                self._len += 1
+                return
+
+            common = self._common_length(child.key, key,
+                                         min(child.length, length))
+            if common == child.length:
+                node = child
+                continue
+
+            if common == length:
+                new = _Node(key, length, prefix, value)
+            else:
+                new = _Node(key & self._masks[common], common)
+                new.children[self._bit(key, common)] = _Node(key, length,
+                                                             prefix, value)
+            new.children[self._bit(child.key, common)] = child
+            node.children[bit] = new
+            self._len += 1
+            return
+
+    def _find(self, key, length):
+        node = self._root
+        while node is not None and node.length < length:
+            node = node.children[self._bit(key, node.length)]
+        if (node is not None and node.length == length and
+                node.key == key and node.value is not _EMPTY):
+            return node
+        return None
+
+    def get(self, prefix, default=None):
+        node = self._find(*self._key(prefix))
+        if node is None:
+            return default
+        return node.value
+
+    def remove(self, prefix):
+        """Removes `prefix` and returns its value.
+
+        Raises KeyError if `prefix` is not in this tree.
+        """
+        key, length = self._key(prefix)
+        parents = []
+        node = self._root
+        while node is not None and node.length < length:
+            parents.append(node)
+            node = node.children[self._bit(key, node.length)]
+        if (node is None or node.length != length or
+                node.key != key or node.value is _EMPTY):
+            raise KeyError(prefix)
+
+        value = node.value
+        node.prefix = None
+        node.value = _EMPTY
+        self._len -= 1
+
+        # Drop the node and the joining node above it if they are no
+        # longer needed.
+        while parents and node.value is _EMPTY:
+            children = [c for c in node.children if c is not None]
+            if len(children) == 2:
+                break
+            parent = parents.pop()
+            parent.children[parent.children.index(node)] = \
+                children[0] if children else None
+            node = parent
+        return value
+
+    def covering(self, prefix):
+        """Yields (prefix, value) of the prefixes covering `prefix`,
+        including `prefix` itself, from the shortest one.
+        """
+        key, length = self._key(prefix)
+        masks = self._masks
+        node = self._root
+        while node is not None and node.length <= length:
+            if node.key != key & masks[node.length]:
+                break
+            if node.value is not _EMPTY:
+                yield node.prefix, node.value
+            if node.length == length:
+                break
+            node = node.children[self._bit(key, node.length)]
+
+    def longest_match(self, prefix):
+        """Returns (prefix, value) of the longest prefix covering
+        `prefix`, or None.
+        """
+        match = None
+        for match in self.covering(prefix):
+            pass
+        return match
+
+    def covered(self, prefix):
+        """Yields (prefix, value) of the prefixes covered by `prefix`,
+        including `prefix` itself, in the pre-order.
+        """
+        key, length = self._key(prefix)
+        node = self._root
+        while node is not None and node.length < length:
+            node = node.children[self._bit(key, node.length)]
+        if node is None or node.key & self._masks[length] != key:
+            return
+        for item in self._iter(node):
+            yield item
+
+    def _iter(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.value is not _EMPTY:
+                yield node.prefix, node.value
+            for child in reversed(node.children):
+                if child is not None:
+                    stack.append(child)
+
+    def iteritems(self):
+        return self._iter(self._root)
+
+    def itervalues(self):
+        for _prefix, value in self.iteritems():
+            yield value
+
+
+class Ipv4RadixTree(RadixTree):
+    WIDTH = 32
+
+    def _parse(self, prefix):
+        addr, _sep, length = prefix.partition('/')
+        try:
+            (key,) = struct.unpack('!I', socket.inet_aton(addr))
+            length = int(length) if length else self.WIDTH
+        except (socket.error, ValueError):
+            raise ValueError('Invalid IPv4 prefix: %s' % prefix)
+        if not 0 <= length <= self.WIDTH or addr.count('.') != 3:
+            raise ValueError('Invalid IPv4 prefix: %s' % prefix)
+        return key, length
+
+
+class Ipv6RadixTree(RadixTree):
+    WIDTH = 128
+
+    def _parse(self, prefix):
+        addr, _sep, length = prefix.partition('/')
+        try:
+            high, low = struct.unpack(
+                '!QQ', socket.inet_pton(socket.AF_INET6, addr))
+            length = int(length) if length else self.WIDTH
+        except (socket.error, ValueError):
+            raise ValueError('Invalid IPv6 prefix: %s' % prefix)
+        if not 0 <= length <= self.WIDTH:
+            raise ValueError('Invalid IPv6 prefix: %s' % prefix)
+        return (high << 64) | low, length
@@ -0,0 +1,96 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from nose.tools import eq_, ok_
+
+from ryu.app.network_awareness import port_stats
+
+
+class Test_PortStatsStore(unittest.TestCase):
+    """ Test case for port_stats.PortStatsStore
+    """
+
+    def test_compute(self):
+        store = port_stats.PortStatsStore(length=3, period=10)
+        store.set_capacity(1, 1, 10000)
+        store.set_capacity(1, 2, 10000)
+        store.set_capacity(2, 1, 1000)
+
+        store.update(1, [(1, 500, 500, 0, 10, 0), (2, 0, 0, 0, 10, 0)])
+        # the counter divided by the period at first.
+        eq_(100., store.port_speed(1, 1))
+        eq_(0., store.port_speed(1, 2))
+
+        store.update(1, [(1, 1000, 1500, 0, 12, 500000000),
+                         (2, 100000, 2400000, 0, 12, 500000000)])
+        store.update(2, [(1, 1250000, 0, 0, 1, 0)])
+        eq_(600., store.port_speed(1, 1))
+        eq_(1000000., store.port_speed(1, 2))
+        ok_(abs(store.free_bandwidth(1, 1) - (10 - 0.0048)) < 1e-9)
+        eq_(2., store.free_bandwidth(1, 2))
+        eq_(0.8, store.port_utilization(1, 2))
+        # 1 Mbit/s over 1 Mbit/s.
+        eq_(0., store.free_bandwidth(2, 1))
+        eq_(None, store.free_bandwidth(3, 1))
+
+        # the ring buffers wrap around.
+        for sec in range(13, 20):
+            store.update(1, [(1, 1000 * sec, 0, 0, sec, 0)])
+        eq_(1000., store.port_speed(1, 1))
+
+    def test_capacity_unknown(self):
+        store = port_stats.PortStatsStore()
+        store.update(1, [(1, 0, 0, 0, 0, 0)])
+        eq_(0., store.port_speed(1, 1))
+        eq_(None, store.free_bandwidth(1, 1))
+        eq_(None, store.port_utilization(1, 1))
+
+    def test_grow(self):
+        store = port_stats.PortStatsStore(length=2)
+        n = port_stats.PortStatsStore._INITIAL_ROWS * 3
+        store.update(1, [(i, i, 0, 0, 1, 0) for i in range(n)])
+        store.update(1, [(i, i * 2, 0, 0, 2, 0) for i in range(n)])
+        eq_(n, len(store))
+        eq_([float(i) for i in range(n)],
+            [store.port_speed(1, i) for i in range(n)])
+
+    def test_link_bandwidth(self):
+        store = port_stats.PortStatsStore()
+        for dpid, port_no, capacity in [(1, 1, 10000), (2, 1, 5000),
+                                        (2, 2, 10000), (3, 1, 10000)]:
+            store.set_capacity(dpid, port_no, capacity)
+            store.update(dpid, [(port_no, 0, 0, 0, 0, 0)])
+        store.update(3, [(1, 625000, 0, 0, 1, 0)])
+        links = {(1, 2): (1, 1), (2, 1): (1, 1), (2, 3): (2, 1),
+                 (3, 4): (2, 1)}
+        eq_({(1, 2): 5., (2, 1): 5., (2, 3): 5., (3, 4): 0.},
+            store.link_bandwidth(links))
+        eq_({(1, 2): 0., (2, 1): 0., (2, 3): 0.5, (3, 4): None},
+            store.link_utilization(links))
+
+
+class Test_bottleneck_bandwidth(unittest.TestCase):
+    """ Test case for port_stats.bottleneck_bandwidth
+    """
+
+    def test_bottleneck_bandwidth(self):
+        link_bw = {(1, 2): 5., (2, 3): 3., (1, 3): 4.}
+        paths = [[1, 2, 3], [1], [1, 3], [], [3, 1], [1, 2]]
+        eq_([3., 100., 4., 100., 100., 5.],
+            port_stats.bottleneck_bandwidth(paths, link_bw, 100).tolist())
+        eq_([100.], port_stats.bottleneck_bandwidth([[1]], link_bw,
+                                                    100).tolist())
+        eq_([], port_stats.bottleneck_bandwidth([], link_bw, 100).tolist())
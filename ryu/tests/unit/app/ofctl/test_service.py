@@ -0,0 +1,271 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import unittest
+import mock
+from nose.tools import eq_, ok_
+
+from ryu.app.ofctl import api
+from ryu.app.ofctl import event
+from ryu.app.ofctl import exception
+from ryu.app.ofctl import service
+from ryu.base import app_manager
+from ryu.controller import ofp_event
+from ryu.controller.handler import MAIN_DISPATCHER
+from ryu.lib import hub
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+from ryu.ofproto import ofproto_v1_4
+from ryu.ofproto import ofproto_v1_4_parser
+
+
+class _Datapath(object):
+    def __init__(self, id_, ofproto, ofproto_parser):
+        self.id = id_
+        self.ofproto = ofproto
+        self.ofproto_parser = ofproto_parser
+        self.xid = 0
+        self.sent = []
+
+    def set_xid(self, msg):
+        self.xid += 1
+        msg.set_xid(self.xid)
+
+    def send_msg(self, msg):
+        self.sent.append(msg)
+
+
+class _OfpBrick(object):
+    # passes events to the observers as the receive loop of a datapath
+    # does via ofp_event.
+    def __init__(self):
+        self.observers = {}
+
+    def register_observer(self, ev_cls, name, states=None):
+        self.observers.setdefault(ev_cls, set()).add(name)
+
+    def unregister_observer(self, ev_cls, name):
+        self.observers[ev_cls].remove(name)
+
+    def send_event_to_observers(self, ev, state=None):
+        for name in list(self.observers.get(ev.__class__, ())):
+            app_manager.SERVICE_BRICKS[name]._send_event(ev, state)
+
+
+class Test_OfctlService(unittest.TestCase):
+    """ Test case for the flow mod batches of service.OfctlService
+    """
+
+    def setUp(self):
+        cls = service.OfctlService
+        self.app = cls.__new__(cls)
+        self.app._switches = {}
+        self.app._observing_events = {}
+        self.app.logger = logging.getLogger('test_ofctl_service')
+        self.replies = []
+        self.app.reply_to_request = lambda req, rep: self.replies.append(rep)
+        self.app.register_handler = mock.Mock()
+        self.app.unregister_handler = mock.Mock()
+        self.app.observe_event = mock.Mock()
+        self.app.unobserve_event = mock.Mock()
+        self.dp1 = _Datapath(1, ofproto_v1_3, ofproto_v1_3_parser)
+        self.dp2 = _Datapath(2, ofproto_v1_4, ofproto_v1_4_parser)
+        for dp in [self.dp1, self.dp2]:
+            self.app._switches[dp.id] = service._SwitchInfo(dp)
+        self.ofp_brick = _OfpBrick()
+        self._bricks = mock.patch.dict(app_manager.SERVICE_BRICKS,
+                                       {'ofp_event': self.ofp_brick})
+        self._bricks.start()
+
+    def tearDown(self):
+        self._bricks.stop()
+
+    def _send(self, msgs, atomic=False):
+        self.app._handle_send_flow_mods(event.SendFlowModsRequest(
+            msgs=msgs, atomic=atomic))
+        return self.replies.pop()()
+
+    def _flow_mod(self, dp):
+        return dp.ofproto_parser.OFPFlowMod(dp)
+
+    def _barrier_reply(self, dp):
+        msg = dp.ofproto_parser.OFPBarrierReply(dp)
+        msg.xid = dp.sent[-1].xid
+        self.app._handle_barrier(ofp_event.EventOFPBarrierReply(msg))
+
+    def _error(self, dp, xid):
+        msg = dp.ofproto_parser.OFPErrorMsg(
+            dp, type_=dp.ofproto.OFPET_FLOW_MOD_FAILED, code=0)
+        msg.xid = xid
+        self.app._handle_reply(ofp_event.EventOFPErrorMsg(msg))
+
+    def test_send_flow_mods(self):
+        batch = self._send([self._flow_mod(self.dp1),
+                            self._flow_mod(self.dp2),
+                            self._flow_mod(self.dp1)])
+        # one barrier after the messages to each switch.
+        eq_(['OFPFlowMod', 'OFPFlowMod', 'OFPBarrierRequest'],
+            [m.__class__.__name__ for m in self.dp1.sent])
+        eq_(['OFPFlowMod', 'OFPBarrierRequest'],
+            [m.__class__.__name__ for m in self.dp2.sent])
+        ok_(not batch.done())
+
+        self._error(self.dp1, self.dp1.sent[1].xid)
+        self._barrier_reply(self.dp1)
+        ok_(not batch.wait(0))
+        eq_([2], [m.xid for m in batch.errors[1]])
+        self._barrier_reply(self.dp2)
+        ok_(batch.wait(0))
+        eq_([], batch.errors[2])
+        ok_(not batch.ok())
+        # the xids are forgotten on completion.
+        for dpid in [1, 2]:
+            eq_({}, self.app._switches[dpid].xids)
+            eq_({}, self.app._switches[dpid].results)
+
+    def test_atomic(self):
+        batch = self._send([self._flow_mod(self.dp1),
+                            self._flow_mod(self.dp2),
+                            self._flow_mod(self.dp2)], atomic=True)
+        # OpenFlow 1.3 has no bundles.
+        eq_(['OFPFlowMod', 'OFPBarrierRequest'],
+            [m.__class__.__name__ for m in self.dp1.sent])
+        eq_(['OFPBundleCtrlMsg', 'OFPBundleAddMsg', 'OFPBundleAddMsg',
+             'OFPBundleCtrlMsg', 'OFPBarrierRequest'],
+            [m.__class__.__name__ for m in self.dp2.sent])
+        ofp = ofproto_v1_4
+        eq_([ofp.OFPBCT_OPEN_REQUEST, ofp.OFPBCT_COMMIT_REQUEST],
+            [self.dp2.sent[0].type, self.dp2.sent[3].type])
+        eq_(set([1]), set(m.bundle_id for m in self.dp2.sent[:4]))
+
+        self._barrier_reply(self.dp1)
+        self._barrier_reply(self.dp2)
+        ok_(batch.ok())
+
+    def test_dead(self):
+        dp3 = _Datapath(3, ofproto_v1_3, ofproto_v1_3_parser)
+        batch = self._send([self._flow_mod(self.dp1),
+                            self._flow_mod(dp3)])
+        eq_(set([3]), batch.lost)
+        eq_([], dp3.sent)
+
+        ev = ofp_event.EventOFPStateChange(self.dp1)
+        self.app._handle_dead(ev)
+        ok_(batch.done())
+        eq_(set([1, 3]), batch.lost)
+        ok_(not batch.ok())
+
+    def _iter_stats(self, max_chunks=16, timeout=60):
+        # the client side of api.iter_stats()
+        def send_request(req):
+            self.app._handle_send_stats_stream(req)
+            rep = self.replies.pop()
+            self.stream = rep.result
+            return rep
+
+        client = mock.Mock(send_request=send_request)
+        req = ofproto_v1_3_parser.OFPPortStatsRequest(self.dp1)
+        return api.iter_stats(client, req,
+                              ofproto_v1_3_parser.OFPPortStatsReply,
+                              max_chunks=max_chunks, timeout=timeout)
+
+    def _stats_reply(self, port_nos, xid=None):
+        body = [ofproto_v1_3_parser.OFPPortStats(port_no, *range(14))
+                for port_no in port_nos]
+        msg = ofproto_v1_3_parser.OFPPortStatsReply(self.dp1, body=body)
+        msg.xid = self.dp1.sent[0].xid if xid is None else xid
+        self.ofp_brick.send_event_to_observers(
+            ofp_event.EventOFPPortStatsReply(msg), MAIN_DISPATCHER)
+
+    def _recv_loop(self, port_nos):
+        # replies of one port each and the barrier reply, as received
+        # from the switch.
+        def _recv():
+            for port_no in port_nos:
+                self._stats_reply([port_no])
+            self._barrier_reply(self.dp1)
+        return hub.spawn(_recv)
+
+    def _observing(self):
+        return len(self.ofp_brick.observers.get(
+            ofp_event.EventOFPPortStatsReply, ()))
+
+    def test_iter_stats(self):
+        stream = self._iter_stats()
+        eq_(1, self._observing())
+        # the service does not queue the replies of a stream.
+        ok_(ofp_event.EventOFPPortStatsReply not in
+            self.app._observing_events)
+        self._stats_reply([1, 2])
+        self._stats_reply([9], xid=12345)
+        self._stats_reply([3])
+        self._barrier_reply(self.dp1)
+        eq_([1, 2, 3], [stats.port_no for stats in stream])
+        eq_(0, self._observing())
+        ok_(self.stream.name not in app_manager.SERVICE_BRICKS)
+        eq_({}, self.app._switches[1].xids)
+
+    def test_iter_stats_burst(self):
+        stream = self._iter_stats(max_chunks=4)
+        thr = self._recv_loop(range(1, 41))
+        hub.sleep(0.01)
+        # the receive loop waits for the client.
+        eq_(4, self.stream._q.qsize())
+        ok_(not thr.dead)
+        eq_(range(1, 41), [stats.port_no for stats in stream])
+        hub.joinall([thr])
+        eq_(0, self._observing())
+
+    def test_iter_stats_break(self):
+        stream = self._iter_stats(max_chunks=2)
+        thr = self._recv_loop(range(1, 21))
+        for stats in stream:
+            break
+        eq_(1, stats.port_no)
+        stream.close()
+        # the replies after the client has stopped are dropped.
+        hub.joinall([thr])
+        eq_(0, self.stream._q.qsize())
+        eq_(0, self._observing())
+        eq_({}, self.app._switches[1].xids)
+
+    def test_iter_stats_timeout(self):
+        stream = self._iter_stats(max_chunks=1, timeout=0.01)
+        thr = self._recv_loop(range(1, 5))
+        # the receive loop gives up the client which does not consume.
+        hub.joinall([thr])
+        eq_(0, self._observing())
+        eq_(1, next(stream).port_no)
+        self.assertRaises(exception.ReplyOverflow, next, stream)
+
+    def test_iter_stats_error(self):
+        stream = self._iter_stats()
+        self._stats_reply([1])
+        msg = ofproto_v1_3_parser.OFPErrorMsg(
+            self.dp1, type_=ofproto_v1_3.OFPET_BAD_REQUEST, code=0)
+        msg.xid = self.dp1.sent[0].xid
+        self.app._handle_reply(ofp_event.EventOFPErrorMsg(msg))
+        eq_(1, next(stream).port_no)
+        self.assertRaises(exception.OFError, next, stream)
+        eq_(0, self._observing())
+
+    def test_iter_stats_disconnect(self):
+        stream = self._iter_stats()
+        self._stats_reply([1])
+        self.app._handle_dead(ofp_event.EventOFPStateChange(self.dp1))
+        eq_(1, next(stream).port_no)
+        self.assertRaises(exception.SwitchDisconnected, next, stream)
+        eq_(0, self._observing())
@@ -0,0 +1,183 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from nose.tools import eq_, ok_
+
+from ryu.app import bmpstation
+from ryu.lib import hub
+from ryu.lib.packet import afi
+from ryu.lib.packet import bgp
+from ryu.lib.packet import bmp
+from ryu.lib.packet import safi
+
+
+def _peer_msg(cls, peer_address='192.0.2.1', **kwargs):
+    return cls(peer_type=bmp.BMP_PEER_TYPE_GLOBAL,
+               is_post_policy=False,
+               peer_distinguisher=0,
+               peer_address=peer_address,
+               peer_as=30000,
+               peer_bgp_id='192.0.2.1',
+               timestamp=100.,
+               **kwargs)
+
+
+def _route_monitoring(peer_address='192.0.2.1', nlri=[], withdrawn=[],
+                      path_attributes=[]):
+    update = bgp.BGPUpdate(
+        withdrawn_routes=[bgp.BGPWithdrawnRoute(int(p.split('/')[1]),
+                                                p.split('/')[0])
+                          for p in withdrawn],
+        path_attributes=path_attributes,
+        nlri=[bgp.BGPNLRI(int(p.split('/')[1]), p.split('/')[0])
+              for p in nlri])
+    return _peer_msg(bmp.BMPRouteMonitoring, peer_address,
+                     bgp_update=update)
+
+
+class _Socket(object):
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def recv_into(self, buf):
+        if not self.chunks:
+            return 0
+        data = self.chunks.pop(0)
+        buf[:len(data)] = data
+        return len(data)
+
+
+class Test_BMPArchive(unittest.TestCase):
+    """ Test case for bmpstation.BMPArchive
+    """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_write(self):
+        msgs = [str(_route_monitoring('192.0.2.1').serialize()),
+                str(_route_monitoring('192.0.2.2').serialize()),
+                str(_route_monitoring('192.0.2.1').serialize()),
+                str(bmp.BMPInitiation([]).serialize())]
+        archive = bmpstation.BMPArchive(self.dir, max_size=1)
+        archive.write(10., '198.51.100.1', [buffer(m) for m in msgs[:2]])
+        path = archive.path
+        archive.write(11., '198.51.100.1', [buffer(m) for m in msgs[2:]])
+        archive.close()
+        ok_(path != archive.path)
+
+        eq_([(10., '198.51.100.1', msgs[0]), (10., '198.51.100.1', msgs[1])],
+            list(bmpstation.BMPArchive.read(path)))
+        eq_([(11., '198.51.100.1', msgs[2]), (11., '198.51.100.1', msgs[3])],
+            list(bmpstation.BMPArchive.read(archive.path)))
+
+        index = open(path + '.idx').read().splitlines()
+        eq_(2, len(index))
+        timestamp, offset, router, peer = index[1].split()
+        eq_(('198.51.100.1', '192.0.2.2'), (router, peer))
+        eq_([(10., '198.51.100.1', msgs[1])],
+            list(bmpstation.BMPArchive.read(path, int(offset))))
+        eq_(1, len(open(archive.path + '.idx').readlines()))
+
+
+class Test_AdjRIBIn(unittest.TestCase):
+    """ Test case for bmpstation.AdjRIBIn
+    """
+
+    def test_update(self):
+        rib_in = bmpstation.AdjRIBIn()
+        attrs = [bgp.BGPPathAttributeOrigin(value=1)]
+        mp_attrs = [bgp.BGPPathAttributeMpReachNLRI(
+            afi.IP6, safi.UNICAST, '2001:db8::1',
+            [bgp.IP6AddrPrefix(32, '2001:db8::')])]
+        rib_in.update('r1', _route_monitoring(
+            nlri=['10.0.0.0/8', '10.1.0.0/16'], path_attributes=attrs))
+        rib_in.update('r1', _route_monitoring(path_attributes=mp_attrs))
+        rib_in.update('r1', _route_monitoring(
+            '192.0.2.2', nlri=['10.0.0.0/8'], path_attributes=attrs))
+        rib_in.update('r2', _route_monitoring(
+            nlri=['10.0.0.0/8'], path_attributes=attrs))
+        rib_in.update('r1', _route_monitoring(withdrawn=['10.1.0.0/16']))
+
+        rib = rib_in.ribs[('r1', '192.0.2.1', 0, False)]
+        eq_(set(['10.0.0.0/8', '2001:db8::/32']), set(rib))
+        ok_(rib['10.0.0.0/8'] is attrs)
+        eq_(3, len(rib_in.ribs))
+
+        rib_in.update('r1', _peer_msg(
+            bmp.BMPPeerDownNotification,
+            reason=bmp.BMP_PEER_DOWN_REASON_LOCAL_NO_NOTIFICATION,
+            data=None))
+        eq_(set([('r1', '192.0.2.2', 0, False),
+                 ('r2', '192.0.2.1', 0, False)]), set(rib_in.ribs))
+        rib_in.router_down('r1')
+        eq_([('r2', '192.0.2.1', 0, False)], rib_in.ribs.keys())
+
+
+class Test_BMPStation(unittest.TestCase):
+    """ Test case for bmpstation.BMPStation
+    """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        # only the collector state is needed.
+        self.station = bmpstation.BMPStation.__new__(bmpstation.BMPStation)
+        self.station.archive = bmpstation.BMPArchive(self.dir)
+        self.station.adj_rib_in = bmpstation.AdjRIBIn()
+        self.station.output_fd = None
+        self.station.failed_dump_fd = open(os.path.join(self.dir, 'failed'),
+                                           'w')
+        self.station.failed_pkt_count = 0
+        self.station.logger = logging.getLogger('bmpstation')
+        self.station._parse_q = hub.Queue()
+
+    def tearDown(self):
+        self.station.close()
+        shutil.rmtree(self.dir)
+
+    def test_recv_loop(self):
+        msgs = [str(_route_monitoring(nlri=['10.%d.0.0/16' % i]).serialize())
+                for i in range(5)]
+        data = ''.join(msgs)
+        # a message split across recvs, and a bad one.
+        bad = '\x03\x00\x00\x00\x08\x09\x00\x00'
+        chunks = [data[:10], data[10:len(msgs[0]) * 3 + 5],
+                  data[len(msgs[0]) * 3 + 5:] + bad]
+        self.station._recv_loop(_Socket(chunks), 'r1')
+
+        batches = []
+        while not self.station._parse_q.empty():
+            batches.append(self.station._parse_q.get())
+        eq_([3, 3], [len(b[2]) for b in batches])
+        eq_(msgs + [bad], [str(m) for b in batches for m in b[2]])
+
+        self.station._parse(batches)
+        eq_(1, self.station.failed_pkt_count)
+        eq_(5, len(self.station.adj_rib_in.ribs[('r1', '192.0.2.1', 0,
+                                                 False)]))
+        eq_(msgs + [bad],
+            [m for _t, _r, m
+             in bmpstation.BMPArchive.read(self.station.archive.path)])
+
+        self.station._parse([(0., 'r1', None)])
+        eq_({}, self.station.adj_rib_in.ribs)
@@ -0,0 +1,128 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import time
+import unittest
+import mock
+from nose.tools import eq_, ok_
+from webob.request import Request
+
+from ryu.app import ofctl_rest
+from ryu.lib import hub
+from ryu.lib import ofctl_v1_3
+from ryu.ofproto import ofproto_v1_0
+from ryu.ofproto import ofproto_v1_0_parser
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+
+
+class _Datapath(object):
+    """Replies to port stats requests after delay seconds, or never if
+    delay is None.
+    """
+
+    def __init__(self, id_, app, delay, ofproto=ofproto_v1_3,
+                 ofproto_parser=ofproto_v1_3_parser):
+        self.id = id_
+        self.app = app
+        self.delay = delay
+        self.ofproto = ofproto
+        self.ofproto_parser = ofproto_parser
+        self.xid = 0
+
+    def set_xid(self, msg):
+        self.xid += 1
+        msg.set_xid(self.xid)
+
+    def send_msg(self, msg):
+        if self.delay is not None:
+            hub.spawn_after(self.delay, self._reply, msg.xid)
+
+    def _reply(self, xid):
+        stats = ofproto_v1_3_parser.OFPPortStats(self.id, *range(14))
+        msg = ofproto_v1_3_parser.OFPPortStatsReply(self, body=[stats])
+        msg.xid = xid
+        msg.flags = 0
+        self.app.stats_reply_handler(mock.Mock(msg=msg))
+
+
+class _DPSet(object):
+    def __init__(self, dps):
+        self.dps = dict((dp.id, dp) for dp in dps)
+
+    def get_all(self):
+        return self.dps.items()
+
+
+class Test_collect_stats(unittest.TestCase):
+    """ Test case for ofctl_rest.collect_stats
+    """
+
+    def setUp(self):
+        self.app = ofctl_rest.RestStatsApi.__new__(ofctl_rest.RestStatsApi)
+        self.app.waiters = {}
+
+    def test_collect_stats(self):
+        dps = [_Datapath(i, self.app, delay) for i, delay
+               in enumerate([0, 0.1, 0.5, None, 0.05])]
+        start = time.time()
+        stats, timed_out = ofctl_rest.collect_stats(
+            dps, ofctl_v1_3.get_port_stats, self.app.waiters, 0.3)
+        ok_(time.time() - start < 0.45)
+        eq_(['0', '1', '4'], sorted(stats))
+        eq_(4, stats['4'][0]['port_no'])
+        eq_([2, 3], timed_out)
+        # the killed requests are removed.
+        eq_([{}] * 5, self.app.waiters.values())
+
+    def test_request_timeout(self):
+        dps = [_Datapath(1, self.app, 0), _Datapath(2, self.app, None)]
+        with mock.patch.object(ofctl_v1_3, 'DEFAULT_TIMEOUT', 0.1):
+            stats, timed_out = ofctl_rest.collect_stats(
+                dps, ofctl_v1_3.get_port_stats, self.app.waiters, 1)
+        eq_(['1'], stats.keys())
+        eq_([2], timed_out)
+
+
+class Test_StatsController(unittest.TestCase):
+    """ Test case for ofctl_rest.StatsController
+    """
+
+    def setUp(self):
+        self.app = ofctl_rest.RestStatsApi.__new__(ofctl_rest.RestStatsApi)
+        self.app.waiters = {}
+
+    def _get(self, uri, dps, stats):
+        req = Request.blank(uri)
+        data = {'dpset': _DPSet(dps), 'waiters': self.app.waiters}
+        controller = ofctl_rest.StatsController(req, None, data)
+        return controller.get_all_stats(req, stats)
+
+    def test_get_all_stats(self):
+        dps = [_Datapath(1, self.app, 0), _Datapath(2, self.app, None)]
+        res = self._get('/stats/port?timeout=0.1', dps, 'port')
+        eq_(200, res.status_int)
+        body = json.loads(res.body)
+        eq_(['1'], body['stats'].keys())
+        eq_([2], body['timeout'])
+        eq_([], body['unsupported'])
+
+        dps = [_Datapath(3, self.app, None, ofproto_v1_0,
+                         ofproto_v1_0_parser)]
+        body = json.loads(self._get('/stats/meter', dps, 'meter').body)
+        eq_({'stats': {}, 'timeout': [], 'unsupported': [3]}, body)
+
+        eq_(400, self._get('/stats/port?timeout=x', dps, 'port').status_int)
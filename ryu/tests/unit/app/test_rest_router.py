@@ -0,0 +1,162 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import unittest
+from nose.tools import eq_, ok_, raises
+
+from ryu.app import rest_router
+
+
+class Test_PrefixTrie(unittest.TestCase):
+    """ Test case for rest_router.PrefixTrie
+    """
+
+    def test_longest_match(self):
+        trie = rest_router.PrefixTrie()
+        eq_(None, trie.longest_match(0x0a000001))
+        trie.insert(0x0a000000, 8, 'a')
+        trie.insert(0x0a010000, 16, 'b')
+        trie.insert(0x0a010101, 32, 'c')
+        eq_('a', trie.longest_match(0x0a020304))
+        eq_('b', trie.longest_match(0x0a010201))
+        eq_('c', trie.longest_match(0x0a010101))
+        eq_(None, trie.longest_match(0x0b000000))
+        trie.insert(0, 0, 'default')
+        eq_('default', trie.longest_match(0x0b000000))
+
+        trie.delete(0x0a010000, 16)
+        eq_('a', trie.longest_match(0x0a010201))
+        eq_('c', trie.longest_match(0x0a010101))
+        trie.delete(0x0a010101, 32)
+        trie.delete(0x0a000000, 8)
+        trie.delete(0, 0)
+        eq_([None, None, None], trie.root)
+
+
+class Test_RoutingTable(unittest.TestCase):
+    """ Test case for rest_router.RoutingTable
+    """
+
+    def _linear_match(self, table, dst_ip):
+        # the scan which the trie replaced
+        match = None
+        mask = 0
+        for route in table.values():
+            if (rest_router.ipv4_apply_mask(dst_ip, route.netmask) ==
+                    route.dst_ip and mask < route.netmask):
+                match = route
+                mask = route.netmask
+        if match is None:
+            match = table.get(rest_router.DEFAULT_ROUTE)
+        return match
+
+    def test_get_data(self):
+        table = rest_router.RoutingTable()
+        rand = random.Random(1)
+        for _i in range(200):
+            prefix_len = rand.randint(8, 32)
+            addr = rand.randint(0, 2 ** 32 - 1) & 0xff0fffff
+            nw_addr = '%s/%d' % (rest_router.ipv4_int_to_text(addr),
+                                 prefix_len)
+            dst_ip = rest_router.ipv4_apply_mask(
+                rest_router.ipv4_int_to_text(addr), prefix_len)
+            if '%s/%d' % (dst_ip, prefix_len) not in table:
+                table.add(nw_addr, '192.168.0.%d' % rand.randint(1, 3))
+        table.add(rest_router.DEFAULT_ROUTE, '192.168.0.1')
+
+        for _i in range(200):
+            dst_ip = rest_router.ipv4_int_to_text(
+                rand.randint(0, 2 ** 32 - 1) & 0xff0fffff)
+            eq_(self._linear_match(table, dst_ip),
+                table.get_data(dst_ip=dst_ip))
+
+    def test_indexes(self):
+        table = rest_router.RoutingTable()
+        r1 = table.add('10.0.0.0/8', '192.168.0.1')
+        r2 = table.add('10.1.0.0/16', '192.168.0.1')
+        r3 = table.add('10.1.1.0/24', '192.168.0.2')
+        eq_(set([r1, r2]), set(table.get_routes('192.168.0.1')))
+        eq_([], table.get_routes('192.168.0.3'))
+
+        eq_(None, table.get_data(gw_mac='00:00:00:00:00:01'))
+        table.set_gateway_mac(r3, '00:00:00:00:00:01')
+        eq_(r3, table.get_data(gw_mac='00:00:00:00:00:01'))
+        table.set_gateway_mac(r3, '00:00:00:00:00:02')
+        eq_(None, table.get_data(gw_mac='00:00:00:00:00:01'))
+        eq_(r3, table.get_data(gw_mac='00:00:00:00:00:02'))
+
+        eq_(r3, table.get_data(dst_ip='10.1.1.1'))
+        table.delete(r3.route_id)
+        eq_(r2, table.get_data(dst_ip='10.1.1.1'))
+        eq_(None, table.get_data(gw_mac='00:00:00:00:00:02'))
+        eq_([], table.get_routes('192.168.0.2'))
+        eq_(['10.0.0.0/8', '10.1.0.0/16'], sorted(table.keys()))
+        table.delete(r3.route_id)
+        eq_(2, len(table))
+
+    def test_overlap(self):
+        table = rest_router.RoutingTable()
+        r1 = table.add('10.0.0.0/24', '192.168.0.1')
+        try:
+            table.add('10.0.0.1/24', '192.168.0.2')
+        except rest_router.CommandFailure:
+            pass
+        else:
+            ok_(False, 'overlapping route added')
+        eq_([r1], table.values())
+        eq_([], table.get_routes('192.168.0.2'))
+        eq_(r1, table.get_data(dst_ip='10.0.0.5'))
+
+        # a route id which is not in the table is ignored.
+        table.delete(r1.route_id + 1)
+        eq_(1, len(table))
+        table.delete(r1.route_id)
+        eq_(0, len(table))
+        eq_(None, table.get_data(dst_ip='10.0.0.5'))
+        eq_([], table.get_routes('192.168.0.1'))
+
+        table.add(rest_router.DEFAULT_ROUTE, '192.168.0.1')
+        try:
+            table.add('0.0.0.0/0', '192.168.0.2')
+        except rest_router.CommandFailure:
+            pass
+        else:
+            ok_(False, 'overlapping default route added')
+
+
+class Test_AddressData(unittest.TestCase):
+    """ Test case for rest_router.AddressData
+    """
+
+    def test_get_data(self):
+        data = rest_router.AddressData()
+        a1 = data.add('10.0.0.1/24')
+        a2 = data.add('10.0.1.1/24')
+        eq_(a1, data.get_data(ip='10.0.0.100'))
+        eq_(a2, data.get_data(ip='10.0.1.100'))
+        eq_(None, data.get_data(ip='10.0.2.1'))
+        eq_(a2, data.get_data(addr_id=a2.address_id))
+
+        data.delete(a1.address_id)
+        eq_(None, data.get_data(ip='10.0.0.100'))
+        eq_(None, data.get_data(addr_id=a1.address_id))
+        eq_([a2], data.values())
+
+    @raises(rest_router.CommandFailure)
+    def test_overlap(self):
+        data = rest_router.AddressData()
+        data.add('10.0.0.1/24')
+        data.add('10.0.0.2/16')
@@ -0,0 +1,168 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+from nose.tools import eq_, ok_
+
+from ryu.app import stats_collector
+from ryu.controller.handler import MAIN_DISPATCHER, DEAD_DISPATCHER
+from ryu.lib import hub
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+
+
+class _Datapath(object):
+    ofproto = ofproto_v1_3
+    ofproto_parser = ofproto_v1_3_parser
+
+    def __init__(self, id_):
+        self.id = id_
+        self.xid = 0
+        self.sent = []
+
+    def set_xid(self, msg):
+        self.xid += 1
+        msg.set_xid(self.xid)
+
+    def send_msg(self, msg):
+        self.sent.append(msg)
+
+
+def _port_stats(port_no, rx_bytes):
+    return ofproto_v1_3_parser.OFPPortStats(port_no, 0, 0, rx_bytes,
+                                            *range(11))
+
+
+def _reply(dp, xid, body, flags=0):
+    msg = ofproto_v1_3_parser.OFPPortStatsReply(dp, body=body)
+    msg.xid = xid
+    msg.flags = flags
+    return mock.Mock(msg=msg)
+
+
+class Test_StatsCollector(unittest.TestCase):
+    """ Test case for stats_collector.StatsCollector
+    """
+
+    def setUp(self):
+        # only the polling state is needed.
+        cls = stats_collector.StatsCollector
+        self.app = cls.__new__(cls)
+        self.app.datapaths = {}
+        self.app.subscriptions = {}
+        self.app.polls = {}
+        self.app._schedule = []
+        self.app._wakeup = hub.Event()
+        self.events = []
+        self.app.send_event = lambda name, ev: self.events.append(
+            (name, ev))
+        self.dp1 = _Datapath(1)
+        self.dp2 = _Datapath(2)
+        for dp in [self.dp1, self.dp2]:
+            self.app._state_change_handler(mock.Mock(datapath=dp,
+                                                     state=MAIN_DISPATCHER))
+
+    def test_poll(self):
+        with mock.patch('time.time', return_value=100.):
+            self.app.subscribe('a', None, 'port', 10)
+            self.app.subscribe('b', 1, 'port', 5)
+            self.app.subscribe('b', 2, 'flow', 20)
+            eq_(5, self.app._poll(100.))
+        # one request for the subscriptions of a switch.
+        eq_(['OFPFlowStatsRequest', 'OFPPortStatsRequest'],
+            sorted(m.__class__.__name__ for m in self.dp2.sent))
+        eq_(1, len(self.dp1.sent))
+        eq_(5, self.app._poll(100.))
+
+        with mock.patch('time.time', return_value=101.):
+            self.app._port_stats_reply_handler(_reply(
+                self.dp1, 1, [_port_stats(1, 100)],
+                ofproto_v1_3.OFPMPF_REPLY_MORE))
+            self.app._port_stats_reply_handler(_reply(
+                self.dp1, 1, [_port_stats(2, 200)]))
+            # a reply to another request is ignored.
+            self.app._port_stats_reply_handler(_reply(
+                self.dp2, 9, [_port_stats(1, 0)]))
+        eq_(['a', 'b'], sorted(name for name, _ev in self.events))
+        ev = self.events[0][1]
+        eq_((1, 'port', 101., None), (ev.dpid, ev.stats_type, ev.timestamp,
+                                      ev.period))
+        eq_([1, 2], [s.port_no for s in ev.body])
+        eq_(100, ev.deltas[1][2])
+
+        self.app._poll(104.9)
+        eq_(1, len(self.dp1.sent))
+        self.app._poll(105.)
+        eq_(2, len(self.dp1.sent))
+        del self.events[:]
+        with mock.patch('time.time', return_value=106.):
+            self.app._port_stats_reply_handler(_reply(
+                self.dp1, 2, [_port_stats(1, 150), _port_stats(3, 10)]))
+        ev = self.events[0][1]
+        eq_(5., ev.period)
+        eq_({1: (0, 0, 50, 0, 0, 0, 0, 0), 3: (0, 0, 10, 0, 1, 2, 3, 4)},
+            ev.deltas)
+
+        with mock.patch('time.time', return_value=107.):
+            eq_((106., ev.body), self.app.get_stats(1, 'port', 2))
+            eq_(None, self.app.get_stats(1, 'port', 0.5))
+            eq_(None, self.app.get_stats(2, 'port', 2))
+
+    def test_unsubscribe(self):
+        with mock.patch('time.time', return_value=100.):
+            self.app.subscribe('a', 1, 'port', 10)
+            self.app.subscribe('b', 1, 'port', 1)
+            self.app._poll(100.)
+            self.app.unsubscribe('b', 1, 'port')
+        self.app._poll(101.)
+        # the next poll is already scheduled.
+        eq_(2, len(self.dp1.sent))
+        self.app._poll(105.)
+        eq_(2, len(self.dp1.sent))
+        self.app._poll(111.)
+        eq_(3, len(self.dp1.sent))
+
+        self.app.unsubscribe('a', 1, 'port')
+        eq_(None, self.app._poll(200.))
+        eq_(3, len(self.dp1.sent))
+
+    def test_switch_leave(self):
+        with mock.patch('time.time', return_value=100.):
+            self.app.subscribe('a', None, 'port', 10)
+        self.app._state_change_handler(mock.Mock(datapath=self.dp1,
+                                                 state=DEAD_DISPATCHER))
+        self.app._poll(100.)
+        eq_(0, len(self.dp1.sent))
+        eq_(1, len(self.dp2.sent))
+
+        dp3 = _Datapath(3)
+        with mock.patch('time.time', return_value=103.):
+            self.app._state_change_handler(mock.Mock(datapath=dp3,
+                                                     state=MAIN_DISPATCHER))
+        self.app._poll(103.)
+        eq_(1, len(dp3.sent))
+
+    def test_flow_key(self):
+        # the same match of fields in another order.
+        parser = ofproto_v1_3_parser
+        stats = [parser.OFPFlowStats(match=match, table_id=0, priority=1,
+                                     cookie=0)
+                 for match in [parser.OFPMatch(in_port=1, eth_type=0x800),
+                               parser.OFPMatch(eth_type=0x800, in_port=1),
+                               parser.OFPMatch(in_port=2, eth_type=0x800)]]
+        keys = [stats_collector._flow_key(s) for s in stats]
+        eq_(keys[0], keys[1])
+        ok_(keys[0] != keys[2])
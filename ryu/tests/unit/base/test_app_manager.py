@@ -0,0 +1,94 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from nose.tools import eq_
+
+from ryu.base import app_manager
+from ryu.controller import event
+from ryu.controller import handler
+from ryu.controller.handler import set_ev_cls
+
+
+class _EventTest(event.EventBase):
+    pass
+
+
+def _app_cls():
+    # defined lazily because test_manager reloads app_manager.
+    class _App(app_manager.RyuApp):
+        @set_ev_cls(_EventTest, handler.MAIN_DISPATCHER)
+        def main_handler(self, ev):
+            pass
+
+        @set_ev_cls(_EventTest)
+        def any_handler(self, ev):
+            pass
+
+    return _App
+
+
+class Test_RyuApp(unittest.TestCase):
+    """ Test case for RyuApp dispatch tables
+    """
+
+    def setUp(self):
+        self.app = _app_cls()()
+        handler.register_instance(self.app)
+        self.ev = _EventTest()
+
+    def tearDown(self):
+        pass
+
+    def test_get_handlers(self):
+        eq_(set([self.app.main_handler, self.app.any_handler]),
+            set(self.app.get_handlers(self.ev)))
+        eq_(set([self.app.main_handler, self.app.any_handler]),
+            set(self.app.get_handlers(self.ev, handler.MAIN_DISPATCHER)))
+        eq_((self.app.any_handler,),
+            self.app.get_handlers(self.ev, handler.CONFIG_DISPATCHER))
+
+    def test_get_handlers_register(self):
+        handlers = self.app.get_handlers(self.ev, handler.CONFIG_DISPATCHER)
+        eq_(handlers,
+            self.app.get_handlers(self.ev, handler.CONFIG_DISPATCHER))
+
+        def dynamic_handler(ev):
+            pass
+
+        self.app.register_handler(_EventTest, dynamic_handler)
+        eq_((self.app.any_handler, dynamic_handler),
+            self.app.get_handlers(self.ev, handler.CONFIG_DISPATCHER))
+
+        self.app.unregister_handler(_EventTest, dynamic_handler)
+        eq_((self.app.any_handler,),
+            self.app.get_handlers(self.ev, handler.CONFIG_DISPATCHER))
+
+    def test_get_observers(self):
+        eq_((), self.app.get_observers(self.ev, handler.MAIN_DISPATCHER))
+
+        self.app.register_observer(_EventTest, 'foo',
+                                   [handler.MAIN_DISPATCHER])
+        self.app.register_observer(_EventTest, 'bar')
+        eq_(set(['foo', 'bar']),
+            set(self.app.get_observers(self.ev, handler.MAIN_DISPATCHER)))
+        eq_(('bar',),
+            self.app.get_observers(self.ev, handler.CONFIG_DISPATCHER))
+
+        self.app.unregister_observer(_EventTest, 'bar')
+        eq_((), self.app.get_observers(self.ev, handler.CONFIG_DISPATCHER))
+
+        self.app.unregister_observer_all_event('foo')
+        eq_((), self.app.get_observers(self.ev, handler.MAIN_DISPATCHER))
@@ -0,0 +1,119 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+from nose.tools import eq_, ok_
+
+from ryu.base import app_manager  # to suppress cyclic import
+from ryu.controller import controller
+from ryu.controller import ofp_event
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+
+
+class _FakeSocket(object):
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.recv_count = 0
+
+    def setsockopt(self, *args):
+        pass
+
+    def recv_into(self, buf):
+        self.recv_count += 1
+        if not self.chunks:
+            return 0
+        data = self.chunks.pop(0)
+        ret = min(len(data), len(buf))
+        buf[:ret] = data[:ret]
+        if ret < len(data):
+            self.chunks.insert(0, data[ret:])
+        return ret
+
+
+class Test_Datapath(unittest.TestCase):
+    """ Test case for Datapath
+    """
+
+    def setUp(self):
+        self.brick = mock.Mock()
+        self.brick.get_handlers.return_value = []
+        self.dp = None
+
+    def tearDown(self):
+        pass
+
+    def _datapath(self, chunks):
+        with mock.patch('ryu.base.app_manager.lookup_service_brick',
+                        return_value=self.brick):
+            dp = controller.Datapath(_FakeSocket(chunks), ('127.0.0.1', 0))
+        dp.set_version(ofproto_v1_3.OFP_VERSION)
+        return dp
+
+    def _echo(self, dp, data):
+        msg = ofproto_v1_3_parser.OFPEchoRequest(dp, data=data)
+        msg.set_xid(1)
+        msg.serialize()
+        return str(msg.buf)
+
+    def _received(self):
+        return [args[0][0] for args in
+                self.brick.send_event_to_observers.call_args_list
+                if isinstance(args[0][0], ofp_event.EventOFPEchoRequest)]
+
+    def test_recv_burst(self):
+        dp = self._datapath([])
+        data = ['burst%d' % i for i in range(100)]
+        dp.socket.chunks = [''.join(self._echo(dp, d) for d in data)]
+        dp._recv_loop()
+
+        evs = self._received()
+        eq_(data, [ev.msg.data for ev in evs])
+        # one recv for the whole burst and one for EOF
+        eq_(2, dp.socket.recv_count)
+
+    def test_recv_chunk_boundary(self):
+        dp = self._datapath([])
+        data = ['x' * 100, 'y' * 100, 'z' * 100]
+        buf = ''.join(self._echo(dp, d) for d in data)
+        dp.socket.chunks = [buf[i:i + 7] for i in range(0, len(buf), 7)]
+        with mock.patch.object(controller.CONF, 'ofp_recv_chunk_size', 64):
+            dp._recv_loop()
+
+        evs = self._received()
+        eq_(data, [ev.msg.data for ev in evs])
+        ok_(not dp.is_active)
+
+    def test_send_batch(self):
+        dp = self._datapath([])
+        sent = []
+
+        def _sendall(buf):
+            sent.append(str(buf))
+            dp.is_active = False
+
+        dp.socket.sendall = _sendall
+        bufs = [self._echo(dp, 'send%d' % i) for i in range(20)]
+        for buf in bufs:
+            dp.send(buf)
+        dp._send_loop()
+
+        eq_([''.join(bufs)], sent)
+        eq_(1, dp.send_stats['flushes'])
+        eq_(20, dp.send_stats['flushed_msgs'])
+        eq_(len(''.join(bufs)), dp.send_stats['flushed_bytes'])
+        eq_(20, dp.send_stats['max_batch'])
+        ok_(dp.send_q is None)
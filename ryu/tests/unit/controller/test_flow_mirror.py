@@ -0,0 +1,199 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+from nose.tools import eq_, ok_
+
+from ryu.base import app_manager  # to suppress cyclic import
+from ryu.controller import controller
+from ryu.controller import flow_mirror
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+from ryu.ofproto import ofproto_v1_4
+
+
+ofp = ofproto_v1_3
+parser = ofproto_v1_3_parser
+
+
+class _FakeSocket(object):
+    def setsockopt(self, *args):
+        pass
+
+
+def _actions(port):
+    return [parser.OFPInstructionActions(ofp.OFPIT_APPLY_ACTIONS,
+                                         [parser.OFPActionOutput(port)])]
+
+
+class Test_FlowMirror(unittest.TestCase):
+    """ Test case for flow_mirror.FlowMirror
+    """
+
+    def setUp(self):
+        with mock.patch('ryu.base.app_manager.lookup_service_brick'):
+            self.dp = controller.Datapath(_FakeSocket(), ('127.0.0.1', 0))
+        self.dp.set_version(ofp.OFP_VERSION)
+        self.mirror = flow_mirror.FlowMirror(self.dp)
+        self.dp.flow_mirror = self.mirror
+
+    def _flow_mod(self, command=ofp.OFPFC_ADD, table_id=0, priority=1,
+                  match=None, cookie=0, cookie_mask=0, out_port=ofp.OFPP_ANY,
+                  port=1, hard_timeout=0):
+        if match is None:
+            match = parser.OFPMatch()
+        self.dp.send_msg(parser.OFPFlowMod(
+            self.dp, cookie=cookie, cookie_mask=cookie_mask,
+            table_id=table_id, command=command, hard_timeout=hard_timeout,
+            priority=priority, out_port=out_port, out_group=ofp.OFPG_ANY,
+            match=match,
+            instructions=_actions(port)))
+
+    def _ports(self, flows):
+        return sorted(f.instructions[0].actions[0].port for f in flows)
+
+    def test_flow_mod(self):
+        self._flow_mod(match=parser.OFPMatch(in_port=1), port=2, cookie=1)
+        self._flow_mod(match=parser.OFPMatch(in_port=1, eth_type=0x800),
+                       port=3, cookie=1)
+        self._flow_mod(match=parser.OFPMatch(in_port=2), port=4, cookie=2)
+        self._flow_mod(table_id=1, match=parser.OFPMatch(in_port=1),
+                       port=5, cookie=1)
+        # replaces the flow of the same match and priority.
+        self._flow_mod(match=parser.OFPMatch(in_port=2), port=6, cookie=2)
+        eq_(4, len(self.mirror))
+        eq_(5, len(self.dp.send_q))
+
+        m = self.mirror
+        eq_([2, 3, 5], self._ports(m.get_flows(cookie=1,
+                                               cookie_mask=2 ** 64 - 1)))
+        eq_([2, 3], self._ports(m.get_flows(table_id=0, cookie=1,
+                                            cookie_mask=2 ** 64 - 1)))
+        eq_([2, 3, 6], self._ports(m.get_flows(table_id=0)))
+        eq_([2, 3], self._ports(m.get_flows(
+            table_id=0, match=parser.OFPMatch(in_port=1))))
+        eq_([2], self._ports(m.get_flows(
+            table_id=0, match=parser.OFPMatch(in_port=1), priority=1,
+            strict=True)))
+        eq_([], m.get_flows(table_id=0, match=parser.OFPMatch(in_port=1),
+                            priority=2, strict=True))
+
+        self._flow_mod(command=ofp.OFPFC_MODIFY,
+                       match=parser.OFPMatch(in_port=1), port=7)
+        eq_([6, 7, 7], self._ports(m.get_flows(table_id=0)))
+        # OpenFlow 1.3 does not add a flow by modify.
+        self._flow_mod(command=ofp.OFPFC_MODIFY_STRICT, priority=2,
+                       match=parser.OFPMatch(in_port=1), port=8)
+        eq_(4, len(m))
+
+        # out_port filters the flows to delete.
+        self._flow_mod(command=ofp.OFPFC_DELETE, table_id=ofp.OFPTT_ALL,
+                       out_port=5)
+        eq_([6, 7, 7], self._ports(m.get_flows()))
+        self._flow_mod(command=ofp.OFPFC_DELETE_STRICT,
+                       match=parser.OFPMatch(in_port=1))
+        eq_([6, 7], self._ports(m.get_flows()))
+        self._flow_mod(command=ofp.OFPFC_DELETE, cookie=2,
+                       cookie_mask=2 ** 64 - 1)
+        eq_([7], self._ports(m.get_flows()))
+        eq_({1: set([(0, 1, frozenset([('in_port', 1),
+                                       ('eth_type', 0x800)]))])},
+            m.cookies)
+
+        self._flow_mod(command=ofp.OFPFC_DELETE, table_id=ofp.OFPTT_ALL)
+        eq_(0, len(m))
+        eq_({}, m.tables)
+        eq_({}, m.cookies)
+
+    def test_old_api_match(self):
+        match = parser.OFPMatch()
+        match.set_in_port(3)
+        self._flow_mod(match=match)
+        eq_(1, len(self.mirror.get_flows(match=parser.OFPMatch(in_port=3))))
+
+    def test_hard_timeout(self):
+        with mock.patch('time.time', return_value=100.):
+            self._flow_mod(hard_timeout=10)
+        with mock.patch('time.time', return_value=109.):
+            eq_(1, len(self.mirror.get_flows()))
+        with mock.patch('time.time', return_value=110.):
+            eq_(0, len(self.mirror.get_flows()))
+        eq_(0, len(self.mirror))
+
+    def test_flow_removed(self):
+        self._flow_mod(match=parser.OFPMatch(in_port=1))
+        self._flow_mod(match=parser.OFPMatch(in_port=2))
+        self.mirror.flow_removed(parser.OFPFlowRemoved(
+            self.dp, cookie=0, priority=1, table_id=0,
+            match=parser.OFPMatch(in_port=1)))
+        eq_([frozenset([('in_port', 2)])],
+            [f.match_key for f in self.mirror.get_flows()])
+
+    def _stats(self, port, duration_sec=5):
+        return parser.OFPFlowStats(
+            table_id=0, duration_sec=duration_sec, duration_nsec=0,
+            priority=1, idle_timeout=0, hard_timeout=0, flags=0, cookie=0,
+            packet_count=0, byte_count=0,
+            match=parser.OFPMatch(in_port=port),
+            instructions=_actions(port))
+
+    def _reply(self, xid, body, flags=0):
+        msg = parser.OFPFlowStatsReply(self.dp, body=body)
+        msg.xid = xid
+        msg.flags = flags
+        return msg
+
+    def test_dump(self):
+        self._flow_mod(match=parser.OFPMatch(in_port=9), port=9)
+        req = self.mirror.dump_request()
+        ok_(isinstance(req, parser.OFPFlowStatsRequest))
+
+        with mock.patch('time.time', return_value=100.):
+            self.mirror.stats_reply(self._reply(req.xid + 1,
+                                                [self._stats(5)]))
+            self.mirror.stats_reply(self._reply(
+                req.xid, [self._stats(1)], ofp.OFPMPF_REPLY_MORE))
+            eq_([9], self._ports(self.mirror.get_flows()))
+            self.mirror.stats_reply(self._reply(req.xid, [self._stats(2)]))
+        eq_([1, 2], self._ports(self.mirror.get_flows()))
+        eq_(95., self.mirror.get_flows()[0].install_time)
+        eq_(100., self.mirror.last_sync)
+
+        # a dump is dropped if the flows have been modified since.
+        req = self.mirror.dump_request()
+        self._flow_mod(match=parser.OFPMatch(in_port=3), port=3)
+        self.mirror.stats_reply(self._reply(req.xid, []))
+        eq_([1, 2, 3], self._ports(self.mirror.get_flows()))
+
+    def test_error(self):
+        self.mirror.error(parser.OFPErrorMsg(
+            self.dp, type_=ofp.OFPET_BAD_REQUEST))
+        ok_(not self.mirror.resync.is_set())
+        self.mirror.error(parser.OFPErrorMsg(
+            self.dp, type_=ofp.OFPET_FLOW_MOD_FAILED))
+        ok_(self.mirror.resync.is_set())
+
+    def test_bundle(self):
+        self.dp.set_version(ofproto_v1_4.OFP_VERSION)
+        parser4 = self.dp.ofproto_parser
+        flow_mod = parser4.OFPFlowMod(self.dp,
+                                      match=parser4.OFPMatch(in_port=1))
+        self.dp.send_msg(parser4.OFPBundleAddMsg(
+            self.dp, 1, ofproto_v1_4.OFPBF_ATOMIC, flow_mod, []))
+        eq_(1, len(self.mirror))
+        self.mirror.error(parser4.OFPErrorMsg(
+            self.dp, type_=ofproto_v1_4.OFPET_BUNDLE_FAILED))
+        ok_(self.mirror.resync.is_set())
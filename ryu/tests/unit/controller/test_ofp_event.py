@@ -0,0 +1,70 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+from nose.tools import eq_, ok_
+
+from ryu.controller import ofp_event
+from ryu.lib.packet import ethernet
+from ryu.lib.packet import ipv4
+from ryu.lib.packet import packet
+from ryu.lib.packet import udp
+from ryu.ofproto import ether
+from ryu.ofproto import inet
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+from ryu.ofproto.ofproto_protocol import ProtocolDesc
+
+
+class Test_get_packet(unittest.TestCase):
+    """ Test case for the decoded packet of EventOFPPacketIn
+    """
+
+    def _msg(self):
+        pkt = packet.Packet()
+        pkt.add_protocol(ethernet.ethernet(ethertype=ether.ETH_TYPE_IP))
+        pkt.add_protocol(ipv4.ipv4(proto=inet.IPPROTO_UDP))
+        pkt.add_protocol(udp.udp(5000, 5001))
+        pkt.add_protocol('payload')
+        pkt.serialize()
+        datapath = ProtocolDesc(version=ofproto_v1_3.OFP_VERSION)
+        return ofproto_v1_3_parser.OFPPacketIn(datapath,
+                                               data=buffer(pkt.data))
+
+    def test_shared(self):
+        msg = self._msg()
+        ev1 = ofp_event.EventOFPPacketIn(msg)
+        ev2 = ofp_event.EventOFPPacketIn(msg)
+        packet_cls = mock.Mock(wraps=packet.Packet)
+        with mock.patch.object(ofp_event, 'packet',
+                               mock.Mock(Packet=packet_cls)):
+            pkt = ev1.pkt_headers
+            ok_(pkt is ev2.pkt_headers)
+            ok_(pkt is ofp_event.get_packet(msg, headers_only=True))
+            eq_(1, packet_cls.call_count)
+            eq_(5001, pkt.get_protocol(udp.udp).dst_port)
+
+            pkt = ev1.pkt
+            ok_(pkt is ev2.pkt)
+            eq_(2, packet_cls.call_count)
+            # the full one is preferred once decoded
+            ok_(pkt is ev1.pkt_headers)
+
+    def test_to_jsondict(self):
+        msg = self._msg()
+        jsondict = msg.to_jsondict()
+        ofp_event.get_packet(msg)
+        eq_(jsondict, msg.to_jsondict())
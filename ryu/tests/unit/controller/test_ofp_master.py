@@ -0,0 +1,210 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import socket
+import unittest
+import mock
+from nose.tools import eq_, ok_
+
+from ryu.lib import hub
+hub.patch()
+from ryu.base import app_manager  # to suppress cyclic import
+from ryu.controller import handler
+from ryu.controller import ofp_event
+from ryu.controller import ofp_master
+from ryu.controller import ofp_worker
+from ryu.ofproto import ofproto_protocol
+from ryu.ofproto import ofproto_v1_0
+from ryu.ofproto import ofproto_v1_0_parser
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+
+
+def _master(sock):
+    # RyuApp.__init__() is not called, as test_manager reloads app_manager.
+    cls = ofp_master.OFPMaster
+    master = cls.__new__(cls)
+    master.name = 'ofp_event'
+    master.logger = logging.getLogger('test_ofp_master')
+    master.observers = {}
+    master._observers_table = {}
+    master.workers = [(12345, ofp_worker.Channel(sock))]
+    master.dps = {}
+    master._subscribed = set()
+    master._subscribe(ofp_event.EventOFPStateChange)
+    master._subscribe(ofp_event.EventOFPSwitchFeatures)
+    master._subscribe(ofp_event.EventOFPPortDescStatsReply)
+    master.send_event = mock.Mock()
+    return master
+
+
+def _wait(cond):
+    with hub.Timeout(3):
+        while not cond():
+            hub.sleep(0.01)
+
+
+class Test_OFPMaster(unittest.TestCase):
+    """ Test case for ofp_master.OFPMaster
+    """
+
+    def setUp(self):
+        self.sock, self.worker_sock = socket.socketpair()
+        self.master = _master(self.sock)
+        self.worker = ofp_worker.Channel(self.worker_sock)
+        self.received = []
+        self.master_thr = hub.spawn(self.master._serve_worker,
+                                    *self.master.workers[0])
+        self.worker_thr = hub.spawn(self.worker.serve, self._dispatch)
+        hub.sleep(0)
+
+    def tearDown(self):
+        hub.kill(self.worker_thr)
+        hub.kill(self.master_thr)
+        hub.joinall([self.worker_thr, self.master_thr])
+        self.sock.close()
+        self.worker_sock.close()
+
+    def _dispatch(self, channel, method, params):
+        self.received.append((method, params))
+
+    def _events(self):
+        return [args[1] for args, _kwargs
+                in self.master.send_event.call_args_list]
+
+    def test_subscribe(self):
+        _wait(lambda: len(self.received) == 3)
+        eq_([('subscribe', [['EventOFPStateChange']]),
+             ('subscribe', [['EventOFPSwitchFeatures']]),
+             ('subscribe', [['EventOFPPortDescStatsReply']])],
+            self.received)
+
+        # observers registered at runtime are subscribed to.
+        self.master.register_observer(ofp_event.EventOFPPacketIn, 'app')
+        self.master.register_observer(ofp_event.EventOFPPacketIn, 'app2')
+        self.master.register_observer(ofp_event.EventOFPBarrierReply, 'app')
+        _wait(lambda: len(self.received) == 5)
+        eq_([('subscribe', [['EventOFPPacketIn']]),
+             ('subscribe', [['EventOFPBarrierReply']])], self.received[3:])
+
+    def test_subscribe_before_serve(self):
+        # observers registered by AppManager before the master starts.
+        sock, worker_sock = socket.socketpair()
+        master = _master(sock)
+        master.register_observer(ofp_event.EventOFPPacketIn, 'app')
+        master_thr = hub.spawn(master._serve_worker, *master.workers[0])
+        worker = ofp_worker.Channel(worker_sock)
+        received = []
+        worker_thr = hub.spawn(worker.serve,
+                               lambda *args: received.append(args[1:]))
+        try:
+            _wait(lambda: len(received) == 4)
+            eq_(('subscribe', [['EventOFPPacketIn']]), received[3])
+        finally:
+            hub.kill(worker_thr)
+            hub.kill(master_thr)
+            hub.joinall([worker_thr, master_thr])
+            sock.close()
+            worker_sock.close()
+
+    def test_dispatch(self):
+        self.master.register_observer(ofp_event.EventOFPStateChange, 'app')
+        self.master.register_observer(ofp_event.EventOFPEchoRequest, 'app')
+        self.worker.send('state', [1, ofproto_v1_3.OFP_VERSION,
+                                   ['127.0.0.1', 6633],
+                                   handler.MAIN_DISPATCHER])
+        echo = ofproto_v1_3_parser.OFPEchoRequest(
+            ofproto_protocol.ProtocolDesc(ofproto_v1_3.OFP_VERSION),
+            data='hoge')
+        echo.set_xid(10)
+        echo.serialize()
+        self.worker.send('msg', [1, handler.MAIN_DISPATCHER, str(echo.buf)])
+        _wait(lambda: self.master.send_event.call_count == 2)
+
+        ev = self._events()[0]
+        ok_(isinstance(ev, ofp_event.EventOFPStateChange))
+        eq_(handler.MAIN_DISPATCHER, ev.state)
+        dp = ev.datapath
+        eq_(1, dp.id)
+        eq_(('127.0.0.1', 6633), dp.address)
+        ok_(self.master.dps[1] is dp)
+
+        ev = self._events()[1]
+        ok_(isinstance(ev, ofp_event.EventOFPEchoRequest))
+        eq_(10, ev.msg.xid)
+        eq_('hoge', ev.msg.data)
+        ok_(ev.msg.datapath is dp)
+
+        # messages sent to the datapath are relayed to the worker.
+        del self.received[:]
+        dp.send_msg(ofproto_v1_3_parser.OFPEchoReply(dp, data='hoge'))
+        _wait(lambda: self.received)
+        method, (dpid, buf) = self.received[0]
+        eq_('send_msg', method)
+        eq_(1, dpid)
+        msg = ofproto_v1_3_parser.OFPEchoReply.parser(
+            dp, ofproto_v1_3.OFP_VERSION, ofproto_v1_3.OFPT_ECHO_REPLY,
+            len(buf), dp.xid, buf)
+        eq_('hoge', msg.data)
+
+    def test_worker_dead(self):
+        self.master.register_observer(ofp_event.EventOFPStateChange, 'app')
+        for dpid in [1, 2]:
+            self.worker.send('state', [dpid, ofproto_v1_3.OFP_VERSION,
+                                       ['127.0.0.1', 6633],
+                                       handler.MAIN_DISPATCHER])
+        _wait(lambda: len(self.master.dps) == 2)
+        dps = dict(self.master.dps)
+
+        hub.kill(self.worker_thr)
+        hub.joinall([self.worker_thr])
+        self.worker_sock.close()
+        hub.joinall([self.master_thr])
+
+        eq_({}, self.master.dps)
+        evs = self._events()[2:]
+        eq_(2, len(evs))
+        eq_(set(dps.values()), set(ev.datapath for ev in evs))
+        for ev in evs:
+            eq_(handler.DEAD_DISPATCHER, ev.state)
+            ok_(not ev.datapath.is_active)
+
+    def test_ports(self):
+        # kept as by ofp_handler, e.g. for ryu.topology.switches.
+        dp = ofp_master.RemoteDatapath(None, 1, ofproto_v1_3.OFP_VERSION)
+        self.master._update_ports(
+            dp, ofproto_v1_3_parser.OFPSwitchFeatures(dp))
+        eq_({}, dp.ports)
+        ports = [ofproto_v1_3_parser.OFPPort(port_no, *range(10))
+                 for port_no in [1, 2]]
+        self.master._update_ports(
+            dp, ofproto_v1_3_parser.OFPPortDescStatsReply(dp, body=ports))
+        eq_({1: ports[0], 2: ports[1]}, dp.ports)
+
+        dp = ofp_master.RemoteDatapath(None, 2, ofproto_v1_0.OFP_VERSION)
+        msg = ofproto_v1_0_parser.OFPSwitchFeatures(dp)
+        msg.ports = {1: ports[0]}
+        self.master._update_ports(dp, msg)
+        eq_({1: ports[0]}, dp.ports)
+
+    def test_send_packet_out(self):
+        channel = mock.Mock()
+        dp = ofp_master.RemoteDatapath(channel, 1, ofproto_v1_0.OFP_VERSION)
+        dp.send_packet_out(actions=[], data='hoge')
+        method, (dpid, buf) = channel.send.call_args[0]
+        eq_('send_msg', method)
+        eq_(1, dpid)
+        eq_(ofproto_v1_0.OFPT_PACKET_OUT, ord(buf[1]))
@@ -0,0 +1,276 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import inspect
+import logging
+import socket
+import unittest
+import mock
+from nose.tools import eq_, ok_
+
+from ryu.lib import hub
+hub.patch()
+from ryu.base import app_manager  # to suppress cyclic import
+from ryu.controller import handler
+from ryu.controller import ofp_event
+from ryu.controller import ofp_worker
+from ryu.ofproto import ofproto_parser
+from ryu.ofproto import ofproto_protocol
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+from ryu.app import wsgi
+from ryu import utils
+
+
+def _load_app(self, name):
+    # AppManager.load_app() which finds the RyuApp of a module imported
+    # before test_manager reloads app_manager.
+    mod = utils.import_module(name)
+    for _name, cls in inspect.getmembers(mod, inspect.isclass):
+        if (cls.__module__ == mod.__name__ and
+                'RyuApp' in [c.__name__ for c in cls.__mro__[1:]]):
+            return cls
+    return None
+
+
+class _WSGIApp(app_manager.RyuApp):
+    _CONTEXTS = {'wsgi': wsgi.WSGIApplication}
+
+
+def _wait(cond):
+    with hub.Timeout(3):
+        while not cond():
+            hub.sleep(0.01)
+
+
+class Test_Channel(unittest.TestCase):
+    """ Test case for ofp_worker.Channel
+    """
+
+    def setUp(self):
+        sock1, sock2 = socket.socketpair()
+        self.channel1 = ofp_worker.Channel(sock1)
+        self.channel2 = ofp_worker.Channel(sock2)
+        self.received = []
+        self.thr1 = hub.spawn(self.channel1.serve, lambda *args: None)
+        self.thr2 = hub.spawn(self.channel2.serve, self._dispatch)
+        hub.sleep(0)
+
+    def tearDown(self):
+        hub.kill(self.thr1)
+        hub.kill(self.thr2)
+        hub.joinall([self.thr1, self.thr2])
+        self.channel1.sock.close()
+        self.channel2.sock.close()
+
+    def _dispatch(self, channel, method, params):
+        ok_(channel is self.channel2)
+        self.received.append((method, params))
+
+    def test_send(self):
+        for i in range(100):
+            self.channel1.send('msg', [i, 'hoge'])
+        _wait(lambda: len(self.received) == 100)
+        eq_([('msg', [i, 'hoge']) for i in range(100)], self.received)
+
+    def test_send_large(self):
+        # a notification split among several recv().
+        buf = 'x' * (256 * 1024)
+        self.channel1.send('msg', [1, buf])
+        self.channel1.send('msg', [2, buf])
+        _wait(lambda: len(self.received) == 2)
+        eq_([('msg', [1, buf]), ('msg', [2, buf])], self.received)
+
+    def test_close(self):
+        hub.kill(self.thr1)
+        hub.joinall([self.thr1])
+        ok_(not self.channel1.is_active)
+        self.channel1.sock.close()
+
+        # serve() returns when the peer is closed.
+        hub.joinall([self.thr2])
+        ok_(not self.channel2.is_active)
+
+        # notifications are dropped once the channel is closed.
+        self.channel1.send('msg', [1, 'hoge'])
+        eq_(0, self.channel1._send_q.qsize())
+
+
+class Test_OFPWorker(unittest.TestCase):
+    """ Test case for ofp_worker.OFPWorker
+    """
+
+    def setUp(self):
+        self.sock, worker_sock = socket.socketpair()
+        # RyuApp.__init__() is not called, as test_manager reloads
+        # app_manager.
+        cls = ofp_worker.OFPWorker
+        self.worker = cls.__new__(cls)
+        self.worker.logger = logging.getLogger('test_ofp_worker')
+        self.worker.observe_event = mock.Mock()
+        self.worker.channel = ofp_worker.Channel(worker_sock)
+        self.worker.dps = {}
+        self.worker._subscribed = set()
+        self.master = ofp_worker.Channel(self.sock)
+        self.received = []
+        self.thrs = [hub.spawn(self.master.serve, self._dispatch),
+                     hub.spawn(self.worker.channel.serve,
+                               self.worker._dispatch)]
+
+        self.dp = ofproto_protocol.ProtocolDesc(ofproto_v1_3.OFP_VERSION)
+        self.dp.id = 1
+        self.dp.address = ('127.0.0.1', 6633)
+        self.dp.state = handler.MAIN_DISPATCHER
+        self.dp.send = mock.Mock()
+
+    def tearDown(self):
+        for thr in self.thrs:
+            hub.kill(thr)
+        hub.joinall(self.thrs)
+        self.sock.close()
+        self.worker.channel.sock.close()
+
+    def _dispatch(self, channel, method, params):
+        self.received.append((method, params))
+
+    def test_subscribe(self):
+        self.master.send('subscribe', [['EventOFPPacketIn']])
+        self.master.send('subscribe', [['EventOFPStateChange',
+                                        'EventOFPPacketIn']])
+        _wait(lambda: self.worker.observe_event.call_count == 2)
+        hub.sleep(0.01)
+        eq_([mock.call(ofp_event.EventOFPPacketIn),
+             mock.call(ofp_event.EventOFPStateChange)],
+            self.worker.observe_event.call_args_list)
+
+    def _state_change(self, state):
+        ev = ofp_event.EventOFPStateChange(self.dp)
+        ev.state = state
+        self.worker._send_event(ev, state)
+
+    def test_forward(self):
+        self._state_change(handler.MAIN_DISPATCHER)
+
+        msg = ofproto_v1_3_parser.OFPEchoRequest(self.dp, data='hoge')
+        msg.set_xid(1)
+        msg.serialize()
+        # the state the event is dispatched in, not the current one.
+        self.dp.state = handler.DEAD_DISPATCHER
+        self.worker._send_event(ofp_event.ofp_msg_to_ev(msg),
+                                handler.MAIN_DISPATCHER)
+
+        self._state_change(handler.DEAD_DISPATCHER)
+
+        _wait(lambda: len(self.received) == 3)
+        eq_(('state', [1, ofproto_v1_3.OFP_VERSION, ['127.0.0.1', 6633],
+                       handler.MAIN_DISPATCHER]), self.received[0])
+        eq_(('msg', [1, handler.MAIN_DISPATCHER, str(msg.buf)]),
+            self.received[1])
+        eq_(('state', [1, ofproto_v1_3.OFP_VERSION, ['127.0.0.1', 6633],
+                       handler.DEAD_DISPATCHER]), self.received[2])
+        eq_({}, self.worker.dps)
+
+    def test_forward_handshake(self):
+        self.dp.id = None
+        self._state_change(handler.HANDSHAKE_DISPATCHER)
+        msg = ofproto_v1_3_parser.OFPHello(self.dp)
+        msg.set_xid(1)
+        msg.serialize()
+        self.worker._send_event(ofp_event.ofp_msg_to_ev(msg),
+                                handler.HANDSHAKE_DISPATCHER)
+        self._state_change(handler.CONFIG_DISPATCHER)
+
+        # Switch Features is forwarded with the datapath ID in it.
+        buf = bytearray(ofproto_v1_3.OFP_SWITCH_FEATURES_SIZE)
+        ofproto_parser.msg_pack_into(
+            ofproto_v1_3.OFP_HEADER_PACK_STR, buf, 0,
+            ofproto_v1_3.OFP_VERSION, ofproto_v1_3.OFPT_FEATURES_REPLY,
+            len(buf), 2)
+        ofproto_parser.msg_pack_into(
+            ofproto_v1_3.OFP_SWITCH_FEATURES_PACK_STR, buf,
+            ofproto_v1_3.OFP_HEADER_SIZE, 5, 0, 0, 0, 0, 0)
+        msg = ofproto_v1_3_parser.OFPSwitchFeatures.parser(
+            self.dp, ofproto_v1_3.OFP_VERSION,
+            ofproto_v1_3.OFPT_FEATURES_REPLY, len(buf), 2, buf)
+        self.worker._send_event(ofp_event.ofp_msg_to_ev(msg),
+                                handler.CONFIG_DISPATCHER)
+
+        _wait(lambda: len(self.received) == 2)
+        hub.sleep(0.01)
+        eq_([('state', [5, ofproto_v1_3.OFP_VERSION, ['127.0.0.1', 6633],
+                        handler.CONFIG_DISPATCHER]),
+             ('msg', [5, handler.CONFIG_DISPATCHER, str(buf)])],
+            self.received)
+        ok_(self.worker.dps[5] is self.dp)
+
+    def test_send_msg(self):
+        self._state_change(handler.MAIN_DISPATCHER)
+
+        self.master.send('send_msg', [1, 'hoge'])
+        self.master.send('send_msg', [2, 'unknown'])
+        _wait(lambda: self.dp.send.called)
+        self.dp.send.assert_called_once_with('hoge')
+
+
+class Test_fork_workers(unittest.TestCase):
+    """ Test case for ofp_worker.fork_workers
+    """
+
+    def setUp(self):
+        self.fork = mock.Mock(return_value=12345)
+        self.patches = [
+            mock.patch.object(ofp_worker, 'CONF', mock.Mock(ofp_workers=2)),
+            mock.patch.object(ofp_worker, '_workers', []),
+            mock.patch.object(ofp_worker, '_master_sock', None),
+            mock.patch.object(ofp_event, '_SERVICE_NAME',
+                              ofp_event._SERVICE_NAME),
+            mock.patch.object(ofp_worker.os, 'fork', self.fork),
+            mock.patch.object(ofp_worker.socket, 'socketpair',
+                              lambda: (mock.Mock(), mock.Mock())),
+            mock.patch.object(app_manager.AppManager, 'load_app', _load_app),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    # ofctl_rest serves a REST API, and shortest_switch uses
+    # ryu.topology.
+    _APPS = ['ryu.app.simple_switch_13,ryu.app.ofctl_rest',
+             'ryu.app.shortest_switch']
+
+    def test_master(self):
+        eq_(['ryu.app.ofctl_rest', 'ryu.app.shortest_switch',
+             'ryu.controller.ofp_master'],
+            ofp_worker.fork_workers(self._APPS))
+        eq_(2, self.fork.call_count)
+        eq_(2, len(ofp_worker.get_workers()))
+        ok_(not ofp_worker.is_worker())
+        eq_('ryu.controller.ofp_master', ofp_event._SERVICE_NAME)
+
+    def test_worker(self):
+        self.fork.return_value = 0
+        eq_(['ryu.app.simple_switch_13', 'ryu.controller.ofp_worker'],
+            ofp_worker.fork_workers(self._APPS))
+        ok_(ofp_worker.is_worker())
+        eq_('ryu.controller.ofp_handler', ofp_event._SERVICE_NAME)
+
+    def test_wsgi_app_in_worker(self):
+        # WSGI would not be served.
+        self.assertRaises(ValueError, ofp_worker.fork_workers,
+                          ['ryu.app.simple_switch_13', __name__])
+        ok_(not self.fork.called)
@@ -17,6 +17,7 @@
 
 import unittest
 import logging
+import mock
 
 from nose.tools import *
 
@@ -26,9 +27,12 @@ from ryu.controller.handler import (
     MAIN_DISPATCHER,
 )
 from ryu.lib.packet import vlan, ethernet, ipv4
+from ryu.lib.packet import arp, ipv6, lldp, mpls, packet, packet_base, slow
+from ryu.lib.packet import tcp, udp, icmpv6
 from ryu.lib.ofp_pktinfilter import packet_in_filter, RequiredTypeFilter
+from ryu.lib.ofp_pktinfilter import peek_protocols
 from ryu.lib import mac
-from ryu.ofproto import ether, ofproto_v1_3, ofproto_v1_3_parser
+from ryu.ofproto import ether, inet, ofproto_v1_3, ofproto_v1_3_parser
 from ryu.ofproto.ofproto_protocol import ProtocolDesc
 
 
@@ -89,3 +93,100 @@ class Test_packet_in_filter(unittest.TestCase):
                                                  data=truncated_data)
         ev = ofp_event.EventOFPPacketIn(pkt_in)
         ok_(not self.app.packet_in_handler(ev))
+
+    def test_pkt_in_filter_no_decode(self):
+        datapath = ProtocolDesc(version=ofproto_v1_3.OFP_VERSION)
+        pkt = (ethernet.ethernet(ethertype=ether.ETH_TYPE_IP) /
+               ipv4.ipv4())
+        pkt.serialize()
+        pkt_in = ofproto_v1_3_parser.OFPPacketIn(datapath,
+                                                 data=buffer(pkt.data))
+        ev = ofp_event.EventOFPPacketIn(pkt_in)
+        with mock.patch('ryu.controller.ofp_event.get_packet') as get_packet:
+            ok_(not self.app.packet_in_handler(ev))
+            ok_(not get_packet.called)
+
+
+class Test_peek_protocols(unittest.TestCase):
+
+    """ Test case for peek_protocols
+    """
+
+    def _check(self, protocols, complete):
+        pkt = packet.Packet()
+        for p in protocols:
+            pkt.add_protocol(p)
+        pkt.serialize()
+        data = str(pkt.data)
+
+        decoded = set(type(p) for p in packet.Packet(data)
+                      if isinstance(p, packet_base.PacketBase))
+        peeked, peeked_complete = peek_protocols(data)
+        eq_(complete, peeked_complete)
+        if complete:
+            eq_(decoded, peeked)
+        else:
+            ok_(peeked <= decoded)
+        return peeked
+
+    def test_ipv4(self):
+        peeked = self._check(
+            [ethernet.ethernet(ethertype=ether.ETH_TYPE_8021Q),
+             vlan.vlan(vid=10, ethertype=ether.ETH_TYPE_IP),
+             ipv4.ipv4(proto=inet.IPPROTO_TCP),
+             tcp.tcp(1, 2, offset=5), 'payload'],
+            True)
+        eq_(set([ethernet.ethernet, vlan.vlan, ipv4.ipv4, tcp.tcp]), peeked)
+
+    def test_ipv6(self):
+        self._check(
+            [ethernet.ethernet(ethertype=ether.ETH_TYPE_8021AD),
+             vlan.svlan(ethertype=ether.ETH_TYPE_8021Q),
+             vlan.vlan(ethertype=ether.ETH_TYPE_IPV6),
+             ipv6.ipv6(nxt=inet.IPPROTO_UDP), udp.udp(1, 2)],
+            True)
+        self._check(
+            [ethernet.ethernet(ethertype=ether.ETH_TYPE_IPV6),
+             ipv6.ipv6(nxt=inet.IPPROTO_ICMPV6),
+             icmpv6.icmpv6(icmpv6.ICMPV6_ECHO_REQUEST,
+                           data=icmpv6.echo(1, 1))],
+            True)
+        # extension headers are not looked through
+        self._check(
+            [ethernet.ethernet(ethertype=ether.ETH_TYPE_IPV6),
+             ipv6.ipv6(nxt=inet.IPPROTO_HOPOPTS,
+                       ext_hdrs=[ipv6.hop_opts(nxt=inet.IPPROTO_UDP)]),
+             udp.udp(1, 2)],
+            False)
+
+    def test_l2(self):
+        self._check(
+            [ethernet.ethernet(ethertype=ether.ETH_TYPE_ARP), arp.arp()],
+            True)
+        self._check(
+            [ethernet.ethernet(dst=lldp.LLDP_MAC_NEAREST_BRIDGE,
+                               ethertype=ether.ETH_TYPE_LLDP),
+             lldp.lldp([lldp.ChassisID(subtype=lldp.ChassisID.SUB_MAC_ADDRESS,
+                                       chassis_id='\x00' * 6),
+                        lldp.PortID(subtype=lldp.PortID.SUB_PORT_COMPONENT,
+                                    port_id='1'),
+                        lldp.TTL(ttl=120), lldp.End()])],
+            True)
+        self._check(
+            [ethernet.ethernet(ethertype=ether.ETH_TYPE_SLOW),
+             slow.lacp()],
+            False)
+        self._check(
+            [ethernet.ethernet(ethertype=ether.ETH_TYPE_MPLS),
+             mpls.mpls(), ipv4.ipv4()],
+            False)
+
+    def test_truncated(self):
+        pkt = (ethernet.ethernet(ethertype=ether.ETH_TYPE_IP) /
+               ipv4.ipv4(proto=inet.IPPROTO_UDP) / udp.udp(1, 2))
+        pkt.serialize()
+        data = str(pkt.data)
+        eq_((set(), True), peek_protocols(''))
+        eq_((set([ethernet.ethernet, ipv4.ipv4]), True),
+            peek_protocols(data[:-1]))
+        eq_((set([ethernet.ethernet]), True), peek_protocols(data[:20]))
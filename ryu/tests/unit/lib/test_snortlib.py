@@ -0,0 +1,140 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import socket
+import struct
+import unittest
+import mock
+from nose.tools import eq_
+
+from ryu.lib import alert
+from ryu.lib import snortlib
+
+
+def _alert(sig_id, src='\x0a\x00\x00\x01', alertmsg='alert'):
+    # an IPv4 packet after an ethernet header.
+    pkt = '\x00' * 14 + '\x45' + '\x00' * 11 + src + '\x0a\x00\x00\x02'
+    data = struct.pack(alert.AlertPkt._ALERTMSG_PACK_STR, alertmsg)
+    data += struct.pack('!IIII', 1, 2, len(pkt), len(pkt))
+    data += struct.pack(alert.AlertPkt._ALERTPKT_PART_PACK_STR,
+                        0, 14, 34, 34, 0, pkt)
+    data += struct.pack(alert.Event._PACK_STR + 'II', 1, sig_id, 1, 0, 0,
+                        0, 0, 1, 2)
+    assert len(data) == snortlib.BUFSIZE
+    return data
+
+
+class _Conn(object):
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def recv_into(self, buf):
+        if not self.chunks:
+            return 0
+        data = self.chunks.pop(0)
+        buf[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        pass
+
+
+class Test_AlertFilter(unittest.TestCase):
+    """ Test case for snortlib.AlertFilter
+    """
+
+    def test_filter(self):
+        parse = alert.AlertPkt.parser
+        a1, a2, a3 = (parse(_alert(1)), parse(_alert(2)),
+                      parse(_alert(1, src='\x0a\x00\x00\x03')))
+        a1_dup = parse(_alert(1, alertmsg='another'))
+        f = snortlib.AlertFilter(1, 1)
+        eq_([a1, a2, a3], f.filter([a1, a2, a1_dup, a3], 10.))
+        eq_([], f.filter([a1, a2], 10.5))
+        eq_(3, f.suppressed_count)
+        eq_([a1, a2], f.filter([a1, a2, a1], 11.))
+
+        f = snortlib.AlertFilter(0, 1)
+        eq_([a1, a1], f.filter([a1, a1], 10.))
+
+    def test_filter_no_ipv4(self):
+        # alerts of the same signature without IPv4 addresses may be
+        # for different flows.
+        a1 = alert.AlertPkt.parser(_alert(1))
+        a1.pkt = a1.pkt[:14] + '\x60' + a1.pkt[15:]
+        a2 = alert.AlertPkt.parser(_alert(1))
+        a2.val = snortlib._NOPACKET_STRUCT
+        f = snortlib.AlertFilter(1, 1)
+        eq_([a1, a1, a2, a2], f.filter([a1, a1, a2, a2], 10.))
+        eq_(0, f.suppressed_count)
+
+
+class Test_SnortLib(unittest.TestCase):
+    """ Test case for snortlib.SnortLib
+    """
+
+    def setUp(self):
+        self.lib = snortlib.SnortLib.__new__(snortlib.SnortLib)
+        self.lib.alert_filter = snortlib.AlertFilter(1, 1)
+        self.lib.logger = logging.getLogger('snortlib')
+        self.events = []
+        self.lib.send_event_to_observers = self.events.append
+
+    def _sig_ids(self):
+        eq_(snortlib.EventAlerts, self.events[0].__class__)
+        return [ev.msg.event.sig_id for ev in self.events[1:]]
+
+    def test_set_config(self):
+        # alerts are deduplicated only if configured to.
+        self.lib.set_config({'unixsock': True})
+        eq_(0, self.lib.alert_filter.window)
+        self.lib.set_config({'unixsock': True, 'dedup_window': 5})
+        eq_(5, self.lib.alert_filter.window)
+        eq_(1, self.lib.alert_filter.limit)
+
+    def test_recv_loop_conn(self):
+        data = ''.join(_alert(i) for i in range(3))
+        # an alert split across recvs.
+        chunks = [data[:100], data[100:snortlib.BUFSIZE + 5],
+                  data[snortlib.BUFSIZE + 5:] + _alert(0)]
+        self.lib._recv_loop_conn(_Conn(chunks), ('127.0.0.1', 10000))
+        eq_([snortlib.EventAlerts, snortlib.EventAlert,
+             snortlib.EventAlerts, snortlib.EventAlert, snortlib.EventAlert],
+            [ev.__class__ for ev in self.events])
+        eq_([0, 1, 2], [ev.msg.event.sig_id for ev in self.events
+                        if isinstance(ev, snortlib.EventAlert)])
+        eq_(1, self.lib.alert_filter.suppressed_count)
+
+    def test_recv_batch(self):
+        sock, sender = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            for i in range(3):
+                sender.send(_alert(i))
+            sender.send('short')
+            buf = bytearray(snortlib.BUFSIZE * 2)
+            end = self.lib._recv_batch(sock, buf)
+            eq_(snortlib.BUFSIZE * 2, end)
+            with mock.patch('time.time', return_value=0.):
+                self.lib._received(buf, end)
+            eq_([0, 1], self._sig_ids())
+
+            end = self.lib._recv_batch(sock, buf)
+            eq_(snortlib.BUFSIZE, end)
+            eq_(0, self.lib._recv_batch(sock, buf))
+        finally:
+            sock.close()
+            sender.close()
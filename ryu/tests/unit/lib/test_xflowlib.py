@@ -0,0 +1,187 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import socket
+import struct
+import unittest
+import mock
+from nose.tools import eq_, ok_
+
+from ryu.lib import xflowlib
+from ryu.lib.packet import ethernet
+from ryu.lib.packet import ipv4
+from ryu.lib.packet import packet
+from ryu.lib.packet import tcp
+from ryu.lib.packet import vlan
+from ryu.lib.xflow import netflow
+from ryu.lib.xflow import sflow
+from ryu.ofproto import ether
+from ryu.ofproto import inet
+
+
+def _ip(addr):
+    return xflowlib._ipv4_to_int(addr)
+
+
+def _netflow(flows, sampling=0):
+    data = struct.pack(netflow.NetFlowV5._PACK_STR, netflow.NETFLOW_V5,
+                       len(flows), 0, 0, 0, 0, 0, 0, sampling)
+    for src, dst, in_if, out_if, packets, bytes_, sport, dport in flows:
+        data += struct.pack(netflow.NetFlowV5Flow._PACK_STR, _ip(src),
+                            _ip(dst), 0, in_if, out_if, packets, bytes_,
+                            0, 0, sport, dport, 0, inet.IPPROTO_TCP, 0,
+                            0, 0, 0, 0)
+    return data
+
+
+def _frame(src, dst, sport, dport, vid=None):
+    pkt = packet.Packet()
+    if vid is None:
+        pkt.add_protocol(ethernet.ethernet(ethertype=ether.ETH_TYPE_IP))
+    else:
+        pkt.add_protocol(ethernet.ethernet(ethertype=ether.ETH_TYPE_8021Q))
+        pkt.add_protocol(vlan.vlan(vid=vid, ethertype=ether.ETH_TYPE_IP))
+    pkt.add_protocol(ipv4.ipv4(src=src, dst=dst, proto=inet.IPPROTO_TCP))
+    pkt.add_protocol(tcp.tcp(src_port=sport, dst_port=dport))
+    pkt.serialize()
+    return str(pkt.data)
+
+
+def _raw_header_record(frame, frame_length):
+    header = frame + '\x00' * (-len(frame) % 4)
+    return struct.pack('!IIIIII', 1, 16 + len(header), 1, frame_length, 4,
+                       len(frame)) + header
+
+
+def _sflow(samples):
+    data = struct.pack('!IIIIIII', sflow.SFLOW_V5, 1, _ip('192.0.2.100'),
+                       0, 1, 0, len(samples))
+    for expanded, rate, in_if, out_if, records in samples:
+        body = ''.join(records)
+        if expanded:
+            hdr = struct.pack('!11I', 1, 0, 1, rate, 0, 0, 0, in_if, 0,
+                              out_if, len(records))
+        else:
+            hdr = struct.pack('!8I', 1, 1, rate, 0, 0, in_if, out_if,
+                              len(records))
+        data += struct.pack('!II', 3 if expanded else 1,
+                            len(hdr) + len(body)) + hdr + body
+    return data
+
+
+class Test_decode(unittest.TestCase):
+    """ Test case for the decoders of xflowlib
+    """
+
+    def test_decode_netflow(self):
+        records = xflowlib.FlowRecords()
+        data = _netflow([('10.0.0.1', '10.0.0.2', 1, 2, 10, 1000, 80, 1024),
+                         ('10.0.0.3', '10.0.0.4', 3, 4, 1, 60, 22, 2048)],
+                        sampling=(1 << 14) | 100)
+        xflowlib.decode_netflow(records, 7, buffer(data))
+        eq_(2, len(records))
+        eq_([7, 7], list(records.agent))
+        eq_([_ip('10.0.0.1'), _ip('10.0.0.3')], list(records.src))
+        eq_([80, 22], list(records.src_port))
+        eq_([2, 4], list(records.out_if))
+        eq_([1000., 100.], list(records.packets))
+        eq_([100000., 6000.], list(records.bytes))
+
+        # a truncated flow is ignored.
+        records = xflowlib.FlowRecords()
+        xflowlib.decode_netflow(records, 7, buffer(data[:-1]))
+        eq_([1000.], list(records.packets))
+
+    def test_decode_sflow(self):
+        records = xflowlib.FlowRecords()
+        frame1 = _frame('10.0.0.1', '10.0.0.2', 80, 1024)
+        frame2 = _frame('10.0.0.3', '10.0.0.4', 22, 2048, vid=10)
+        other = struct.pack('!II', 1001, 4) + '\x00' * 4
+        data = _sflow([(False, 256, 1, 2,
+                        [other, _raw_header_record(frame1, 1500)]),
+                       (True, 512, 3, 0x40000004,
+                        [_raw_header_record(frame2, 100)])])
+        xflowlib.decode_sflow(records, 7, buffer(data))
+        eq_(2, len(records))
+        eq_([_ip('10.0.0.1'), _ip('10.0.0.3')], list(records.src))
+        eq_([_ip('10.0.0.2'), _ip('10.0.0.4')], list(records.dst))
+        eq_([inet.IPPROTO_TCP] * 2, list(records.proto))
+        eq_([1024, 2048], list(records.dst_port))
+        eq_([1, 3], list(records.in_if))
+        eq_([2, 0x40000004], list(records.out_if))
+        eq_([256., 512.], list(records.packets))
+        eq_([1500. * 256, 100. * 512], list(records.bytes))
+
+
+class Test_XFlowLib(unittest.TestCase):
+    """ Test case for xflowlib.XFlowLib
+    """
+
+    def setUp(self):
+        # only the collector state is needed.
+        self.app = xflowlib.XFlowLib.__new__(xflowlib.XFlowLib)
+        self.app.window = xflowlib._Window(0.)
+        self.app.dropped_count = 0
+        self.app.logger = logging.getLogger('xflowlib')
+        self.app.CONF = mock.Mock(xflow_top_talkers=2)
+
+    def test_recv_batch(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.setblocking(False)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            addr = sock.getsockname()
+            flows = [('10.0.0.1', '10.0.0.2', 1, 2, 1, 100, 80, 1024),
+                     ('10.0.0.3', '10.0.0.4', 1, 3, 1, 1000, 80, 1024)]
+            sender.sendto(_netflow(flows[:1]), addr)
+            sender.sendto('\x00\x05', addr)
+            sender.sendto(_netflow(flows), addr)
+            eq_(3, self.app._recv_batch(sock, bytearray(1024 * 1024),
+                                        xflowlib.decode_netflow))
+            eq_(0, self.app._recv_batch(sock, bytearray(1024 * 1024),
+                                        xflowlib.decode_netflow))
+        finally:
+            sock.close()
+            sender.close()
+        eq_(1, self.app.dropped_count)
+        window = self.app.window
+        eq_([2, 200], window.flows[(_ip('10.0.0.1'), _ip('10.0.0.2'),
+                                    inet.IPPROTO_TCP, 80, 1024)])
+        eq_({(_ip('127.0.0.1'), 1): [1200, 0],
+             (_ip('127.0.0.1'), 2): [0, 200],
+             (_ip('127.0.0.1'), 3): [0, 1000]}, window.interfaces)
+
+    def test_publish(self):
+        records = xflowlib.FlowRecords()
+        for i, bytes_ in enumerate([10, 30, 20]):
+            records.append(_ip('192.0.2.100'), i, 0, inet.IPPROTO_UDP, 0, 0,
+                           1, 0, 1, bytes_)
+        self.app.window.add(records)
+        self.app.window.add(records)
+
+        with mock.patch.object(self.app, 'send_event_to_observers') as send:
+            self.app._publish(10.)
+        ev = send.call_args[0][0]
+        ok_(isinstance(ev, xflowlib.EventTopTalkers))
+        eq_((0., 10.), (ev.start, ev.end))
+        eq_([(xflowlib.FlowKey('0.0.0.1', '0.0.0.0', inet.IPPROTO_UDP, 0, 0),
+              2, 60),
+             (xflowlib.FlowKey('0.0.0.2', '0.0.0.0', inet.IPPROTO_UDP, 0, 0),
+              2, 40)], ev.flows)
+        eq_({('192.0.2.100', 1): (120, 0)}, ev.interfaces)
+        eq_({}, self.app.window.flows)
+        eq_(10., self.app.window.start)
@@ -18,7 +18,7 @@
 
 import sys
 import unittest
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 from ryu.ofproto import ofproto_parser
 from ryu.ofproto import ofproto_protocol
@@ -114,7 +114,7 @@ implemented = {
         ofproto_v1_4.OFPT_ROLE_STATUS: (True, False),
         ofproto_v1_4.OFPT_TABLE_STATUS: (True, False),
         ofproto_v1_4.OFPT_REQUESTFORWARD: (False, True),
-        ofproto_v1_4.OFPT_BUNDLE_CONTROL: (False, True),
+        ofproto_v1_4.OFPT_BUNDLE_CONTROL: (True, True),
         ofproto_v1_4.OFPT_BUNDLE_ADD_MESSAGE: (False, True),
     },
 }
@@ -161,6 +161,15 @@ class Test_Parser(unittest.TestCase):
             open(('/tmp/%s.json' % name), 'wb').write(json.dumps(json_dict2))
             eq_(json_dict, json_dict2)
 
+            # the same in the lazy parse mode
+            ofproto_parser.set_lazy_parse(True)
+            try:
+                msg = ofproto_parser.msg(dp, version, msg_type, msg_len, xid,
+                                         wire_msg)
+            finally:
+                ofproto_parser.set_lazy_parse(False)
+            eq_(json_dict, self._msg_to_jsondict(msg))
+
         # json -> OFPxxx -> json
         msg2 = self._jsondict_to_msg(dp, json_dict)
         if has_serializer:
@@ -192,6 +201,48 @@ class Test_Parser(unittest.TestCase):
             eq_(wire_msg, msg2.buf)
 
 
+class Test_LazyParse(unittest.TestCase):
+    """ Test case for the lazy parse mode
+    """
+
+    def setUp(self):
+        ofproto_parser.set_lazy_parse(True)
+
+    def tearDown(self):
+        ofproto_parser.set_lazy_parse(False)
+
+    def _msg(self, file):
+        import os.path
+        this_dir = os.path.dirname(sys.modules[__name__].__file__)
+        wire_msg = open(os.path.join(this_dir, '../../packet_data/of13',
+                                     file), 'rb').read()
+        (version, msg_type, msg_len, xid) = ofproto_parser.header(wire_msg)
+        dp = ofproto_protocol.ProtocolDesc(version=version)
+        return ofproto_parser.msg(dp, version, msg_type, msg_len, xid,
+                                  wire_msg)
+
+    def test_packet_in(self):
+        msg = self._msg('4-4-ofp_packet_in.packet')
+        ok_('match' not in msg.__dict__)
+        eq_(msg.total_len, len(msg.data))
+        eq_(6, msg.match['in_port'])
+        ok_('match' in msg.__dict__)
+        ok_(msg.match is msg.match)
+
+    def test_multipart_reply(self):
+        msg = self._msg('4-12-ofp_flow_stats_reply.packet')
+        ok_('body' not in msg.__dict__)
+        eq_(ofproto_v1_3.OFPMP_FLOW, msg.type)
+        ok_(msg.body)
+        ok_('body' in msg.__dict__)
+
+    def test_overwrite(self):
+        msg = self._msg('4-4-ofp_packet_in.packet')
+        msg.match = None
+        msg.to_jsondict()
+        ok_(msg.match is None)
+
+
 def _add_tests():
     import os
     import os.path
@@ -14,8 +14,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import sys
+import timeit
 import unittest
+from nose.plugins.skip import SkipTest
 from nose.tools import eq_
 from nose.tools import ok_
 
@@ -23,6 +26,7 @@ from ryu.ofproto import ofproto_v1_2
 from ryu.ofproto import ofproto_v1_3
 from ryu.ofproto import ofproto_v1_2_parser
 from ryu.ofproto import ofproto_v1_3_parser
+from ryu.ofproto import ofproto_v1_4_parser
 
 
 class Test_Parser_OFPMatch(unittest.TestCase):
@@ -61,6 +65,75 @@ class Test_Parser_OFPMatch(unittest.TestCase):
             eq_(d[k], v)
 
 
+class Test_OFPMatch_field_index(unittest.TestCase):
+    """ Test case for the field index of OFPMatch
+    """
+    _parsers = [ofproto_v1_2_parser, ofproto_v1_3_parser,
+                ofproto_v1_4_parser]
+
+    def _match(self, ofpp):
+        match = ofpp.OFPMatch(in_port=1, eth_type=0x800,
+                              ipv4_src=('10.0.0.0', '255.0.0.0'),
+                              ip_proto=6, tcp_dst=80)
+        buf = bytearray()
+        match.serialize(buf, 0)
+        return ofpp.OFPMatch.parser(buffer(buf), 0)
+
+    def test_accessors(self):
+        for ofpp in self._parsers:
+            match = self._match(ofpp)
+            eq_(1, match.in_port)
+            eq_(0x800, match.eth_type)
+            eq_(('10.0.0.0', '255.0.0.0'), match.ipv4_src)
+            eq_(None, match.ipv4_dst)
+            eq_(80, match['tcp_dst'])
+            eq_(None, match.get('udp_dst'))
+            ok_('ip_proto' in match)
+            eq_(dict(match._fields2), dict(match.iteritems()))
+
+    def test_replace_fields(self):
+        for ofpp in self._parsers:
+            match = self._match(ofpp)
+            eq_(1, match['in_port'])
+            match._fields2 = [('in_port', 2)]
+            eq_(2, match['in_port'])
+            ok_('eth_type' not in match)
+
+    def test_index_cached(self):
+        for ofpp in self._parsers:
+            match = self._match(ofpp)
+            index = match._field_index()
+            # built once and kept for the following queries
+            ok_(index is match._field_index())
+            eq_(dict(match._fields2), index)
+            match._fields2 = [('eth_type', 0x86dd)]
+            ok_(index is not match._field_index())
+            eq_(None, match.in_port)
+            eq_(0x86dd, match.eth_type)
+            eq_(None, match.ipv4_src)
+
+    def test_benchmark(self):
+        # compares with building a dict per query as before.  run with
+        # RYU_BENCHMARK=1 and nosetests -s to see the result.
+        if not os.environ.get('RYU_BENCHMARK'):
+            raise SkipTest('RYU_BENCHMARK is not set')
+        match = self._match(ofproto_v1_3_parser)
+
+        def _dict():
+            fields = match._fields2
+            (dict(fields)['in_port'], dict(fields)['eth_type'],
+             'ipv4_dst' in dict(fields))
+
+        def _index():
+            match['in_port'], match.eth_type, 'ipv4_dst' in match
+
+        count = 20000
+        t_dict = min(timeit.repeat(_dict, number=count, repeat=3))
+        t_index = min(timeit.repeat(_index, number=count, repeat=3))
+        print 'dict: %.2f us, index: %.2f us per 3 queries' % (
+            t_dict / count * 1e6, t_index / count * 1e6)
+
+
 def _add_tests():
     import new
     import functools
@@ -20,6 +20,7 @@ import logging
 import struct
 import array
 import inspect
+import mock
 from nose.tools import *
 from nose.plugins.skip import Skip, SkipTest
 from ryu.ofproto import ether, inet
@@ -1526,3 +1527,32 @@ class TestPacket(unittest.TestCase):
         ok_(isinstance(pkt.protocols[0], ethernet.ethernet))
         ok_(isinstance(pkt.protocols[1], ipv4.ipv4))
         ok_(isinstance(pkt.protocols[2], udp.udp))
+
+    def test_headers_only(self):
+        e = ethernet.ethernet(self.dst_mac, self.src_mac, ether.ETH_TYPE_IP)
+        i = ipv4.ipv4(proto=inet.IPPROTO_TCP)
+        t = tcp.tcp(self.src_port, self.dst_port)
+        p = packet.Packet()
+        p.add_protocol(e)
+        p.add_protocol(i)
+        p.add_protocol(t)
+        p.add_protocol(self.payload)
+        p.serialize()
+
+        pkt = packet.Packet(p.data, headers_only=True)
+        eq_([ethernet.ethernet, ipv4.ipv4, tcp.tcp],
+            [type(proto) for proto in pkt.protocols[:3]])
+        eq_(self.dst_port, pkt.get_protocol(tcp.tcp).dst_port)
+        eq_(self.payload, str(pkt.protocols[3]))
+
+        # stop even if the transport protocol had a next protocol
+        with mock.patch.object(tcp.tcp, 'parser',
+                               side_effect=lambda buf: (
+                                   tcp.tcp(self.src_port, self.dst_port,
+                                           offset=5),
+                                   ethernet.ethernet, buf[20:])):
+            pkt = packet.Packet(p.data, headers_only=True)
+            eq_(4, len(pkt))
+            eq_(self.payload, str(pkt.protocols[3]))
+            pkt = packet.Packet(p.data)
+            ok_(isinstance(pkt.protocols[3], ethernet.ethernet))
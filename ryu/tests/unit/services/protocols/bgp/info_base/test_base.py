@@ -0,0 +1,156 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import unittest
+from nose.tools import eq_, ok_
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp.base import OrderedDict
+from ryu.services.protocols.bgp.info_base.base import ASPathFilter
+from ryu.services.protocols.bgp.info_base.base import FilterList
+from ryu.services.protocols.bgp.info_base.base import PathAttrs
+from ryu.services.protocols.bgp.info_base.base import PrefixFilter
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Table
+
+
+class Test_FilterList(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.info_base.base.FilterList
+    """
+
+    def _path(self, prefix, as_path=[65001]):
+        addr, length = prefix.split('/')
+        pattrs = OrderedDict()
+        pattrs[bgp.BGP_ATTR_TYPE_AS_PATH] = bgp.BGPPathAttributeAsPath(
+            [as_path])
+        return Ipv4Path(None, bgp.IPAddrPrefix(int(length), addr), 0,
+                        pattrs=pattrs, nexthop='192.0.2.1')
+
+    def _evaluate_linear(self, filters, path):
+        # reference implementation: the first matching filter wins.
+        for filter_ in filters:
+            if filter_.ROUTE_FAMILY != path.ROUTE_FAMILY:
+                continue
+            policy, is_matched = filter_.evaluate(path)
+            if policy == PrefixFilter.POLICY_PERMIT and is_matched:
+                return False, None
+            elif policy == PrefixFilter.POLICY_DENY and is_matched:
+                return True, filter_.prefix + ' - DENY'
+        return False, None
+
+    def test_evaluate(self):
+        filters = [
+            PrefixFilter('10.1.0.0/16', PrefixFilter.POLICY_PERMIT, le=20),
+            PrefixFilter('10.0.0.0/8', PrefixFilter.POLICY_DENY, ge=24),
+            ASPathFilter(65002, ASPathFilter.POLICY_TOP),
+            PrefixFilter('10.1.2.0/24', PrefixFilter.POLICY_DENY),
+            PrefixFilter('172.16.0.0/12', PrefixFilter.POLICY_DENY,
+                         ge=16, le=16),
+            PrefixFilter('0.0.0.0/0', PrefixFilter.POLICY_PERMIT),
+            PrefixFilter('10.0.0.0/8', PrefixFilter.POLICY_DENY),
+        ]
+        filter_list = FilterList(filters)
+        eq_(len(filters), len(filter_list))
+        for prefix in ['10.1.0.0/16', '10.1.2.0/24', '10.1.2.0/25',
+                       '10.2.0.0/16', '10.2.3.0/24', '172.16.0.0/16',
+                       '172.17.0.0/24', '192.0.2.0/24', '0.0.0.0/0']:
+            path = self._path(prefix)
+            eq_(self._evaluate_linear(filters, path),
+                filter_list.evaluate(path), prefix)
+
+    def test_evaluate_empty(self):
+        eq_((False, None),
+            FilterList([]).evaluate(self._path('10.0.0.0/8')))
+
+
+class Test_PathAttrs(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.info_base.base.PathAttrs
+    """
+
+    def _pattrs(self, as_path, med):
+        # parse the attributes as they would be received
+        pattrs = OrderedDict()
+        for attr in [bgp.BGPPathAttributeOrigin(0),
+                     bgp.BGPPathAttributeAsPath([as_path]),
+                     bgp.BGPPathAttributeMultiExitDisc(med)]:
+            attr, _rest = bgp._PathAttribute.parser(str(attr.serialize()))
+            pattrs[attr.type] = attr
+        return pattrs
+
+    def test_intern(self):
+        pattrs1 = PathAttrs(self._pattrs([65001, 65002], 10)).intern()
+        pattrs2 = PathAttrs(self._pattrs([65001, 65002], 10)).intern()
+        pattrs3 = PathAttrs(self._pattrs([65001, 65002], 20)).intern()
+
+        ok_(pattrs1 is pattrs2)
+        ok_(pattrs1 != pattrs3)
+        # the attributes in common are shared among the sets
+        ok_(pattrs1[bgp.BGP_ATTR_TYPE_AS_PATH] is
+            pattrs3[bgp.BGP_ATTR_TYPE_AS_PATH])
+        ok_(pattrs1[bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC] is not
+            pattrs3[bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC])
+
+    def test_path(self):
+        nlri = bgp.IPAddrPrefix(24, '10.0.0.0')
+        path1 = Ipv4Path(None, nlri, 0,
+                         pattrs=self._pattrs([65001], 10),
+                         nexthop='192.0.2.1')
+        path2 = Ipv4Path(None, nlri, 0,
+                         pattrs=self._pattrs([65001], 10),
+                         nexthop='192.0.2.1')
+        ok_(path1.pathattrs is path2.pathattrs)
+        ok_(path1.clone().pathattrs is path1.pathattrs)
+
+        # pathattr_map is a copy which does not affect the shared set
+        pathattr_map = path1.pathattr_map
+        del pathattr_map[bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC]
+        eq_(10, path2.get_pattr(bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC).value)
+
+    def test_release(self):
+        pattrs = PathAttrs(self._pattrs([65001, 65099], 99)).intern()
+        key = (bgp.BGP_ATTR_TYPE_AS_PATH,
+               str(pattrs[bgp.BGP_ATTR_TYPE_AS_PATH].serialize()))
+        ok_(key in PathAttrs._attrs)
+
+        del pattrs
+        gc.collect()
+        ok_(key not in PathAttrs._attrs)
+        pattrs = PathAttrs(self._pattrs([65001, 65099], 99))
+        ok_(pattrs.intern() is pattrs)
+
+
+class Test_Table(unittest.TestCase):
+    """ Test case for prefix lookups of
+    ryu.services.protocols.bgp.info_base.base.Table
+    """
+
+    def test_longest_match(self):
+        table = Ipv4Table(None, None)
+        for prefix in ['10.0.0.0/8', '10.1.0.0/16', '192.0.2.0/24']:
+            addr, length = prefix.split('/')
+            table._get_or_create_dest(bgp.IPAddrPrefix(int(length), addr))
+
+        eq_('10.1.0.0/16', table.longest_match('10.1.2.3').nlri.prefix)
+        eq_('10.0.0.0/8', table.longest_match('10.2.0.0/16').nlri.prefix)
+        eq_(None, table.longest_match('172.16.0.1'))
+        eq_(['10.0.0.0/8', '10.1.0.0/16'],
+            [d.nlri.prefix for d in table.covering_dests('10.1.0.0/24')])
+        eq_(['10.0.0.0/8', '10.1.0.0/16'],
+            [d.nlri.prefix for d in table.covered_dests('10.0.0.0/8')])
+
+        table.delete_dest_by_nlri(bgp.IPAddrPrefix(16, '10.1.0.0'))
+        eq_('10.0.0.0/8', table.longest_match('10.1.2.3').nlri.prefix)
+        eq_(2, len(list(table.itervalues())))
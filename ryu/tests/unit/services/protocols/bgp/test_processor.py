@@ -0,0 +1,184 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+from nose.tools import eq_
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp import processor
+from ryu.services.protocols.bgp.base import OrderedDict
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+
+
+LOCAL_AS = 65000
+IGP = bgp.BGP_ATTR_ORIGIN_IGP
+EGP = bgp.BGP_ATTR_ORIGIN_EGP
+INCOMPLETE = bgp.BGP_ATTR_ORIGIN_INCOMPLETE
+
+
+class _Peer(object):
+    def __init__(self, remote_as, router_id):
+        self.remote_as = remote_as
+        self.version_num = 1
+        self.protocol = mock.Mock()
+        self.protocol.recv_open_msg.bgp_identifier = router_id
+        self.protocol.sent_open_msg.bgp_identifier = '192.0.2.100'
+
+
+class Test_BestPathSelector(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.processor.BestPathSelector
+    """
+
+    def _path(self, source, local_pref, as_path, origin, med):
+        pattrs = OrderedDict()
+        pattrs[bgp.BGP_ATTR_TYPE_ORIGIN] = bgp.BGPPathAttributeOrigin(origin)
+        pattrs[bgp.BGP_ATTR_TYPE_AS_PATH] = bgp.BGPPathAttributeAsPath(
+            [as_path])
+        if local_pref is not None:
+            pattrs[bgp.BGP_ATTR_TYPE_LOCAL_PREF] = \
+                bgp.BGPPathAttributeLocalPref(local_pref)
+        if med is not None:
+            pattrs[bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC] = \
+                bgp.BGPPathAttributeMultiExitDisc(med)
+        return Ipv4Path(source, bgp.IPAddrPrefix(24, '10.0.0.0'), 1,
+                        pattrs=pattrs, nexthop='192.0.2.1')
+
+    def _check(self, path1, path2, best, reason):
+        eq_((best, reason),
+            processor.compute_best_path(LOCAL_AS, path1, path2))
+        selector = processor.BestPathSelector(LOCAL_AS)
+        eq_((best, reason), selector.compute_best_path(path1, path2))
+        # the values cached from the first comparison give the same result.
+        eq_((best, reason), selector.compute_best_path(path2, path1))
+
+    def test_local_pref(self):
+        peer = _Peer(LOCAL_AS, '192.0.2.1')
+        path1 = self._path(peer, 100, [65001, 65002], IGP, None)
+        path2 = self._path(peer, 200, [65001, 65002, 65003], INCOMPLETE, 10)
+        self._check(path1, path2, path2, processor.BPR_LOCAL_PREF)
+
+    def test_local_pref_missing(self):
+        # local-pref is compared only when both paths have it.
+        peer = _Peer(LOCAL_AS, '192.0.2.1')
+        path1 = self._path(peer, None, [65001], IGP, None)
+        path2 = self._path(peer, 200, [65001, 65002], IGP, None)
+        self._check(path1, path2, path1, processor.BPR_ASPATH)
+
+    def test_local_origin(self):
+        peer = _Peer(LOCAL_AS, '192.0.2.1')
+        path1 = self._path(peer, 100, [], IGP, None)
+        path2 = self._path(None, 100, [65001, 65002], INCOMPLETE, 10)
+        self._check(path1, path2, path2, processor.BPR_LOCAL_ORIGIN)
+
+    def test_aspath(self):
+        peer = _Peer(65001, '192.0.2.1')
+        path1 = self._path(peer, None, [65001, 65002], IGP, None)
+        path2 = self._path(peer, None, [65001], INCOMPLETE, 10)
+        self._check(path1, path2, path2, processor.BPR_ASPATH)
+
+    def test_origin(self):
+        peer = _Peer(65001, '192.0.2.1')
+        path1 = self._path(peer, None, [65001], EGP, None)
+        path2 = self._path(peer, None, [65001], IGP, 10)
+        self._check(path1, path2, path2, processor.BPR_ORIGIN)
+        path3 = self._path(peer, None, [65001], INCOMPLETE, None)
+        self._check(path1, path3, path1, processor.BPR_ORIGIN)
+
+    def test_med(self):
+        peer = _Peer(65001, '192.0.2.1')
+        path1 = self._path(peer, None, [65001], IGP, 10)
+        path2 = self._path(peer, None, [65001], IGP, 5)
+        self._check(path1, path2, path2, processor.BPR_MED)
+        # a path without MED has MED of 0.
+        path3 = self._path(peer, None, [65001], IGP, None)
+        self._check(path2, path3, path3, processor.BPR_MED)
+
+    def test_asn(self):
+        path1 = self._path(_Peer(LOCAL_AS, '192.0.2.1'), None, [65001],
+                           IGP, None)
+        path2 = self._path(_Peer(65001, '192.0.2.2'), None, [65001],
+                           IGP, None)
+        self._check(path1, path2, path2, processor.BPR_ASN)
+
+    def test_router_id(self):
+        path1 = self._path(_Peer(LOCAL_AS, '192.0.2.20'), None, [65001],
+                           IGP, None)
+        path2 = self._path(_Peer(LOCAL_AS, '192.0.2.3'), None, [65001],
+                           IGP, None)
+        self._check(path1, path2, path2, processor.BPR_ROUTER_ID)
+
+    def test_router_id_ebgp(self):
+        # paths from eBGP peers are not tie broken by router id.
+        path1 = self._path(_Peer(65001, '192.0.2.20'), None, [65001],
+                           IGP, None)
+        path2 = self._path(_Peer(65002, '192.0.2.3'), None, [65001],
+                           IGP, None)
+        self._check(path1, path2, None, processor.BPR_UNKNOWN)
+
+    def test_unknown(self):
+        peer = _Peer(LOCAL_AS, '192.0.2.1')
+        path1 = self._path(peer, 100, [65001], IGP, 0)
+        path2 = self._path(peer, 100, [65001], IGP, None)
+        self._check(path1, path2, None, processor.BPR_UNKNOWN)
+        path3 = self._path(None, 100, [65001], IGP, None)
+        path4 = self._path(None, 100, [65001], IGP, None)
+        self._check(path3, path4, None, processor.BPR_UNKNOWN)
+
+
+class Test_BgpProcessor(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.processor.BgpProcessor
+    """
+
+    class _Dest(object):
+        route_family = bgp.RF_IPv4_UC
+
+        def __init__(self):
+            self.selectors = []
+
+        def process(self, selector):
+            self.selectors.append(selector)
+
+    def test_batch(self):
+        core_service = mock.Mock()
+        core_service.asn = LOCAL_AS
+        bgp_processor = processor.BgpProcessor(core_service)
+        dests = [self._Dest() for i in range(5000)]
+        for dest in dests:
+            bgp_processor.enqueue(dest)
+        # queued twice, but processed once.
+        bgp_processor.enqueue(dests[0])
+
+        bgp_processor._process_dest()
+        stats = bgp_processor.get_stats_summary_dict()
+        eq_(500, stats['last_batch_size'])
+        eq_(4500, stats['dest_queued'])
+
+        bgp_processor._process_dest()
+        eq_(450, bgp_processor.get_stats_summary_dict()['last_batch_size'])
+
+        # batches do not get smaller than work_units_per_cycle.
+        while bgp_processor.get_stats_summary_dict()['dest_queued'] > 200:
+            bgp_processor._process_dest()
+        bgp_processor._process_dest()
+        eq_(processor.BgpProcessor.MAX_DEST_PROCESSED_PER_CYCLE,
+            bgp_processor.get_stats_summary_dict()['last_batch_size'])
+
+        while bgp_processor.get_stats_summary_dict()['dest_queued']:
+            bgp_processor._process_dest()
+        eq_(5000, bgp_processor.get_stats_summary_dict()['dest_processed'])
+        for dest in dests:
+            eq_(1, len(dest.selectors))
+            eq_(LOCAL_AS, dest.selectors[0].local_asn)
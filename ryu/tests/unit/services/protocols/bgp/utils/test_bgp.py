@@ -0,0 +1,105 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from nose.tools import eq_
+from nose.tools import ok_
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp.utils import bgp as bgp_utils
+
+
+class Test_pack_updates(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.utils.bgp.pack_updates
+    """
+
+    def _attrs(self, med):
+        return [
+            bgp.BGPPathAttributeNextHop('192.0.2.1'),
+            bgp.BGPPathAttributeOrigin(0),
+            bgp.BGPPathAttributeAsPath([[65000]]),
+            bgp.BGPPathAttributeMultiExitDisc(med),
+        ]
+
+    def _prefix(self, i):
+        return bgp.IPAddrPrefix(24, '10.%d.%d.0' % (i // 256, i % 256))
+
+    def _advertise(self, i, med=100):
+        return bgp.BGPUpdate(path_attributes=self._attrs(med),
+                             nlri=[self._prefix(i)])
+
+    def _parse(self, msgs):
+        ret = []
+        for msg in msgs:
+            binmsg = msg.serialize()
+            ok_(len(binmsg) <= bgp_utils.BGP_MAX_MSG_LEN)
+            msg2, rest = bgp.BGPMessage.parser(binmsg)
+            eq_('', str(rest))
+            ret.append(msg2)
+        return ret
+
+    def test_pack_same_attrs(self):
+        updates = [self._advertise(i) for i in range(10)]
+        msgs = self._parse(bgp_utils.pack_updates(updates))
+        eq_(1, len(msgs))
+        eq_([self._prefix(i).prefix for i in range(10)],
+            [n.prefix for n in msgs[0].nlri])
+        eq_(str(updates[0].path_attributes), str(msgs[0].path_attributes))
+
+    def test_pack_different_attrs(self):
+        updates = [self._advertise(i, med=i % 2) for i in range(10)]
+        msgs = self._parse(bgp_utils.pack_updates(updates))
+        eq_(2, len(msgs))
+        eq_([self._prefix(i).prefix for i in range(0, 10, 2)],
+            [n.prefix for n in msgs[0].nlri])
+        eq_([self._prefix(i).prefix for i in range(1, 10, 2)],
+            [n.prefix for n in msgs[1].nlri])
+
+    def test_pack_max_len(self):
+        updates = [self._advertise(i) for i in range(3000)]
+        updates += [bgp.BGPUpdate(withdrawn_routes=[
+            bgp.BGPWithdrawnRoute(24, '172.16.%d.0' % i)])
+            for i in range(200)]
+        msgs = self._parse(bgp_utils.pack_updates(updates))
+        nlri = sum((msg.nlri for msg in msgs), [])
+        eq_([self._prefix(i).prefix for i in range(3000)],
+            [n.prefix for n in nlri])
+        withdrawn = sum((msg.withdrawn_routes for msg in msgs), [])
+        eq_(200, len(withdrawn))
+        # 3000 * 4 bytes of NLRIs need 3 messages, and withdrawals 1.
+        eq_(4, len(msgs))
+
+    def test_pack_mp_reach(self):
+        updates = []
+        for i in range(10):
+            nlri = bgp.IP6AddrPrefix(64, '2001:db8:%x::' % i)
+            mp_reach = bgp.BGPPathAttributeMpReachNLRI(
+                afi=2, safi=1, next_hop='2001:db8::1', nlri=[nlri])
+            updates.append(bgp.BGPUpdate(path_attributes=[
+                mp_reach,
+                bgp.BGPPathAttributeOrigin(0),
+                bgp.BGPPathAttributeAsPath([[65000]])]))
+        msgs = self._parse(bgp_utils.pack_updates(updates))
+        eq_(1, len(msgs))
+        mp_reach = msgs[0].get_path_attr(bgp.BGP_ATTR_TYPE_MP_REACH_NLRI)
+        eq_(10, len(mp_reach.nlri))
+        eq_('2001:db8::1', mp_reach.next_hop)
+
+    def test_pack_eor(self):
+        eor = bgp_utils.create_end_of_rib_update()
+        updates = [self._advertise(0), eor, self._advertise(1)]
+        msgs = bgp_utils.pack_updates(updates)
+        eq_(2, len(msgs))
+        ok_(msgs[1] is eor)
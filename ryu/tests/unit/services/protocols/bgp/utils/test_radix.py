@@ -0,0 +1,112 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import unittest
+from nose.tools import eq_
+from nose.tools import ok_
+from nose.tools import raises
+
+import netaddr
+
+from ryu.services.protocols.bgp.utils import radix
+
+
+class Test_RadixTree(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.utils.radix
+    """
+
+    def _tree(self, prefixes):
+        tree = radix.Ipv4RadixTree()
+        for prefix in prefixes:
+            tree.add(prefix, prefix)
+        return tree
+
+    def test_get(self):
+        tree = self._tree(['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24'])
+        eq_(3, len(tree))
+        eq_('10.1.0.0/16', tree.get('10.1.0.0/16'))
+        eq_(None, tree.get('10.2.0.0/16'))
+        eq_(None, tree.get('10.0.0.0/9'))
+        ok_('10.1.2.0/24' in tree)
+        # host bits are ignored
+        ok_('10.1.2.3/24' in tree)
+
+    def test_longest_match(self):
+        tree = self._tree(['0.0.0.0/0', '10.0.0.0/8', '10.1.0.0/16'])
+        eq_(('10.1.0.0/16', '10.1.0.0/16'), tree.longest_match('10.1.2.3'))
+        eq_(('10.0.0.0/8', '10.0.0.0/8'), tree.longest_match('10.2.0.0/16'))
+        eq_(('0.0.0.0/0', '0.0.0.0/0'), tree.longest_match('192.0.2.1'))
+        tree.remove('0.0.0.0/0')
+        eq_(None, tree.longest_match('192.0.2.1'))
+
+    def test_covering_covered(self):
+        tree = self._tree(['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24',
+                           '10.2.0.0/16', '192.0.2.0/24'])
+        eq_(['10.0.0.0/8', '10.1.0.0/16'],
+            [p for p, _v in tree.covering('10.1.0.0/17')])
+        eq_(['10.0.0.0/8', '10.1.0.0/16', '10.2.0.0/16'],
+            sorted(p for p, _v in tree.covered('10.0.0.0/8')
+                   if not p.endswith('/24')))
+        eq_(['10.1.0.0/16', '10.1.2.0/24'],
+            [p for p, _v in tree.covered('10.1.0.0/16')])
+        eq_([], list(tree.covered('10.3.0.0/16')))
+
+    @raises(KeyError)
+    def test_remove_missing(self):
+        tree = self._tree(['10.0.0.0/8', '10.1.0.0/16'])
+        tree.remove('10.0.0.0/9')
+
+    @raises(ValueError)
+    def test_invalid_prefix(self):
+        self._tree(['10.0.0.0/33'])
+
+    def test_ipv6(self):
+        tree = radix.Ipv6RadixTree()
+        tree.add('2001:db8::/32', 1)
+        tree.add('2001:db8:1::/48', 2)
+        eq_(('2001:db8:1::/48', 2), tree.longest_match('2001:db8:1::1'))
+        eq_(('2001:db8::/32', 1), tree.longest_match('2001:db8:2::/64'))
+        eq_(None, tree.longest_match('2001:db9::1'))
+
+    def test_random(self):
+        rand = random.Random(0)
+        tree = radix.Ipv4RadixTree()
+        prefixes = {}
+
+        def _prefix():
+            length = rand.randint(0, 32)
+            addr = netaddr.IPAddress(rand.getrandbits(32))
+            return str(netaddr.IPNetwork('%s/%d' % (addr, length)).cidr)
+
+        for i in range(5000):
+            if prefixes and rand.random() < 0.4:
+                prefix = rand.choice(list(prefixes))
+                eq_(prefixes.pop(prefix), tree.remove(prefix))
+            else:
+                prefix = _prefix()
+                tree.add(prefix, i)
+                prefixes[prefix] = i
+        eq_(len(prefixes), len(tree))
+        eq_(sorted(prefixes.items()), sorted(tree.iteritems()))
+
+        for i in range(100):
+            prefix = _prefix()
+            net = netaddr.IPNetwork(prefix)
+            covering = [p for p in prefixes if net in netaddr.IPNetwork(p)]
+            covering.sort(key=lambda p: netaddr.IPNetwork(p).prefixlen)
+            eq_(covering, [p for p, _v in tree.covering(prefix)])
+            covered = [p for p in prefixes if netaddr.IPNetwork(p) in net]
+            eq_(sorted(covered), sorted(p for p, _v in tree.covered(prefix)))
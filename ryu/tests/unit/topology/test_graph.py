@@ -0,0 +1,97 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import unittest
+from nose.tools import eq_, ok_
+
+from ryu.topology import graph
+
+
+class Test_Graph(unittest.TestCase):
+    """ Test case for graph.Graph
+    """
+
+    def _ring(self, n):
+        g = graph.Graph()
+        for i in range(n):
+            g.add_edge(i, (i + 1) % n)
+            g.add_edge((i + 1) % n, i)
+        return g
+
+    def test_shortest_path(self):
+        g = self._ring(6)
+        eq_((0, 1, 2), g.shortest_path(0, 2))
+        eq_((0, 5, 4), g.shortest_path(0, 4))
+        eq_((3,), g.shortest_path(3, 3))
+        eq_(3, g.distance(0, 3))
+        eq_(None, g.shortest_path(0, 6))
+        eq_(float('inf'), g.distance(0, 6))
+
+        # cached
+        ok_(g.shortest_path(0, 2) is g.shortest_path(0, 2))
+
+        g.remove_edge(1, 2)
+        eq_((0, 5, 4, 3, 2), g.shortest_path(0, 2))
+        g.add_edge(0, 2, 3)
+        eq_((0, 2), g.shortest_path(0, 2))
+        g.add_edge(0, 2, 10)
+        eq_((0, 5, 4, 3, 2), g.shortest_path(0, 2))
+
+        g.remove_node(5)
+        eq_((0, 2), g.shortest_path(0, 2))
+        eq_(None, g.shortest_path(0, 5))
+
+    def test_k_shortest_paths(self):
+        g = self._ring(4)
+        g.add_edge(0, 2, 3)
+        eq_([(0, 1, 2), (0, 3, 2), (0, 2)], g.k_shortest_paths(0, 2, 5))
+        eq_([(0, 1, 2)], g.k_shortest_paths(0, 2, 1))
+        eq_([(1,)], g.k_shortest_paths(1, 1, 2))
+        eq_([], g.k_shortest_paths(0, 4, 2))
+
+        g.add_edge(0, 2, 1)
+        eq_([(0, 2), (0, 1, 2), (0, 3, 2)], g.k_shortest_paths(0, 2, 5))
+        g.remove_edge(3, 2)
+        eq_([(0, 2), (0, 1, 2)], g.k_shortest_paths(0, 2, 5))
+
+    def test_incremental(self):
+        # the cached paths always agree with the ones from scratch.
+        rand = random.Random(0)
+        g = graph.Graph()
+        edges = {}
+        nodes = range(12)
+        for step in range(300):
+            src, dst = rand.sample(nodes, 2)
+            if (src, dst) in edges and rand.random() < .4:
+                g.remove_edge(src, dst)
+                del edges[(src, dst)]
+            else:
+                weight = rand.randint(1, 4)
+                g.add_edge(src, dst, weight)
+                edges[(src, dst)] = weight
+
+            fresh = graph.Graph()
+            for (s, d), weight in edges.items():
+                fresh.add_edge(s, d, weight)
+            for _ in range(5):
+                src, dst = rand.sample(nodes, 2)
+                if src not in fresh:
+                    continue
+                eq_(fresh.distance(src, dst), g.distance(src, dst))
+                eq_([fresh._path_cost(p)
+                     for p in fresh.k_shortest_paths(src, dst, 3)],
+                    [g._path_cost(p)
+                     for p in g.k_shortest_paths(src, dst, 3)])
@@ -0,0 +1,180 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import mock
+from nose.tools import eq_, ok_, raises
+
+from ryu.lib.packet import ethernet
+from ryu.lib.packet import lldp
+from ryu.lib.packet import packet
+from ryu.ofproto import ether
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+from ryu.topology import switches
+
+
+def _port(dpid, port_no):
+    ofpport = ofproto_v1_3_parser.OFPPort(
+        port_no, '\x00' * 6, 'port%d' % port_no, 0, 0, 0, 0, 0, 0, 0, 0)
+    return switches.Port(dpid, ofproto_v1_3, ofpport)
+
+
+class Test_PortDataState(unittest.TestCase):
+    """ Test case for switches.PortDataState
+    """
+
+    def test_due_ports(self):
+        ports = switches.PortDataState()
+        p1, p2, p3 = _port(1, 1), _port(1, 2), _port(2, 1)
+        for p in [p1, p2, p3]:
+            ports.add_port(p, 'lldp')
+
+        # new ports are due at once
+        due, timestamp = ports.due_ports(0)
+        eq_(set([p1, p2, p3]), set(due))
+        eq_(None, timestamp)
+
+        with mock.patch('time.time', return_value=10.):
+            ports.lldp_sent(p3)
+        with mock.patch('time.time', return_value=11.):
+            ports.lldp_sent(p1)
+        with mock.patch('time.time', return_value=12.):
+            ports.lldp_sent(p2)
+
+        eq_(([], 10.), ports.due_ports(9.))
+        eq_(([p3, p1], 12.), ports.due_ports(11.5))
+        eq_(([p3], None), ports.due_ports(11.5, limit=1))
+
+        ports.move_front(p2)
+        eq_(([p2, p3], 11.), ports.due_ports(10.))
+
+
+class Test_LinkState(unittest.TestCase):
+    """ Test case for switches.LinkState
+    """
+
+    def test_expired_links(self):
+        links = switches.LinkState()
+        p1, p2, p3 = _port(1, 1), _port(2, 1), _port(3, 1)
+        with mock.patch('time.time', return_value=10.):
+            links.update_link(p1, p2)
+            links.update_link(p2, p1)
+        with mock.patch('time.time', return_value=12.):
+            links.update_link(p2, p3)
+        l12, l21, l23 = (switches.Link(p1, p2), switches.Link(p2, p1),
+                         switches.Link(p2, p3))
+
+        eq_([], links.expired_links(10.))
+        eq_(set([l12, l21]), set(links.expired_links(11.)))
+        # checked again until updated or deleted
+        with mock.patch('time.time', return_value=13.):
+            links.update_link(p1, p2)
+        eq_([l21], links.expired_links(11.))
+        links.link_down(l21)
+        eq_([], links.expired_links(11.))
+
+        links.rev_link_set_timestamp(l23, 5.)
+        eq_([l23], links.expired_links(11.))
+        eq_([l23, l12], links.expired_links(14.))
+
+
+class Test_LLDPPacket(unittest.TestCase):
+    """ Test case for switches.LLDPPacket
+    """
+
+    dpid = 0x0123456789abcdef
+    port_no = 0xfffffffe
+    dl_addr = '00:11:22:33:44:55'
+
+    def test_lldp_fill(self):
+        template = switches.LLDPPacket.lldp_template(self.dpid, 120)
+        data = switches.LLDPPacket.lldp_fill(template, self.port_no,
+                                             self.dl_addr)
+        eq_(switches.LLDPPacket.lldp_packet(self.dpid, self.port_no,
+                                            self.dl_addr, 120), data)
+        # the template is not modified
+        eq_(switches.LLDPPacket.lldp_packet(self.dpid, 0, '00:00:00:00:00:00',
+                                            120), template)
+
+    def test_lldp_parse_fast(self):
+        data = switches.LLDPPacket.lldp_packet(self.dpid, self.port_no,
+                                               self.dl_addr, 120)
+        eq_((self.dpid, self.port_no),
+            switches.LLDPPacket.lldp_parse_fast(data))
+        eq_((self.dpid, self.port_no),
+            switches.LLDPPacket.lldp_parse_fast(buffer(str(data))))
+        eq_((self.dpid, self.port_no),
+            switches.LLDPPacket.lldp_parse_packet(packet.Packet(str(data))))
+
+        eq_(None, switches.LLDPPacket.lldp_parse_fast(data[:-10]))
+        eq_(None, switches.LLDPPacket.lldp_parse_fast(
+            data[:22] + 'x' + data[23:]))
+
+    def _foreign_lldp(self, chassis_id):
+        pkt = packet.Packet()
+        pkt.add_protocol(ethernet.ethernet(lldp.LLDP_MAC_NEAREST_BRIDGE,
+                                           self.dl_addr,
+                                           ether.ETH_TYPE_LLDP))
+        tlvs = (lldp.ChassisID(subtype=lldp.ChassisID.SUB_LOCALLY_ASSIGNED,
+                               chassis_id=chassis_id),
+                lldp.PortID(subtype=lldp.PortID.SUB_PORT_COMPONENT,
+                            port_id='\x00\x00\x00\x01'),
+                lldp.TTL(ttl=120),
+                lldp.End())
+        pkt.add_protocol(lldp.lldp(tlvs))
+        pkt.serialize()
+        return str(pkt.data)
+
+    def test_lldp_parse_fallback(self):
+        # a shorter chassis id than ours.
+        data = self._foreign_lldp('dpid:0000000000001')
+        eq_(None, switches.LLDPPacket.lldp_parse_fast(data))
+
+        data = self._foreign_lldp('switch-1')
+        eq_(None, switches.LLDPPacket.lldp_parse_fast(data))
+
+    @raises(switches.LLDPPacket.LLDPUnknownFormat)
+    def test_lldp_parse_foreign(self):
+        switches.LLDPPacket.lldp_parse(self._foreign_lldp('switch-1'))
+
+
+class Test_Switches(unittest.TestCase):
+    """ Test case for switches.Switches
+    """
+
+    def test_convergence(self):
+        # only the discovery state is needed.
+        app = switches.Switches.__new__(switches.Switches)
+        app.ports = switches.PortDataState()
+        app.links = switches.LinkState()
+        app.discovery_stats = {'lldp_sent': 0, 'convergence_time': None}
+        app._changing_since = None
+        app._last_change = None
+        app.lldp_probe_rate = 100
+        for port_no in range(100):
+            app.ports.add_port(_port(1, port_no), 'lldp')
+        # a round takes 0.9 + 100 / 100 seconds
+        eq_(None, app._check_converged(0.))
+        with mock.patch('time.time', return_value=100.):
+            app._topology_changed()
+        with mock.patch('time.time', return_value=101.5):
+            app._topology_changed()
+        ok_(abs(app._check_converged(102.) - 3.3) < 1e-6)
+        eq_(None, app.discovery_stats['convergence_time'])
+
+        eq_(None, app._check_converged(106.))
+        eq_(1.5, app.discovery_stats['convergence_time'])
+        eq_(None, app._check_converged(107.))
@@ -0,0 +1,344 @@
+# Copyright (C) 2015 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+The graph of the topology discovered by ryu.topology.switches, with
+a cache of the shortest paths between the switches.
+
+Applications use it as a context:
+
+    _CONTEXTS = {'topology_graph': graph.TopologyGraph}
+
+    def __init__(self, *args, **kwargs):
+        ...
+        self.topology_graph = kwargs['topology_graph']
+
+    def _packet_in_handler(self, ev):
+        ...
+        path = self.topology_graph.shortest_path(src_dpid, dst_dpid)
+
+The graph is updated by the topology events one edge at a time, and
+only the cached paths which the change can affect are recomputed on
+the next lookup.
+"""
+
+import heapq
+import logging
+
+from ryu.base import app_manager
+from ryu.controller.handler import set_ev_cls
+from ryu.topology import event
+
+
+LOG = logging.getLogger('ryu.topology.graph')
+
+app_manager.require_app('ryu.topology.switches')
+
+_INFINITY = float('inf')
+
+
+class _Tree(object):
+    """The shortest paths from a node."""
+
+    def __init__(self, src, dist, pred):
+        self.src = src
+        self.dist = dist    # node -> cost from src
+        self.pred = pred    # node -> the previous node on the path
+        self.paths = {}     # node -> path from src.  built on demand
+
+    def path(self, dst):
+        path = self.paths.get(dst)
+        if path is None and dst in self.dist:
+            nodes = [dst]
+            while nodes[-1] != self.src:
+                nodes.append(self.pred[nodes[-1]])
+            path = tuple(reversed(nodes))
+            self.paths[dst] = path
+        return path
+
+
+class Graph(object):
+    """A directed graph with non-negative edge weights which caches the
+    shortest paths.
+
+    Paths are tuples of nodes from the source to the destination, and
+    are shared among callers.  The caches are updated as follows.
+
+    - The shortest paths from a source are kept as a shortest path tree,
+      which is dropped when one of its edges is removed or gets heavier,
+      or when a new or lighter edge makes a shorter path.
+    - The k shortest paths between two nodes are dropped when one of
+      their edges is removed or gets heavier, or when a new or lighter
+      edge can make a path shorter than the k-th one.
+    """
+
+    def __init__(self):
+        super(Graph, self).__init__()
+        self.edges = {}     # src -> {dst: weight}
+        self._in = {}       # dst -> set of src
+        self._trees = {}    # src -> _Tree
+        self._k_paths = {}  # (src, dst, k) -> (paths, costs)
+        self._k_users = {}  # (src, dst) of an edge -> set of _k_paths keys
+
+    def __contains__(self, node):
+        return node in self.edges
+
+    def __len__(self):
+        return len(self.edges)
+
+    def nodes(self):
+        return self.edges.keys()
+
+    def weight(self, src, dst):
+        """Returns the weight of the edge, or None if there is none."""
+        return self.edges.get(src, {}).get(dst)
+
+    def add_node(self, node):
+        if node not in self.edges:
+            self.edges[node] = {}
+            self._in[node] = set()
+
+    def remove_node(self, node):
+        if node not in self.edges:
+            return
+        for dst in self.edges[node].keys():
+            self.remove_edge(node, dst)
+        for src in list(self._in[node]):
+            self.remove_edge(src, node)
+        del self.edges[node]
+        del self._in[node]
+
+        # the paths from or to the node have no edges to track them.
+        self._trees.pop(node, None)
+        for key in self._k_paths.keys():
+            if node in key[:2]:
+                self._drop_k_paths(key)
+
+    def add_edge(self, src, dst, weight=1):
+        """Adds the edge, or updates its weight."""
+        assert weight >= 0
+        self.add_node(src)
+        self.add_node(dst)
+        old = self.edges[src].get(dst)
+        if old == weight:
+            return
+        if old is not None and old < weight:
+            self._invalidate_users(src, dst)
+        self.edges[src][dst] = weight
+        self._in[dst].add(src)
+        if old is None or weight < old:
+            self._invalidate_shortcut(src, dst, weight)
+
+    def remove_edge(self, src, dst):
+        if self.edges.get(src, {}).pop(dst, None) is None:
+            return
+        self._in[dst].discard(src)
+        self._invalidate_users(src, dst)
+
+    def _invalidate_users(self, src, dst):
+        # the paths through the edge can be longer now.
+        for node, tree in self._trees.items():
+            if tree.pred.get(dst) == src:
+                del self._trees[node]
+        for key in list(self._k_users.get((src, dst), ())):
+            self._drop_k_paths(key)
+
+    def _invalidate_shortcut(self, src, dst, weight):
+        # a path through the edge can be shorter now.
+        for node, tree in self._trees.items():
+            cost = tree.dist.get(src)
+            if cost is not None and cost + weight < tree.dist.get(dst,
+                                                                  _INFINITY):
+                del self._trees[node]
+        for key, (paths, costs) in self._k_paths.items():
+            path_src, path_dst, k = key
+            bound = (self.distance(path_src, src) + weight +
+                     self.distance(dst, path_dst))
+            if bound == _INFINITY:
+                continue
+            if len(paths) < k or bound < costs[-1]:
+                self._drop_k_paths(key)
+
+    def _drop_k_paths(self, key):
+        paths, _costs = self._k_paths.pop(key)
+        for path in paths:
+            for edge in zip(path, path[1:]):
+                users = self._k_users.get(edge)
+                if users is not None:
+                    users.discard(key)
+                    if not users:
+                        del self._k_users[edge]
+
+    def _dijkstra(self, src, dst=None, ignore_nodes=(), ignore_edges=()):
+        """Returns (dist, pred) of the shortest paths from src.
+
+        It stops when the path to dst is found.
+        """
+        dist = {}
+        pred = {}
+        queue = [(0, src, None)]
+        while queue:
+            cost, node, prev = heapq.heappop(queue)
+            if node in dist:
+                continue
+            dist[node] = cost
+            pred[node] = prev
+            if node == dst:
+                break
+            for next_node, weight in self.edges[node].iteritems():
+                if (next_node in dist or next_node in ignore_nodes or
+                        (node, next_node) in ignore_edges):
+                    continue
+                heapq.heappush(queue, (cost + weight, next_node, node))
+        return dist, pred
+
+    def _tree(self, src):
+        tree = self._trees.get(src)
+        if tree is None:
+            tree = _Tree(src, *self._dijkstra(src))
+            self._trees[src] = tree
+        return tree
+
+    def distance(self, src, dst):
+        """Returns the cost of the shortest path, or infinity if there
+        is no path.
+        """
+        if src not in self.edges:
+            return _INFINITY
+        return self._tree(src).dist.get(dst, _INFINITY)
+
+    def shortest_path(self, src, dst):
+        """Returns the shortest path, or None if there is no path."""
+        if src not in self.edges:
+            return None
+        return self._tree(src).path(dst)
+
+    def k_shortest_paths(self, src, dst, k):
+        """Returns a list of up to k shortest loop-free paths, from the
+        shortest one.
+        """
+        key = (src, dst, k)
+        entry = self._k_paths.get(key)
+        if entry is None:
+            entry = self._yen(src, dst, k)
+            self._k_paths[key] = entry
+            for path in entry[0]:
+                for edge in zip(path, path[1:]):
+                    self._k_users.setdefault(edge, set()).add(key)
+        return entry[0]
+
+    def _path_cost(self, path):
+        return sum(self.edges[node][next_node]
+                   for node, next_node in zip(path, path[1:]))
+
+    def _yen(self, src, dst, k):
+        # Yen's algorithm.
+        path = self.shortest_path(src, dst)
+        if path is None or k < 1:
+            return [], []
+        paths = [path]
+        costs = [self.distance(src, dst)]
+        candidates = []
+        seen = set(paths)
+        while len(paths) < k:
+            prev = paths[-1]
+            for i in range(len(prev) - 1):
+                root = prev[:i + 1]
+                ignore_edges = set(p[i:i + 2] for p in paths
+                                   if p[:i + 1] == root)
+                dist, pred = self._dijkstra(prev[i], dst, root[:-1],
+                                            ignore_edges)
+                if dst not in dist:
+                    continue
+                spur = [dst]
+                while spur[-1] != prev[i]:
+                    spur.append(pred[spur[-1]])
+                path = root[:-1] + tuple(reversed(spur))
+                if path not in seen:
+                    seen.add(path)
+                    heapq.heappush(candidates,
+                                   (self._path_cost(root) + dist[dst], path))
+            if not candidates:
+                break
+            cost, path = heapq.heappop(candidates)
+            paths.append(path)
+            costs.append(cost)
+        return paths, costs
+
+
+class TopologyGraph(app_manager.RyuApp):
+    """Keeps the Graph of the switches and the links discovered by
+    ryu.topology.switches.
+
+    Nodes are dpids and every link is an edge of weight 1, so that the
+    shortest paths have the least hops.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TopologyGraph, self).__init__(*args, **kwargs)
+        self.name = 'topology_graph'
+        self.graph = Graph()
+        self.links = {}  # (src dpid, dst dpid) -> list of Link
+
+    @set_ev_cls(event.EventSwitchEnter)
+    def _switch_enter_handler(self, ev):
+        self.graph.add_node(ev.switch.dp.id)
+
+    @set_ev_cls(event.EventSwitchLeave)
+    def _switch_leave_handler(self, ev):
+        dpid = ev.switch.dp.id
+        self.graph.remove_node(dpid)
+        for key in self.links.keys():
+            if dpid in key:
+                del self.links[key]
+
+    @set_ev_cls(event.EventLinkAdd)
+    def _link_add_handler(self, ev):
+        link = ev.link
+        key = (link.src.dpid, link.dst.dpid)
+        links = self.links.setdefault(key, [])
+        if link not in links:
+            links.append(link)
+        self.graph.add_edge(link.src.dpid, link.dst.dpid)
+
+    @set_ev_cls(event.EventLinkDelete)
+    def _link_delete_handler(self, ev):
+        link = ev.link
+        key = (link.src.dpid, link.dst.dpid)
+        links = self.links.get(key, [])
+        if link in links:
+            links.remove(link)
+        if not links:
+            self.links.pop(key, None)
+            self.graph.remove_edge(link.src.dpid, link.dst.dpid)
+
+    def get_link(self, src, dst):
+        """Returns a Link from the switch src to dst, or None."""
+        links = self.links.get((src, dst))
+        if links:
+            return links[0]
+        return None
+
+    def shortest_path(self, src, dst):
+        """Returns the shortest path from the switch src to dst as a
+        tuple of dpids, or None if there is no path.
+        """
+        return self.graph.shortest_path(src, dst)
+
+    def k_shortest_paths(self, src, dst, k):
+        """Returns a list of up to k shortest paths from the switch src
+        to dst.
+        """
+        return self.graph.k_shortest_paths(src, dst, k)
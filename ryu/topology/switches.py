@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import heapq
+import itertools
 import logging
 import struct
 import time
@@ -50,7 +52,10 @@ CONF.register_cli_opts([
                 help='link discovery: explicitly install flow entry '
                      'to send lldp packet to controller'),
     cfg.BoolOpt('explicit-drop', default=True,
-                help='link discovery: explicitly drop lldp packet in')
+                help='link discovery: explicitly drop lldp packet in'),
+    cfg.IntOpt('lldp-probe-rate', default=1000,
+               help='link discovery: max number of lldp packets sent '
+                    'per second (0: unlimited)')
 ])
 
 
@@ -305,12 +310,40 @@ class PortDataState(dict):
         for k in self:
             yield (k, self[k])
 
+    def due_ports(self, expire, limit=None):
+        """Returns (ports, timestamp).
+
+        ports are the ports not sent since expire, which are at the
+        front as ports are moved to the last when sent, up to limit.
+        timestamp is the oldest sent time of the other ports, or None.
+        """
+        ports = []
+        root = self._root
+        curr = root[self._NEXT]
+        while curr is not root:
+            port = curr[self._KEY]
+            timestamp = self[port].timestamp
+            if timestamp is not None and timestamp > expire:
+                return ports, timestamp
+            if limit is not None and len(ports) >= limit:
+                break
+            ports.append(port)
+            curr = curr[self._NEXT]
+        return ports, None
+
 
 class LinkState(dict):
     # dict: Link class -> timestamp
     def __init__(self):
         super(LinkState, self).__init__()
         self._map = {}
+        # heap of (timestamp, seq, link) to find expired links.
+        # an entry is dropped or requeued when its link is checked.
+        self._expiry = []
+        self._seq = itertools.count()
+
+    def _push_expiry(self, link, timestamp):
+        heapq.heappush(self._expiry, (timestamp, next(self._seq), link))
 
     def get_peer(self, src):
         return self._map.get(src, None)
@@ -318,7 +351,10 @@ class LinkState(dict):
     def update_link(self, src, dst):
         link = Link(src, dst)
 
-        self[link] = time.time()
+        now = time.time()
+        if link not in self:
+            self._push_expiry(link, now)
+        self[link] = now
         self._map[src] = dst
 
         # return if the reverse link is also up or not
@@ -333,6 +369,30 @@ class LinkState(dict):
         # rev_link may or may not in LinkSet
         if rev_link in self:
             self[rev_link] = timestamp
+            self._push_expiry(rev_link, timestamp)
+
+    def expired_links(self, expire):
+        """Returns the links not updated since expire, oldest first.
+
+        They are checked again by the next call unless deleted or
+        updated.
+        """
+        expiry = self._expiry
+        links = []
+        found = set()
+        while expiry and expiry[0][0] < expire:
+            _timestamp, _seq, link = heapq.heappop(expiry)
+            timestamp = self.get(link)
+            if timestamp is None or link in found:
+                continue    # deleted, or a duplicated entry
+            if timestamp >= expire:
+                self._push_expiry(link, timestamp)
+            else:
+                links.append(link)
+                found.add(link)
+        for link in links:
+            self._push_expiry(link, self[link])
+        return links
 
     def port_deleted(self, src):
         dst = self.get_peer(src)
@@ -370,6 +430,26 @@ class LLDPPacket(object):
     class LLDPUnknownFormat(RyuException):
         message = '%(msg)s'
 
+    # Layout of the frames built by lldp_packet().  The chassis id has
+    # a fixed length as dpid_to_str() pads the dpid.
+    _SRC_OFFSET = 6
+    _DPID_LEN = len(dpid_to_str(0))
+    _CHASSIS_OFFSET = ethernet.ethernet._MIN_LEN - 2  # from the ethertype
+    _CHASSIS_HEAD = struct.pack(
+        '!HHB', ETH_TYPE_LLDP,
+        lldp.LLDP_TLV_CHASSIS_ID << lldp.LLDP_TLV_TYPE_SHIFT |
+        (1 + CHASSIS_ID_PREFIX_LEN + _DPID_LEN),
+        lldp.ChassisID.SUB_LOCALLY_ASSIGNED) + CHASSIS_ID_PREFIX
+    _DPID_OFFSET = _CHASSIS_OFFSET + len(_CHASSIS_HEAD)
+    _PORT_OFFSET = _DPID_OFFSET + _DPID_LEN
+    _PORT_HEAD = struct.pack(
+        '!HB',
+        lldp.LLDP_TLV_PORT_ID << lldp.LLDP_TLV_TYPE_SHIFT |
+        (1 + PORT_ID_SIZE),
+        lldp.PortID.SUB_PORT_COMPONENT)
+    _PORT_ID_OFFSET = _PORT_OFFSET + len(_PORT_HEAD)
+    _MIN_LEN = _PORT_ID_OFFSET + PORT_ID_SIZE
+
     @staticmethod
     def lldp_packet(dpid, port_no,
                     dl_addr, ttl, vport_no=ofproto_v1_0.OFPP_NONE):
@@ -403,8 +483,58 @@ class LLDPPacket(object):
         return pkt.data
 
     @staticmethod
-    def lldp_parse(data):
-        pkt = packet.Packet(data)
+    def lldp_template(dpid, ttl):
+        """Returns the LLDP frame of the datapath, from which
+        lldp_fill() makes the frame of each port.
+        """
+        return LLDPPacket.lldp_packet(dpid, 0, DONTCARE_STR, ttl)
+
+    @staticmethod
+    def lldp_fill(template, port_no, dl_addr):
+        """Returns a copy of template with the port number and the
+        source address patched in.
+
+        This is the same as lldp_packet() but much cheaper.
+        """
+        data = bytearray(template)
+        src = LLDPPacket._SRC_OFFSET
+        data[src:src + 6] = addrconv.mac.text_to_bin(dl_addr)
+        struct.pack_into(LLDPPacket.PORT_ID_STR, data,
+                         LLDPPacket._PORT_ID_OFFSET, port_no)
+        return data
+
+    @staticmethod
+    def lldp_parse_fast(data):
+        """Returns (dpid, port_no) of the LLDP frame built by
+        lldp_packet(), or None if data is not such a frame.
+
+        Only fixed offsets of data are looked at.
+        """
+        cls = LLDPPacket
+        if (len(data) < cls._MIN_LEN or
+                data[cls._CHASSIS_OFFSET:cls._DPID_OFFSET] !=
+                cls._CHASSIS_HEAD or
+                data[cls._PORT_OFFSET:cls._PORT_ID_OFFSET] != cls._PORT_HEAD):
+            return None
+        try:
+            src_dpid = int(str(data[cls._DPID_OFFSET:cls._PORT_OFFSET]), 16)
+        except ValueError:
+            return None
+        (src_port_no, ) = struct.unpack_from(cls.PORT_ID_STR, data,
+                                             cls._PORT_ID_OFFSET)
+        return src_dpid, src_port_no
+
+    @staticmethod
+    def lldp_parse(data, pkt=None):
+        src = LLDPPacket.lldp_parse_fast(data)
+        if src is not None:
+            return src
+        if pkt is None:
+            pkt = packet.Packet(data)
+        return LLDPPacket.lldp_parse_packet(pkt)
+
+    @staticmethod
+    def lldp_parse_packet(pkt):
         i = iter(pkt)
         eth_pkt = i.next()
         assert type(eth_pkt) == ethernet.ethernet
@@ -444,6 +574,8 @@ class Switches(app_manager.RyuApp):
                event.EventPortAdd, event.EventPortDelete,
                event.EventPortModify,
                event.EventLinkAdd, event.EventLinkDelete]
+    # links between switches of different workers must be discovered.
+    _GLOBAL = True
 
     DEFAULT_TTL = 120  # unused. ignored.
     LLDP_PACKET_LEN = len(LLDPPacket.lldp_packet(0, 0, DONTCARE_STR, 0))
@@ -463,11 +595,19 @@ class Switches(app_manager.RyuApp):
         self.ports = PortDataState()  # Port class -> PortData class
         self.links = LinkState()      # Link class -> timestamp
         self.is_active = True
+        self.lldp_templates = {}      # datapath_id => LLDP frame
+
+        # convergence_time is the time from a topology change to the
+        # last link change caused by it, in seconds.
+        self.discovery_stats = {'lldp_sent': 0, 'convergence_time': None}
+        self._changing_since = None
+        self._last_change = None
 
         self.link_discovery = self.CONF.observe_links
         if self.link_discovery:
             self.install_flow = self.CONF.install_lldp_flow
             self.explicit_drop = self.CONF.explicit_drop
+            self.lldp_probe_rate = self.CONF.lldp_probe_rate
             self.lldp_event = hub.Event()
             self.link_event = hub.Event()
             self.threads.append(hub.spawn(self.lldp_loop))
@@ -493,6 +633,7 @@ class Switches(app_manager.RyuApp):
         if dp.id in self.dps:
             del self.dps[dp.id]
             del self.port_state[dp.id]
+            self.lldp_templates.pop(dp.id, None)
 
     def _get_switch(self, dpid):
         if dpid in self.dps:
@@ -502,16 +643,54 @@ class Switches(app_manager.RyuApp):
             return switch
 
     def _get_port(self, dpid, port_no):
-        switch = self._get_switch(dpid)
-        if switch:
-            for p in switch.ports:
-                if p.port_no == port_no:
-                    return p
+        dp = self.dps.get(dpid)
+        if dp is None:
+            return None
+        ofpport = self.port_state[dpid].get(port_no)
+        if ofpport is None:
+            return None
+        port = Port(dpid, dp.ofproto, ofpport)
+        if port.is_reserved():
+            return None
+        return port
+
+    def _topology_changed(self):
+        now = time.time()
+        if self._changing_since is None:
+            self._changing_since = now
+        self._last_change = now
+
+    def _check_converged(self, now):
+        """Returns the seconds until the topology is deemed converged,
+        or None if it is not changing.
+
+        It is converged when no change has been seen during two rounds
+        of probing every port.
+        """
+        if self._changing_since is None:
+            return None
+        round_time = self.LLDP_SEND_PERIOD_PER_PORT
+        if self.lldp_probe_rate > 0:
+            round_time += float(len(self.ports)) / self.lldp_probe_rate
+        converged = self._last_change + round_time * 2
+        if converged > now:
+            return converged - now
+
+        convergence_time = self._last_change - self._changing_since
+        self.discovery_stats['convergence_time'] = convergence_time
+        self._changing_since = None
+        LOG.info('topology converged in %.3f seconds: %d ports, %d links',
+                 convergence_time, len(self.ports), len(self.links))
+        return None
 
     def _port_added(self, port):
-        lldp_data = LLDPPacket.lldp_packet(
-            port.dpid, port.port_no, port.hw_addr, self.DEFAULT_TTL)
+        template = self.lldp_templates.get(port.dpid)
+        if template is None:
+            template = LLDPPacket.lldp_template(port.dpid, self.DEFAULT_TTL)
+            self.lldp_templates[port.dpid] = template
+        lldp_data = LLDPPacket.lldp_fill(template, port.port_no, port.hw_addr)
         self.ports.add_port(port, lldp_data)
+        self._topology_changed()
         # LOG.debug('_port_added dpid=%s, port_no=%s, live=%s',
         #           port.dpid, port.port_no, port.is_live())
 
@@ -524,6 +703,7 @@ class Switches(app_manager.RyuApp):
             return
         link = Link(port, dst)
         self.send_event_to_observers(event.EventLinkDelete(link))
+        self._topology_changed()
         if rev_link_dst:
             rev_link = Link(dst, rev_link_dst)
             self.send_event_to_observers(event.EventLinkDelete(rev_link))
@@ -695,12 +875,16 @@ class Switches(app_manager.RyuApp):
             return
 
         msg = ev.msg
-        try:
-            src_dpid, src_port_no = LLDPPacket.lldp_parse(msg.data)
-        except LLDPPacket.LLDPUnknownFormat as e:
-            # This handler can receive all the packtes which can be
-            # not-LLDP packet. Ignore it silently
-            return
+        src = LLDPPacket.lldp_parse_fast(msg.data)
+        if src is None:
+            # not sent by us.  look into the decoded packet.
+            try:
+                src = LLDPPacket.lldp_parse_packet(ev.pkt_headers)
+            except LLDPPacket.LLDPUnknownFormat as e:
+                # This handler can receive all the packtes which can be
+                # not-LLDP packet. Ignore it silently
+                return
+        src_dpid, src_port_no = src
 
         dst_dpid = msg.datapath.id
         if msg.datapath.ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
@@ -711,14 +895,13 @@ class Switches(app_manager.RyuApp):
             LOG.error('cannot accept LLDP. unsupported version. %x',
                       msg.datapath.ofproto.OFP_VERSION)
 
+        src = self._get_port(src_dpid, src_port_no)
+
         # get the lldp delay
-        for port in self.ports.keys():
-            if src_dpid == port.dpid and src_port_no == port.port_no:
-                send_timestamp = self.ports[port].timestamp
-                if send_timestamp:
-                    self.ports[port].delay = recv_timestamp - send_timestamp
+        port_data = self.ports.get(src) if src else None
+        if port_data is not None and port_data.timestamp:
+            port_data.delay = recv_timestamp - port_data.timestamp
 
-        src = self._get_port(src_dpid, src_port_no)
         if not src or src.dpid == dst_dpid:
             return
         try:
@@ -742,10 +925,12 @@ class Switches(app_manager.RyuApp):
         if old_peer and old_peer != dst:
             old_link = Link(src, old_peer)
             self.send_event_to_observers(event.EventLinkDelete(old_link))
+            self._topology_changed()
 
         link = Link(src, dst)
         if link not in self.links:
             self.send_event_to_observers(event.EventLinkAdd(link))
+            self._topology_changed()
 
         if not self.links.update_link(src, dst):
             # reverse link is not detected yet.
@@ -771,6 +956,7 @@ class Switches(app_manager.RyuApp):
             return
 
         # LOG.debug('lldp sent dpid=%s, port_no=%d', dp.id, port.port_no)
+        self.discovery_stats['lldp_sent'] += 1
         # TODO:XXX
         if dp.ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
             actions = [dp.ofproto_parser.OFPActionOutput(port.port_no)]
@@ -787,34 +973,45 @@ class Switches(app_manager.RyuApp):
                       dp.ofproto.OFP_VERSION)
 
     def lldp_loop(self):
+        # ports are kept in the order of the next probe time, as the
+        # probe period is the same for all.  the probes are sent in
+        # bursts of up to LLDP_SEND_GUARD worth of lldp_probe_rate.
+        rate = self.lldp_probe_rate
+        burst = None
+        if rate > 0:
+            burst = max(1, int(rate * self.LLDP_SEND_GUARD))
+        tokens = burst
+        last = time.time()
         while self.is_active:
             self.lldp_event.clear()
 
             now = time.time()
-            timeout = None
-            ports_now = []
-            ports = []
-            for (key, data) in self.ports.items():
-                if data.timestamp is None:
-                    ports_now.append(key)
-                    continue
-
-                expire = data.timestamp + self.LLDP_SEND_PERIOD_PER_PORT
-                if expire <= now:
-                    ports.append(key)
-                    continue
-
-                timeout = expire - now
-                break
-
-            for port in ports_now:
-                self.send_lldp_packet(port)
+            if burst is not None:
+                tokens = min(burst, tokens + (now - last) * rate)
+                last = now
+            limit = None if burst is None else int(tokens)
+            ports, timestamp = self.ports.due_ports(
+                now - self.LLDP_SEND_PERIOD_PER_PORT, limit)
+            # group the packets by datapath so that the datapath can
+            # send them at once
+            ports.sort(key=lambda port: port.dpid)
             for port in ports:
                 self.send_lldp_packet(port)
-                hub.sleep(self.LLDP_SEND_GUARD)      # don't burst
 
-            if timeout is not None and ports:
-                timeout = 0     # We have already slept
+            if limit is not None:
+                tokens -= len(ports)
+            if limit is not None and len(ports) >= limit:
+                timeout = self.LLDP_SEND_GUARD     # don't burst
+            elif timestamp is not None:
+                timeout = max(0, timestamp + self.LLDP_SEND_PERIOD_PER_PORT -
+                              now)
+            else:
+                timeout = None
+
+            converge_timeout = self._check_converged(now)
+            if converge_timeout is not None:
+                timeout = min(timeout, converge_timeout) \
+                    if timeout is not None else converge_timeout
             # LOG.debug('lldp sleep %s', timeout)
             self.lldp_event.wait(timeout=timeout)
 
@@ -824,20 +1021,19 @@ class Switches(app_manager.RyuApp):
 
             now = time.time()
             deleted = []
-            for (link, timestamp) in self.links.items():
-                # LOG.debug('%s timestamp %d (now %d)', link, timestamp, now)
-                if timestamp + self.LINK_TIMEOUT < now:
-                    src = link.src
-                    if src in self.ports:
-                        port_data = self.ports.get_port(src)
-                        # LOG.debug('port_data %s', port_data)
-                        if port_data.lldp_dropped() > self.LINK_LLDP_DROP:
-                            deleted.append(link)
+            for link in self.links.expired_links(now - self.LINK_TIMEOUT):
+                src = link.src
+                if src in self.ports:
+                    port_data = self.ports.get_port(src)
+                    # LOG.debug('port_data %s', port_data)
+                    if port_data.lldp_dropped() > self.LINK_LLDP_DROP:
+                        deleted.append(link)
 
             for link in deleted:
                 self.links.link_down(link)
                 # LOG.debug('delete %s', link)
                 self.send_event_to_observers(event.EventLinkDelete(link))
+                self._topology_changed()
 
                 dst = link.dst
                 rev_link = Link(dst, link.src)